@@ -1,9 +1,12 @@
 # main.py (V15.1 最终修复版)
+import asyncio
+import csv
 import logging
 import argparse
 import os
 import sys
 import signal
+import time
 from datetime import datetime
 from pathlib import Path
 
@@ -12,10 +15,26 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from tradingagents.graph.trading_graph import build_graph
+from tradingagents.graph.checkpointer import get_checkpointer, run_config
+from tradingagents.service.server import serve
+from tradingagents.service.worker import run_worker_pool
+from tradingagents.llms import set_provider_override
+from tradingagents.llms.router import get_provider_router
 from tradingagents.dataflows.akshare_utils import get_stock_name, is_valid_a_stock_code
 from tradingagents.default_config import TRADING_TICKER, AGENT_CONFIG
 from tradingagents.utils.performance_monitor import global_monitor
 from tradingagents.utils.error_handler import TradingSystemError
+from tradingagents.utils.llm_cache import set_cache_bypass
+from tradingagents.utils.node_memo import get_node_memo
+from tradingagents.utils.llm_metrics import llm_metrics
+from tradingagents.utils.rate_governor import get_rate_governor
+from tradingagents.utils.output_repair import repair_stats
+from tradingagents.utils import token_streaming
+
+try:
+    from tradingagents.default_config import BATCH_CONFIG
+except ImportError:
+    BATCH_CONFIG = {}
 
 def setup_logging():
     log_dir = project_root / "logs"
@@ -25,11 +44,18 @@ def setup_logging():
                         handlers=[logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(sys.stdout)])
     logging.info("日志系统初始化完成。")
 
+def init_worker_process(fake_llm: bool, no_llm_cache: bool):
+    """worker子进程的初始化：与主进程相同的日志与模型开关"""
+    setup_logging()
+    if fake_llm:
+        set_provider_override("fake")
+    set_cache_bypass(no_llm_cache)
+
 def signal_handler(signum, frame):
     print(f"\n捕获到信号 {signum}，系统正在优雅关闭...")
     sys.exit(0)
 
-def main(ticker: str):
+def main(ticker: str, use_async: bool = False):
     logger = logging.getLogger(__name__)
 
     if not is_valid_a_stock_code(ticker):
@@ -47,28 +73,223 @@ def main(ticker: str):
              return False
 
         logger.info(f"--- 开始为股票 {stock_name} ({ticker}) 执行投研工作流 ---")
-        app = build_graph()
-        initial_state = {"ticker": ticker, "stock_name": stock_name}
-        start_time = datetime.now()
+        checkpointer = get_checkpointer()
+        app = build_graph(async_mode=use_async, checkpointer=checkpointer)
+        run_id = llm_metrics.start_run()
         print(f"\n🚀 工作流启动，开始分析 {stock_name}...")
-        final_state = None
-        for step_count, s in enumerate(app.stream(initial_state), 1):
-            node_name = list(s.keys())[0]
-            print(f"✅ 步骤 {step_count}: 节点 '{node_name}' 执行完毕")
-            final_state = s
-        execution_time = (datetime.now() - start_time).total_seconds()
-        if final_state:
-            last_node_name = list(final_state.keys())[0]
-            final_decision = final_state[last_node_name].get('final_decision')
+        if checkpointer:
+            print(f"🔖 运行ID: {run_id}（中断后可用 --resume {run_id} 从未完成的节点继续）")
+        return run_graph(app, {"ticker": ticker, "stock_name": stock_name}, run_id, use_async, stock_name, ticker,
+                         resumable=checkpointer is not None)
+    except Exception as e:
+        logger.error(f"发生未知错误: {e}", exc_info=True)
+        print(f"❌ 程序执行出现未知错误: {e}")
+        return False
+
+def resume(run_id: str, use_async: bool = False):
+    """从检查点恢复一次中断的运行：已完成的节点不再执行，从第一个未完成的节点继续"""
+    logger = logging.getLogger(__name__)
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        print("\n❌ 检查点已在配置中关闭（CHECKPOINT_CONFIG['enabled']），无法恢复运行。\n")
+        return False
+    try:
+        app = build_graph(async_mode=use_async, checkpointer=checkpointer)
+        snapshot = app.get_state(run_config(run_id))
+        if not snapshot.values:
+            print(f"\n❌ 未找到运行 '{run_id}' 的检查点（可能已超过保留期）。\n")
+            return False
+        ticker, stock_name = snapshot.values["ticker"], snapshot.values["stock_name"]
+        if not snapshot.next:
+            # 该运行已经完整结束，直接展示保存的决策
+            final_decision = snapshot.values.get("final_decision")
             if final_decision:
-                print_final_decision(final_decision, stock_name, ticker, execution_time)
+                print_final_decision(final_decision, stock_name, ticker, 0.0)
                 return True
-        print("⚠️ 工作流执行完毕，但未能生成最终交易决策。")
+            print("⚠️ 该运行已执行完毕，但未能生成最终交易决策。")
+            return False
+        logger.info(f"--- 恢复运行 {run_id}: {stock_name} ({ticker})，从节点 {list(snapshot.next)} 继续 ---")
+        print(f"\n♻️ 恢复运行 {run_id}（{stock_name}），从节点 {', '.join(snapshot.next)} 继续...")
+        llm_metrics.start_run(run_id)
+        # 输入为 None 时 LangGraph 从最新检查点继续执行未完成的节点
+        return run_graph(app, None, run_id, use_async, stock_name, ticker, resumable=True)
+    except Exception as e:
+        logger.error(f"恢复运行失败: {e}", exc_info=True)
+        print(f"❌ 恢复运行失败: {e}")
         return False
+
+def run_graph(app, graph_input, run_id: str, use_async: bool, stock_name: str, ticker: str, resumable: bool) -> bool:
+    """驱动工作流图直到结束并打印最终决策；失败时提示可用的恢复命令"""
+    config = run_config(run_id)
+    start_time = datetime.now()
+    try:
+        if use_async:
+            final_state = asyncio.run(stream_graph_async(app, graph_input, config))
+        else:
+            final_state = None
+            for step_count, s in enumerate(app.stream(graph_input, config), 1):
+                final_state = report_step(step_count, s)
+    except Exception:
+        if resumable:
+            print(f"💾 已完成节点的结果已保存，可运行 `python main.py --resume {run_id}` 从失败的节点继续")
+        raise
+    finally:
+        export_run_metrics(run_id)
+    execution_time = (datetime.now() - start_time).total_seconds()
+    if final_state:
+        last_node_name = list(final_state.keys())[0]
+        final_decision = final_state[last_node_name].get('final_decision')
+        if final_decision:
+            print_final_decision(final_decision, stock_name, ticker, execution_time)
+            return True
+    print("⚠️ 工作流执行完毕，但未能生成最终交易决策。")
+    return False
+
+def report_step(step_count: int, step: dict) -> dict:
+    node_name = list(step.keys())[0]
+    update = step[node_name]
+    skipped = update.get("skipped_agents") if isinstance(update, dict) else None
+    reused = f"（输入未变化，复用: {', '.join(skipped)}）" if skipped else ""
+    print(f"✅ 步骤 {step_count}: 节点 '{node_name}' 执行完毕{reused}")
+    return step
+
+async def stream_graph_async(app, initial_state: dict, config: dict = None):
+    """以 astream 驱动异步模式的工作流图，返回最后一个节点的输出"""
+    final_state = None
+    step_count = 0
+    async for s in app.astream(initial_state, config):
+        step_count += 1
+        final_state = report_step(step_count, s)
+    return final_state
+
+def export_run_metrics(run_id: str):
+    """输出本次运行的LLM调用统计，并随性能报告一起导出"""
+    llm_metrics.log_run_summary(run_id)
+    logging.getLogger(__name__).info(f"LLM路由统计: {get_provider_router().stats()}")
+    for provider, stats in get_rate_governor().stats().items():
+        logging.getLogger(__name__).info(
+            f"限流统计 [{provider}]: 放行 {stats['granted']} 次，其中排队 {stats['throttled']} 次，"
+            f"平均等待 {stats['avg_wait']}s，p95 {stats['p95_wait']}s"
+        )
+    logging.getLogger(__name__).info(f"结构化输出解析统计: {repair_stats()}")
+    node_memo = get_node_memo()
+    if node_memo is not None:
+        logging.getLogger(__name__).info(f"节点记忆统计: {node_memo.stats()}")
+    report_path = project_root / "logs" / f"performance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    try:
+        global_monitor.export_performance_report(str(report_path))
     except Exception as e:
-        logger.error(f"发生未知错误: {e}", exc_info=True)
-        print(f"❌ 程序执行出现未知错误: {e}")
+        logging.getLogger(__name__).warning(f"导出性能报告失败: {e}")
+
+def load_watchlist(tickers_arg: str = None, watchlist_file: str = None) -> list:
+    """合并 --tickers（逗号或空格分隔）与自选股文件（每行一个代码，# 开头为注释）中的代码，去重并保持顺序"""
+    tickers = (tickers_arg or "").replace(",", " ").split()
+    if watchlist_file:
+        with open(watchlist_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    # 允许 "sh600519 贵州茅台" 这样带名称的行，只取第一列
+                    tickers.append(line.replace(",", " ").split()[0])
+    return list(dict.fromkeys(t.strip().lower() for t in tickers))
+
+async def analyze_ticker_async(app, ticker: str, ticker_limit: asyncio.Semaphore, run_id: str) -> dict:
+    """在共享的图与事件循环上分析一只股票，返回汇总表中的一行"""
+    row = {"ticker": ticker, "stock_name": "", "status": "失败", "action": "", "confidence": "",
+           "seconds": 0.0, "queued_seconds": 0.0, "skipped_agents": "", "error": "", "thread_id": f"{run_id}-{ticker}"}
+    queued_at = time.perf_counter()
+    async with ticker_limit:
+        start_time = time.perf_counter()
+        row["queued_seconds"] = round(start_time - queued_at, 2)
+        try:
+            if not is_valid_a_stock_code(ticker):
+                raise TradingSystemError("股票代码格式不正确")
+            # 代码名称表在进程内共享，只有第一只股票会真正下载
+            row["stock_name"] = await asyncio.to_thread(get_stock_name, ticker)
+            if not row["stock_name"]:
+                raise TradingSystemError("无法获取股票名称")
+            final_state = await app.ainvoke({"ticker": ticker, "stock_name": row["stock_name"]},
+                                            run_config(row["thread_id"]))
+            decision = final_state.get("final_decision")
+            if decision is None:
+                raise TradingSystemError("未能生成最终交易决策")
+            row.update(status="完成", action=decision.action, confidence=decision.confidence,
+                       skipped_agents=" ".join(final_state.get("skipped_agents") or []))
+        except Exception as e:
+            logging.getLogger(__name__).error(f"批量分析: {ticker} 失败: {e}", exc_info=not isinstance(e, TradingSystemError))
+            row["error"] = str(e)[:200]
+        row["seconds"] = round(time.perf_counter() - start_time, 2)
+    print(f"{'✅' if row['status'] == '完成' else '❌'} {ticker} {row['stock_name']}: "
+          f"{row['action'] or row['error']}（{row['seconds']:.1f} 秒）")
+    if row["status"] != "完成" and row["stock_name"] and app.checkpointer:
+        print(f"   💾 可运行 `python main.py --resume {row['thread_id']}` 从失败的节点继续")
+    return row
+
+async def _run_batch_async(app, tickers: list, max_concurrent_tickers: int, run_id: str) -> list:
+    # 股票级并发上限之外，LLM调用仍受共享并发信号量与提供商限流约束（见 async_limits.py、rate_governor.py）
+    ticker_limit = asyncio.Semaphore(max_concurrent_tickers)
+    return await asyncio.gather(*(analyze_ticker_async(app, ticker, ticker_limit, run_id) for ticker in tickers))
+
+def run_batch(tickers: list, max_concurrent_tickers: int) -> bool:
+    """
+    批量分析自选股：工作流图只编译一次，各股票在同一事件循环上并发运行，
+    共享LLM客户端、数据缓存与全市场数据表，最后输出一张决策汇总表。
+    """
+    logger = logging.getLogger(__name__)
+    if not tickers:
+        print("\n❌ 批量模式未提供任何股票代码。\n")
         return False
+    logger.info(f"--- 批量模式: {len(tickers)} 只股票，最多 {max_concurrent_tickers} 只并发 ---")
+    app = build_graph(async_mode=True, checkpointer=get_checkpointer())
+    run_id = llm_metrics.start_run()
+    start_time = time.perf_counter()
+    print(f"\n🚀 批量工作流启动: {len(tickers)} 只股票，股票级并发 {max_concurrent_tickers}")
+    rows = asyncio.run(_run_batch_async(app, tickers, max_concurrent_tickers, run_id))
+    elapsed = time.perf_counter() - start_time
+    by_ticker = llm_metrics.summarize(run_id)["by_ticker"]
+    for row in rows:
+        stats = by_ticker.get(row["ticker"], {})
+        row["llm_calls"] = stats.get("calls", 0)
+        row["llm_seconds"] = stats.get("total_latency", 0.0)
+        row["tokens"] = stats.get("prompt_tokens", 0) + stats.get("completion_tokens", 0)
+    export_run_metrics(run_id)
+    print_batch_summary(rows, elapsed)
+    write_batch_summary(rows, elapsed)
+    return any(row["status"] == "完成" for row in rows)
+
+def print_batch_summary(rows: list, elapsed: float):
+    completed = [row for row in rows if row["status"] == "完成"]
+    print("\n" + "="*100)
+    print("                   📋 自选股批量决策汇总")
+    print("="*100)
+    print(f"{'代码':<10}{'名称':<10}{'状态':<6}{'决策':<8}{'信心':>4}{'耗时(s)':>10}{'排队(s)':>10}{'LLM调用':>9}{'Token':>9}{'复用':>6}")
+    for row in rows:
+        print(f"{row['ticker']:<10}{row['stock_name'][:8]:<10}{row['status']:<6}{row['action']:<8}{str(row['confidence']):>4}"
+              f"{row['seconds']:>10.1f}{row['queued_seconds']:>10.1f}{row['llm_calls']:>9}{row['tokens']:>9}"
+              f"{len(row['skipped_agents'].split()):>6}")
+    print("-"*100)
+    throughput = len(completed) / elapsed * 3600 if elapsed else 0.0
+    print(f"完成 {len(completed)}/{len(rows)} 只，总耗时 {elapsed:.1f} 秒，吞吐量 {throughput:.1f} 只/小时")
+    print("="*100)
+    print("⚠️  风险提示: 以上分析由AI生成，仅供参考，不构成投资建议。")
+
+def write_batch_summary(rows: list, elapsed: float):
+    """把汇总表写入 logs/batch_summary_*.csv"""
+    path = project_root / "logs" / f"batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    fields = ["ticker", "stock_name", "status", "action", "confidence", "seconds", "queued_seconds",
+              "llm_calls", "llm_seconds", "tokens", "skipped_agents", "error"]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        completed = sum(1 for row in rows if row["status"] == "完成")
+        logging.getLogger(__name__).info(
+            f"批量汇总已写入 {path}（吞吐量 {completed / elapsed * 3600 if elapsed else 0.0:.1f} 只/小时）"
+        )
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"写入批量汇总失败: {e}")
 
 def print_final_decision(decision, stock_name, ticker, execution_time):
     print("\n" + "="*80)
@@ -95,9 +316,43 @@ def print_final_decision(decision, stock_name, ticker, execution_time):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="A股多智能体投研系统 V15.1 (最终修复版)")
     parser.add_argument("--ticker", type=str, default=TRADING_TICKER, help="要分析的股票代码")
+    parser.add_argument("--no-llm-cache", action="store_true", help="跳过LLM响应缓存，强制重新调用模型")
+    parser.add_argument("--stream", action="store_true", help="流式输出模式：智能体生成内容时实时打印到控制台")
+    parser.add_argument("--stream-file", type=str, default=None, help="流式输出同时写入该目录（每个智能体一个文件）")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用asyncio执行工作流（节点内以 ainvoke 并发调用LLM）")
+    parser.add_argument("--fake-llm", action="store_true", help="所有智能体改用离线模拟LLM（用于压测编排与并发，结果无投资意义）")
+    parser.add_argument("--tickers", type=str, default=None, help="批量模式：多个股票代码，逗号或空格分隔")
+    parser.add_argument("--watchlist-file", type=str, default=None, help="批量模式：自选股文件，每行一个股票代码")
+    parser.add_argument("--max-concurrent-tickers", type=int, default=BATCH_CONFIG.get("max_concurrent_tickers", 4),
+                        help="批量模式下同时分析的股票数量上限")
+    parser.add_argument("--resume", type=str, default=None, metavar="RUN_ID",
+                        help="从检查点恢复一次中断的运行，从第一个未完成的节点继续")
+    parser.add_argument("--serve", action="store_true", help="常驻服务模式：保持工作流图与客户端常驻，通过本地HTTP接口接收分析任务")
+    parser.add_argument("--host", type=str, default=None, help="服务模式的监听地址（默认 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=None, help="服务模式的监听端口（默认 8765）")
+    parser.add_argument("--max-concurrent-jobs", type=int, default=None,
+                        help="服务/worker模式下每个进程同时执行的任务数量上限（服务模式为0时只接收任务，由worker执行）")
+    parser.add_argument("--worker", action="store_true", help="worker模式：从持久化任务队列领取任务执行，可启动多个进程横向扩展")
+    parser.add_argument("--workers", type=int, default=None, help="worker模式下启动的进程数量（默认 1）")
     args = parser.parse_args()
     setup_logging()
+    if args.fake_llm:
+        set_provider_override("fake")
+    set_cache_bypass(args.no_llm_cache)
+    if args.stream or args.stream_file:
+        token_streaming.configure_from_config(console=args.stream, file_dir=args.stream_file)
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    success = main(ticker=args.ticker)
+    if args.serve:
+        success = serve(args.host, args.port, args.max_concurrent_jobs)
+    elif args.worker:
+        success = run_worker_pool(args.workers, args.max_concurrent_jobs,
+                                  initializer=init_worker_process, initargs=(args.fake_llm, args.no_llm_cache))
+    elif args.resume:
+        success = resume(args.resume, use_async=args.use_async)
+    elif args.tickers or args.watchlist_file:
+        # 批量模式总是使用异步执行路径，多只股票共享一个事件循环
+        success = run_batch(load_watchlist(args.tickers, args.watchlist_file), max(args.max_concurrent_tickers, 1))
+    else:
+        success = main(ticker=args.ticker, use_async=args.use_async)
     sys.exit(0 if success else 1)
\ No newline at end of file
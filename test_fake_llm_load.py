@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线压测脚本：所有智能体改用模拟LLM（fake），无需API Key与网络，
+并发为多只模拟股票执行全部智能体链，输出各智能体的延迟分布与解析/重试统计。
+
+用法示例：
+    python test_fake_llm_load.py --tickers 20 --time-scale 0.05 --failure-rate 0.05 --malformed-rate 0.2
+"""
+
+import sys
+import os
+import time
+import asyncio
+import logging
+import argparse
+from collections import defaultdict
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tradingagents.llms import set_provider_override, llm_client_factory
+from tradingagents.utils.error_handler import LLMSafetyWrapper
+from tradingagents.utils.output_repair import repair_stats
+from tradingagents.utils.rate_governor import get_rate_governor
+from tradingagents.agents.analysts.market_analyst import get_market_analyst
+from tradingagents.agents.analysts.fundamentals_analyst import get_fundamentals_analyst
+from tradingagents.agents.analysts.news_analyst import get_news_analyst
+from tradingagents.agents.analysts.policy_analyst import get_policy_analyst
+from tradingagents.agents.analysts.sector_analyst import get_sector_analyst
+from tradingagents.agents.analysts.social_media_analyst import get_social_media_analyst
+from tradingagents.agents.analysts.capital_flow_analyst import get_capital_flow_analyst
+from tradingagents.agents.researchers.bull_researcher import get_bull_researcher
+from tradingagents.agents.researchers.bear_researcher import get_bear_researcher
+from tradingagents.agents.managers.research_manager import get_research_manager
+from tradingagents.agents.managers.risk_manager import get_risk_manager
+from tradingagents.agents.trader.trader import get_trader_agent
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+AGENT_FACTORIES = {
+    "market_analyst": get_market_analyst,
+    "fundamentals_analyst": get_fundamentals_analyst,
+    "news_analyst": get_news_analyst,
+    "policy_analyst": get_policy_analyst,
+    "sector_analyst": get_sector_analyst,
+    "social_media_analyst": get_social_media_analyst,
+    "capital_flow_analyst": get_capital_flow_analyst,
+    "bull_researcher": get_bull_researcher,
+    "bear_researcher": get_bear_researcher,
+    "research_manager": get_research_manager,
+    "risk_manager": get_risk_manager,
+    "trader": get_trader_agent,
+}
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)] if samples else 0.0
+
+async def run_agent(name, chain, ticker, latencies, failures):
+    # 用股票代码填充Prompt中的全部变量，保证不同股票的Prompt互不相同
+    input_data = {var: f"{ticker} 的模拟{var}" for var in chain.first.input_variables}
+    start_time = time.perf_counter()
+    try:
+        await LLMSafetyWrapper.safe_ainvoke(chain, input_data, name, use_cache=False, ticker=ticker)
+        latencies[name].append(time.perf_counter() - start_time)
+    except Exception:
+        failures[name] += 1
+
+async def run_load_test(tickers: int):
+    chains = {name: factory() for name, factory in AGENT_FACTORIES.items()}
+    latencies, failures = defaultdict(list), defaultdict(int)
+    start_time = time.perf_counter()
+    await asyncio.gather(*(
+        run_agent(name, chain, f"sh6{i:05d}", latencies, failures)
+        for i in range(tickers) for name, chain in chains.items()
+    ))
+    return time.perf_counter() - start_time, latencies, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟LLM离线压测")
+    parser.add_argument("--tickers", type=int, default=10, help="并发模拟的股票数量")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="延迟缩放系数（1为真实时长）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="注入调用失败的比例")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="注入格式错误输出的比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    set_provider_override("fake")
+    llm = llm_client_factory()
+    llm.time_scale, llm.failure_rate, llm.malformed_rate, llm.seed = \
+        args.time_scale, args.failure_rate, args.malformed_rate, args.seed
+
+    print(f"🚀 开始离线压测: {args.tickers} 只股票 × {len(AGENT_FACTORIES)} 个智能体")
+    elapsed, latencies, failures = asyncio.run(run_load_test(args.tickers))
+
+    print(f"\n⏱️  总耗时: {elapsed:.2f} 秒")
+    print(f"{'智能体':<24}{'成功':>6}{'失败':>6}{'p50(s)':>10}{'p95(s)':>10}")
+    for name in AGENT_FACTORIES:
+        samples = latencies[name]
+        print(f"{name:<24}{len(samples):>6}{failures[name]:>6}"
+              f"{percentile(samples, 0.5):>10.3f}{percentile(samples, 0.95):>10.3f}")
+    print(f"\n📊 模拟模型统计: {llm.stats()}")
+    print(f"📊 结构化输出解析统计: {repair_stats()}")
+    print(f"📊 限流统计: {get_rate_governor().stats().get('fake', {})}")
+
+if __name__ == "__main__":
+    main()
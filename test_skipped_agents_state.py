@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线检查脚本：skipped_agents 状态在分支子图与检查点下不会重复计入。
+
+分支子图从父图继承当前的 skipped_agents 并返回完整列表，若归并函数直接相加，
+在已有状态的 thread 上再次运行时，之前的条目会被成倍重复。本脚本用与工作流相同的
+分支结构（子图 output_schema 含 skipped_agents）和本地SQLite检查点，在同一 thread
+上连续运行三次，检查列表不增长、无重复。无需API Key与网络。
+
+用法：
+    python test_skipped_agents_state.py
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from langgraph.graph import StateGraph, START, END
+from typing_extensions import TypedDict
+
+from tradingagents.utils.agent_states import AgentState
+from tradingagents.graph.checkpointer import SQLiteCheckpointSaver, run_config
+from tradingagents.graph.setup import SKIPPED_KEY
+
+def build_toy_graph(checkpointer):
+    """两个分支子图各自"复用"一个分析师，父图的交易员节点再复用一个"""
+    workflow = StateGraph(AgentState)
+    for name, agent in (("technical_branch", "market_analysis"), ("financial_branch", "fundamentals_analysis")):
+        branch = StateGraph(AgentState, output_schema=TypedDict(f"{name}_output", {
+            SKIPPED_KEY: AgentState.__annotations__[SKIPPED_KEY]
+        }))
+        branch.add_node("analyst", lambda state, agent=agent: {SKIPPED_KEY: [agent]})
+        branch.add_edge(START, "analyst")
+        branch.add_edge("analyst", END)
+        workflow.add_node(name, branch.compile())
+        workflow.add_edge(START, name)
+    workflow.add_node("trader", lambda state: {SKIPPED_KEY: ["trader"]})
+    workflow.add_edge(["technical_branch", "financial_branch"], "trader")
+    workflow.add_edge("trader", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_toy_graph(SQLiteCheckpointSaver(db_path=os.path.join(tmp, "checkpoints.db")))
+        config = run_config("skipped-agents-check")
+        runs = [app.invoke({"ticker": "sh600519", "stock_name": "贵州茅台"}, config)[SKIPPED_KEY] for _ in range(3)]
+
+    expected = {"market_analysis", "fundamentals_analysis", "trader"}
+    for index, skipped in enumerate(runs, 1):
+        print(f"第 {index} 次运行: {skipped}")
+    ok = all(len(skipped) == len(set(skipped)) and set(skipped) == expected for skipped in runs)
+    print("✅ 同一 thread 重复运行未重复计入跳过的智能体" if ok else "❌ skipped_agents 出现重复条目")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
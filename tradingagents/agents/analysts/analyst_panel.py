@@ -0,0 +1,86 @@
+# tradingagents/agents/analysts/analyst_panel.py - 分析师"合议"模式
+"""
+把若干位分析师的任务合并为一次结构化请求：公共的角色说明与格式说明只发送一次，
+每位分析师的情报作为一段独立的简报，模型在同一个JSON中分别写出各自的报告字段。
+适合输入很薄的分析师（如社交媒体、行业对比常常只拿到占位文本），重量级分析师仍单独调用。
+合议调用失败时，由调用方退回到逐个调用。
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field, create_model
+
+from tradingagents.llms.structured_output import build_structured_chain
+from tradingagents.utils.chain_utils import split_chain
+
+try:
+    from tradingagents.default_config import ANALYST_PANEL_CONFIG
+except ImportError:
+    ANALYST_PANEL_CONFIG = {}
+
+PANEL_KEY = "analyst_panel"
+DEFAULT_MEMBERS = ("social_media_analysis", "sector_analysis")
+
+ANALYST_PANEL_PROMPT = """你是一个由多位A股专家组成的分析小组，需要针对「{stock_name}」在一次回复中分别完成下面 {count} 份相互独立的分析报告。
+每份报告只依据其对应简报中的情报与要求撰写，彼此不要混用结论；情报不足时如实说明，不要编造。
+{format_instructions}
+{briefs}
+"""
+
+class AnalystPanel:
+    """把多位分析师合并为一次调用，并把结果拆回各自的报告模型"""
+
+    def __init__(self, members: Dict[str, Any]):
+        # members: {结果键: 该分析师的 `prompt | llm | parser` 链}
+        self.members = {}
+        fields = {}
+        for key, chain in members.items():
+            parts = split_chain(chain)
+            model = getattr(parts.parser, "pydantic_object", None) if parts else None
+            if model is None or "analysis" not in model.model_fields:
+                logging.warning(f"分析师合议: {key} 无法拆解为结构化链，仍单独调用")
+                continue
+            self.members[key] = (parts.prompt, model)
+            fields[key] = (str, Field(description=model.model_fields["analysis"].description))
+        self.report_model = create_model("AnalystPanelReport", **fields)
+        self.chain = build_structured_chain(ANALYST_PANEL_PROMPT, self.report_model, agent=PANEL_KEY)
+
+    def split(self, tasks: Dict[str, Tuple[Any, dict]]) -> Tuple[Dict[str, Tuple[Any, dict]], Dict[str, Tuple[Any, dict]]]:
+        """把分析师任务分为 (单独调用的任务, 合议成员的任务)"""
+        separate = {k: v for k, v in tasks.items() if k not in self.members}
+        merged = {k: v for k, v in tasks.items() if k in self.members}
+        return separate, merged
+
+    def _brief(self, key: str, data: dict) -> str:
+        """渲染某位分析师的原始Prompt作为简报，格式说明改为指向合议输出中的对应字段"""
+        prompt, _ = self.members[key]
+        prompt = prompt.partial(format_instructions=f"（本报告写入输出JSON的 `{key}` 字段，只需写报告正文）")
+        body = "\n".join(str(m.content) for m in prompt.format_messages(**data))
+        return f"=== 报告 `{key}` ===\n{body}"
+
+    def task(self, merged: Dict[str, Tuple[Any, dict]], stock_name: str) -> Tuple[Any, dict]:
+        """构建合议调用的 (链, 输入)"""
+        briefs = "\n\n".join(self._brief(key, data) for key, (_, data) in merged.items())
+        return self.chain, {"stock_name": stock_name, "count": len(merged), "briefs": briefs}
+
+    def unpack(self, report: BaseModel, merged: Dict[str, Tuple[Any, dict]]) -> Dict[str, BaseModel]:
+        """把合议结果拆回各分析师原有的报告模型"""
+        return {key: self.members[key][1](analysis=getattr(report, key)) for key in merged}
+
+def get_analyst_panel(analyst_chains: Dict[str, Any]) -> Optional[AnalystPanel]:
+    """按 ANALYST_PANEL_CONFIG 构建合议；未启用或成员不足两位时返回 None"""
+    if not ANALYST_PANEL_CONFIG.get("enabled", False):
+        return None
+    members = ANALYST_PANEL_CONFIG.get("members", DEFAULT_MEMBERS)
+    if members == "all":
+        members = list(analyst_chains)
+    chains = {key: analyst_chains[key] for key in members if key in analyst_chains}
+    if len(chains) < 2:
+        logging.warning(f"分析师合议: 有效成员不足两位 ({list(chains)})，不启用合议模式")
+        return None
+    panel = AnalystPanel(chains)
+    if len(panel.members) < 2:
+        return None
+    logging.info(f"分析师合议: 已启用，合并调用 {list(panel.members)}")
+    return panel
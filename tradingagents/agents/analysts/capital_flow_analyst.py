@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class CapitalFlowAnalysis(BaseModel):
     analysis: str = Field(description="一份关于该股票资金博弈情况的专业分析报告。")
@@ -20,10 +18,4 @@ CAPITAL_FLOW_ANALYST_PROMPT = """你是一名顶尖的A股资金分析专家。
 """
 
 def get_capital_flow_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=CapitalFlowAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        CAPITAL_FLOW_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(CAPITAL_FLOW_ANALYST_PROMPT, CapitalFlowAnalysis, agent="capital_flow_analyst")
\ No newline at end of file
@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class FundamentalsAnalysis(BaseModel):
     analysis: str = Field(description="一份关于公司基本面的深度分析报告。")
@@ -19,10 +17,4 @@ FUNDAMENTALS_ANALYST_PROMPT = """你是一名顶尖的A股市场基本面分析
 """
 
 def get_fundamentals_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=FundamentalsAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        FUNDAMENTALS_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(FUNDAMENTALS_ANALYST_PROMPT, FundamentalsAnalysis, agent="fundamentals_analyst")
\ No newline at end of file
@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class MarketAnalysis(BaseModel):
     analysis: str = Field(description="一份包含常规技术分析和缠论分析的报告。")
@@ -19,10 +17,4 @@ MARKET_ANALYST_PROMPT = """你是一名顶级的A股技术分析大师，既精
 """
 
 def get_market_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=MarketAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        MARKET_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(MARKET_ANALYST_PROMPT, MarketAnalysis, agent="market_analyst")
\ No newline at end of file
@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class NewsAnalysis(BaseModel):
     analysis: str = Field(description="一份关于最新相关新闻的综合报告。")
@@ -19,10 +17,4 @@ NEWS_ANALYST_PROMPT = """你是一名嗅觉敏锐的财经新闻分析师。你
 """
 
 def get_news_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=NewsAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        NEWS_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(NEWS_ANALYST_PROMPT, NewsAnalysis, agent="news_analyst")
\ No newline at end of file
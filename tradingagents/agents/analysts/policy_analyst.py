@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class PolicyAnalysis(BaseModel):
     analysis: str = Field(description="一份关于政策及其跨行业影响的深度分析报告。")
@@ -19,10 +17,4 @@ POLICY_ANALYST_PROMPT = """你是一位顶级的中国产业政策分析专家
 """
 
 def get_policy_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=PolicyAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        POLICY_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(POLICY_ANALYST_PROMPT, PolicyAnalysis, agent="policy_analyst")
\ No newline at end of file
@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class SectorAnalysis(BaseModel):
     analysis: str = Field(description="一份关于该股票行业地位和对标情况的专业分析报告。")
@@ -20,10 +18,4 @@ SECTOR_ANALYST_PROMPT = """你是一名顶尖的A股行业分析师。你的任
 """
 
 def get_sector_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=SectorAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        SECTOR_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(SECTOR_ANALYST_PROMPT, SectorAnalysis, agent="sector_analyst")
\ No newline at end of file
@@ -1,7 +1,5 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
 
 class SocialMediaAnalysis(BaseModel):
     analysis: str = Field(description="一份关于该股票市场情绪的专业分析报告。")
@@ -20,10 +18,4 @@ SOCIAL_MEDIA_ANALYST_PROMPT = """你是一名深谙A股散户心理的舆情分
 """
 
 def get_social_media_analyst(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=SocialMediaAnalysis)
-    llm = llm_client_factory()
-    prompt = ChatPromptTemplate.from_template(
-        SOCIAL_MEDIA_ANALYST_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
\ No newline at end of file
+    return build_structured_chain(SOCIAL_MEDIA_ANALYST_PROMPT, SocialMediaAnalysis, agent="social_media_analyst")
\ No newline at end of file
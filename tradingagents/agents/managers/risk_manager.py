@@ -1,27 +1,14 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 import logging
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
+from tradingagents.agents.shared_briefing import DEBATE_BRIEFING
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-RISK_MANAGER_PROMPT = """你是一名极其审慎和专业的A股风险管理经理。你的任务是基于“投研会议纪要”，识别所有潜在风险，并对即将形成的交易策略进行压力测试。
+# 共享的会议纪要在前（与多头、空头的Prompt前缀一致），角色说明在后
+RISK_MANAGER_PROMPT = DEBATE_BRIEFING + """
+你是一名极其审慎和专业的A股风险管理经理。你的任务是基于上面的“投研会议纪要”，识别所有潜在风险，并对即将形成的交易策略进行压力测试。
 {format_instructions}
-**你收到的“投研会议纪要”核心内容如下：**
----
-**关键的【共识点】(Confirmations):**
-{key_confirmations}
----
-**关键的【矛盾点】(Contradictions):**
-{key_contradictions}
----
-**核心看多理由 (Bull Case):**
-{bull_case}
----
-**核心看空理由 (Bear Case):**
-{bear_case}
----
 **你的风险审查报告必须完成以下任务：**
 1.  **评估【矛盾点】中的核心风险**: “矛盾点”往往是最大的风险来源。
 2.  **质疑【共识点】的脆弱性**: 即使是“共识点”，也可能存在被市场过度解读或证伪的风险。
@@ -32,6 +19,8 @@ RISK_MANAGER_PROMPT = """你是一名极其审慎和专业的A股风险管理经
 """
 
 class RiskManagerInput(BaseModel):
+    ticker: str
+    stock_name: str
     key_confirmations: str
     key_contradictions: str
     bull_case: str
@@ -42,10 +31,4 @@ class RiskAnalysis(BaseModel):
     analysis: str = Field(description="一份完整的、结构化的最终风险审查报告，必须包含风险评级和具体的风险点分析。")
 
 def get_risk_manager(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=RiskAnalysis)
-    llm = llm_client_factory()
-    prompt_template = ChatPromptTemplate.from_template(
-        RISK_MANAGER_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt_template | llm | parser
\ No newline at end of file
+    return build_structured_chain(RISK_MANAGER_PROMPT, RiskAnalysis, agent="risk_manager")
\ No newline at end of file
@@ -1,24 +1,14 @@
 from pydantic import BaseModel, Field
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 import logging
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
+from tradingagents.agents.shared_briefing import DEBATE_BRIEFING
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-BULL_RESEARCHER_PROMPT = """你是一名坚定、乐观且逻辑严密的A股“多头论证官”。你的任务是基于研究主管的“投研会议纪要”，构建一份详尽且极具说服力的最终看多报告。
+# 共享的会议纪要在前（与空头、风控的Prompt前缀一致），角色说明在后
+BULL_RESEARCHER_PROMPT = DEBATE_BRIEFING + """
+你是一名坚定、乐观且逻辑严密的A股“多头论证官”。你的任务是基于上面的“投研会议纪要”，以其中的“核心看多理由”为立论基础，构建一份详尽且极具说服力的最终看多报告。
 {format_instructions}
-**你收到的“投研会议纪要”核心内容如下：**
----
-**核心看多理由 (Bull Case):**
-{bull_case_points}
----
-**关键的【共识点】(Confirmations):**
-{key_confirmations}
----
-**关键的【矛盾点】(Contradictions):**
-{key_contradictions}
----
 **你的最终看多报告必须完成以下任务：**
 1.  **强化【共识点】**: 将“共识点”作为你最强有力的证据。
 2.  **回应【矛盾点】**: **这是你辩论的核心**。你必须正面回应“矛盾点”。
@@ -31,19 +21,14 @@ BULL_RESEARCHER_PROMPT = """你是一名坚定、乐观且逻辑严密的A股“
 class BullishArgumentInput(BaseModel):
     ticker: str = Field()
     stock_name: str = Field()
-    bull_case_points: str = Field()
     key_confirmations: str = Field()
     key_contradictions: str = Field()
+    bull_case: str = Field()
+    bear_case: str = Field()
 
 class BullishReport(BaseModel):
     # [核心修正] 将字段名从 report 修改为 analysis，与其他分析师统一
     analysis: str = Field(description="一份结构化的、包含对矛盾点回应的最终看多报告。")
 
 def get_bull_researcher(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=BullishReport)
-    llm = llm_client_factory()
-    prompt_template = ChatPromptTemplate.from_template(
-        BULL_RESEARCHER_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt_template | llm | parser
\ No newline at end of file
+    return build_structured_chain(BULL_RESEARCHER_PROMPT, BullishReport, agent="bull_researcher")
\ No newline at end of file
@@ -0,0 +1,53 @@
+# tradingagents/agents/shared_briefing.py - 多个智能体共用的简报前缀
+"""
+多头、空头与风控拿到的是同一份“投研会议纪要”，研究主管与首席投资官读的是同一组分析师报告。
+这些共用内容放在各自Prompt的最前面并保持逐字节一致，角色说明与格式说明等各智能体独有的部分
+放在其后。提供商的前缀缓存（Gemini、DashScope 对相同的Prompt前缀自动命中）由此可以复用
+前一次调用已处理过的输入，降低首Token延迟与输入费用；离线模拟模型也会按前缀模拟缓存命中。
+提供商通常要等首个请求完成预填充后才能命中其前缀，同时发出的多头/空头/风控请求不一定命中，
+顺序执行的研究主管 → 首席投资官、重试与对冲请求则稳定受益。
+注意：前缀中的变量只能来自共享输入，任何智能体专属的内容都不能出现在前缀里。
+"""
+
+from typing import Dict
+
+# 多头 / 空头 / 风控 共用的会议纪要前缀
+DEBATE_BRIEFING = """以下是关于「{stock_name}」({ticker})的“投研会议纪要”，由研究主管整合7位分析师的报告形成，供多头、空头与风控团队共同使用。
+---
+**关键的【共识点】(Confirmations):**
+{key_confirmations}
+---
+**关键的【矛盾点】(Contradictions):**
+{key_contradictions}
+---
+**核心看多理由 (Bull Case):**
+{bull_case}
+---
+**核心看空理由 (Bear Case):**
+{bear_case}
+---
+"""
+
+# 研究主管 / 首席投资官 共用的投研简报前缀，{analyst_briefing} 由 render_analyst_briefing 渲染
+ANALYST_BRIEFING = """以下是关于「{stock_name}」({ticker})的《投研简报》，包含7位专业分析师提交的独立报告。
+---
+{analyst_briefing}
+---
+"""
+
+ANALYST_REPORT_TITLES = {
+    "fundamentals_analysis": "基本面分析师报告 (关注内在价值与估值)",
+    "market_analysis": "\"双核\"技术分析师报告 (结合常规指标与缠论)",
+    "news_analysis": "AI新闻智能体报告 (关注最新事件催化剂)",
+    "capital_flow_analysis": "资金流向分析师报告 (关注“聪明钱”的动向)",
+    "sector_analysis": "行业对标分析师报告 (关注股票在行业中的相对强弱)",
+    "policy_analysis": "政策分析师报告 (关注宏观与跨行业驱动力)",
+    "social_media_analysis": "情绪分析师报告 (关注市场人气与散户动向)",
+}
+
+def render_analyst_briefing(reports: Dict[str, str]) -> str:
+    """按固定顺序与标题渲染7份分析师报告；同样的报告总是得到同样的文本"""
+    return "\n---\n".join(
+        f"**{index}. {title}:**\n{reports.get(key) or '（该分析师未能提交报告）'}"
+        for index, (key, title) in enumerate(ANALYST_REPORT_TITLES.items(), 1)
+    )
@@ -1,10 +1,9 @@
 # tradingagents/agents/trader/trader.py (V5.0 首席投资官)
 from pydantic import BaseModel, Field
 from typing import Literal
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 import logging
-from tradingagents.llms import llm_client_factory
+from tradingagents.llms.structured_output import build_structured_chain
+from tradingagents.agents.shared_briefing import ANALYST_BRIEFING
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -18,24 +17,22 @@ class TradePlan(BaseModel):
     position_sizing: str = Field(description="仓位管理建议。")
 
 # --- [核心升级] 全新的、赋予独立思考能力的Prompt ---
-TRADER_PROMPT = """
-你是一名以实现最终盈利为唯一目标的A股首席投资官(CIO)。你的桌上现在有关于「{stock_name}」({ticker})的**全部情报**，包括一份包含7位专家报告的《投研简报》，一份《多空辩论纪要》，以及一份《最终风险评估》。
+# 《投研简报》在前（与研究主管的Prompt前缀一致，可命中提供商的前缀缓存），其余情报在后
+TRADER_PROMPT = ANALYST_BRIEFING + """
+你是一名以实现最终盈利为唯一目标的A股首席投资官(CIO)。你的桌上现在有关于「{stock_name}」({ticker})的**全部情报**，包括上面包含7位专家报告的《投研简报》，一份《多空辩论纪要》，以及一份《最终风险评估》。
 
 {format_instructions}
 
 **[当前盘面]**
 * **最新收盘价**: **{latest_close_price}元**
 
-**[情报汇总]**
+**[其余情报]**
 ---
-**1. 完整的《投研简报》(包含全部7份原始分析报告):**
-{full_briefing_book}
----
-**2. 《多空辩论纪要》:**
+**1. 《多空辩论纪要》:**
 * **多头最终陈词:** {bull_report}
 * **空头最终陈词:** {bear_report}
 ---
-**3. 《最终风险评估》:**
+**2. 《最终风险评估》:**
 {risk_report}
 ---
 
@@ -49,11 +46,4 @@ TRADER_PROMPT = """
 """
 
 def get_trader_agent(llm_provider: str = None):
-    parser = PydanticOutputParser(pydantic_object=TradePlan)
-    llm = llm_client_factory()
-    prompt_template = ChatPromptTemplate.from_template(
-        TRADER_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    chain = (prompt_template | llm | parser)
-    return chain
\ No newline at end of file
+    return build_structured_chain(TRADER_PROMPT, TradePlan, agent="trader")
\ No newline at end of file
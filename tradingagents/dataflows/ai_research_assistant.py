@@ -18,7 +18,9 @@ import signal
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from tradingagents.llms import llm_client_factory
 from .akshare_utils import get_financial_metrics_for_analysis
-from tradingagents.default_config import TAVILY_CONFIG, ANALYSIS_LLM_PROVIDER
+from .news_store import get_news_store
+from tradingagents.utils.rate_governor import get_rate_governor, llm_lease
+from tradingagents.default_config import TAVILY_CONFIG
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -47,6 +49,9 @@ def with_timeout(seconds):
         return wrapper
     return decorator
 
+# analyze_stock_impact 失败时返回的占位原因，这类结果不写入本地新闻存储
+_FALLBACK_IMPACT_REASONS = {"需要进一步分析", "分析失败"}
+
 class StockPriceImpact(BaseModel):
     """股价影响分析"""
     impact_level: str = Field(description="影响程度：重大利好/利好/中性/利空/重大利空")
@@ -130,7 +135,7 @@ class ComprehensiveReport(BaseModel):
 class EnhancedTavilySearcher:
     """增强版Tavily搜索封装类"""
     
-    def __init__(self):
+    def __init__(self, scope: Optional[str] = None):
         api_key = TAVILY_CONFIG.get("api_key")
         if not api_key or "tvly-" not in api_key:
             raise ValueError("Tavily API密钥未正确配置，请在default_config.py中设置")
@@ -138,6 +143,7 @@ class EnhancedTavilySearcher:
         self.client = TavilyClient(api_key=api_key)
         self.search_depth = TAVILY_CONFIG.get("search_depth", "advanced")
         self.max_results = TAVILY_CONFIG.get("max_results", 10)  # 增加结果数量
+        self.scope = scope  # 限流排队的分组（通常为股票代码）
         logging.info("增强版Tavily搜索客户端初始化成功")
     
     def get_comprehensive_domains(self) -> List[str]:
@@ -266,13 +272,14 @@ class EnhancedTavilySearcher:
     def _execute_search(self, query: str, days: int) -> dict:
         """执行实际的搜索操作"""
         try:
-            response = self.client.search(
-                query=query,
-                search_depth=self.search_depth,
-                max_results=5,
-                include_domains=self.get_comprehensive_domains(),
-                days=days
-            )
+            with get_rate_governor().lease("tavily", self.scope):
+                response = self.client.search(
+                    query=query,
+                    search_depth=self.search_depth,
+                    max_results=5,
+                    include_domains=self.get_comprehensive_domains(),
+                    days=days
+                )
             return response
         except Exception as e:
             logging.error(f"Tavily搜索失败: {e}")
@@ -338,7 +345,7 @@ def extract_date_from_content(content: str, title: str) -> str:
     
     return current_date.strftime('%Y-%m-%d')
 
-def analyze_stock_impact(news_content: str, stock_name: str, llm) -> StockPriceImpact:
+def analyze_stock_impact(news_content: str, stock_name: str, llm, ticker: Optional[str] = None) -> StockPriceImpact:
     """分析新闻对股价的影响"""
     try:
         impact_prompt = f"""
@@ -355,7 +362,8 @@ def analyze_stock_impact(news_content: str, stock_name: str, llm) -> StockPriceI
         请用JSON格式返回，包含impact_level, impact_reason, expected_price_change, confidence_level字段。
         """
         
-        response = llm.invoke(impact_prompt)
+        with llm_lease(llm, ticker, impact_prompt):
+            response = llm.invoke(impact_prompt)
         
         # 尝试解析JSON响应
         try:
@@ -423,8 +431,8 @@ def calculate_sentiment_score(content: str, title: str) -> float:
     
     return round(sentiment_score, 2)
 
-def extract_enhanced_news_from_search(search_results: Dict[str, Any], stock_name: str, llm) -> List[AnalyzedNewsArticle]:
-    """从搜索结果中提取增强版新闻信息 - 时间过滤优化版"""
+def extract_enhanced_news_from_search(search_results: Dict[str, Any], stock_name: str, llm, ticker: Optional[str] = None) -> List[AnalyzedNewsArticle]:
+    """从搜索结果中提取增强版新闻信息 - 时间过滤优化版（传入ticker时复用本地已分析结果）"""
     news_articles = []
     current_date = datetime.now()
     
@@ -443,13 +451,34 @@ def extract_enhanced_news_from_search(search_results: Dict[str, Any], stock_name
             seen_urls.add(url)
             unique_results.append(result)
     
+    # 查询本地存储中已分析过的URL，只有未见过的新闻才会交给LLM
+    candidates = unique_results[:12]  # 增加候选数量，用于时间过滤
+    news_store = get_news_store() if ticker else None
+    stored_articles = {}
+    if news_store:
+        try:
+            stored_articles = news_store.get_fresh(ticker, [r.get("url", "") for r in candidates])
+        except Exception as e:
+            logging.warning(f"读取本地新闻存储失败: {e}")
+    reused_count = 0
+    
     # 处理每条新闻，增加时间过滤
-    for result in unique_results[:12]:  # 增加候选数量，用于时间过滤
+    for result in candidates:
         try:
             content = result.get("content", "")
             title = result.get("title", "未知标题")
             url = result.get("url", "")
             
+            if url in stored_articles:
+                try:
+                    news_articles.append(AnalyzedNewsArticle(**stored_articles[url]))
+                    reused_count += 1
+                    if len(news_articles) >= 8:
+                        break
+                    continue
+                except Exception as e:
+                    logging.warning(f"本地存储的新闻记录无效，将重新分析: {e}")
+            
             if not content or len(content) < 50:  # 过滤内容过短的结果
                 continue
             
@@ -475,7 +504,7 @@ def extract_enhanced_news_from_search(search_results: Dict[str, Any], stock_name
                 days_diff = 0
             
             # 分析股价影响
-            stock_impact = analyze_stock_impact(content, stock_name, llm)
+            stock_impact = analyze_stock_impact(content, stock_name, llm, ticker)
             
             # 提取关键词
             keywords = extract_keywords_from_content(content, title)
@@ -501,6 +530,12 @@ def extract_enhanced_news_from_search(search_results: Dict[str, Any], stock_name
             )
             news_articles.append(article)
             
+            if news_store and stock_impact.impact_reason not in _FALLBACK_IMPACT_REASONS:
+                try:
+                    news_store.save(ticker, url, article.model_dump())
+                except Exception as e:
+                    logging.warning(f"写入本地新闻存储失败: {e}")
+            
             # 限制最终返回的新闻数量（优先返回最近的新闻）
             if len(news_articles) >= 8:
                 break
@@ -508,246 +543,276 @@ def extract_enhanced_news_from_search(search_results: Dict[str, Any], stock_name
         except Exception as e:
             logging.warning(f"处理搜索结果时出错: {e}")
     
+    if news_store:
+        logging.info(f"新闻分析: 复用本地已分析结果 {reused_count} 条，新分析 {len(news_articles) - reused_count} 条")
+    
     # 按时间排序，最近的新闻排在前面
     news_articles.sort(key=lambda x: datetime.strptime(x.publication_date, '%Y-%m-%d'), reverse=True)
     
     return news_articles[:8]  # 返回最多8条新闻
 
-def get_enhanced_data_by_ai_assistant(ticker: str, stock_name: str) -> ComprehensiveReport:
-    """增强版AI研究助理 - 获取全面数据并分析股价关联性"""
-    logging.info(f"--- 启动增强版AI研究员 for {stock_name} ---")
+# 综合报告中的定性总结
+REPORT_NARRATIVES = {
+    "market_sentiment_summary": "基于新闻分析，市场情绪整体中性偏乐观",
+    "analyzed_policy": "政策环境相对稳定，有利于行业发展",
+    "capital_flow_summary": "资金流向显示机构关注度较高",
+    "industry_trends": "行业发展趋势向好，技术创新推动增长",
+    "risk_factors": ["市场竞争加剧", "政策变化风险", "技术更新风险"],
+    "investment_recommendation": "建议关注公司基本面变化，适时调整投资策略",
+}
+
+def search_stock_intelligence(searcher: EnhancedTavilySearcher, stock_name: str, ticker: str) -> Dict[str, Any]:
+    """多策略搜索该股票的新闻与资讯，超时时退回单次基础搜索"""
+    logging.info("正在执行多策略搜索...")
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(searcher.search_with_multiple_strategies, stock_name, ticker, 60)
+            all_search_results = future.result(timeout=120)  # 总搜索超时2分钟
+            logging.info("多策略搜索完成")
+    except FutureTimeoutError:
+        logging.error("多策略搜索超时，使用备用搜索")
+        # 备用搜索：只搜索基本信息
+        all_search_results = {
+            "fundamental": [],
+            "market": [],
+            "policy": [],
+            "competition": [],
+            "risk": []
+        }
+        # 尝试单个搜索
+        try:
+            basic_result = searcher.search(f'"{stock_name}" {ticker} 最新', days=30)
+            if basic_result and basic_result.get('results'):
+                all_search_results["fundamental"] = basic_result.get('results', [])
+        except Exception as e:
+            logging.warning(f"备用搜索也失败: {e}")
+    return all_search_results
+
+def get_financial_snapshot(ticker: str, stock_name: str, searcher: EnhancedTavilySearcher):
+    """拉取最新财务指标并通过Tavily搜索补充缺失项，返回 (指标字典, 财务概览文本)"""
+    # 获取最新财务指标（实时/最近季度）- 多重备份策略
+    logging.info("正在拉取最新财务指标用于估值与盈利质量分析...")
+    metrics_dict = get_financial_metrics_for_analysis(ticker)
     
+    # 通过Tavily搜索补充财务数据（作为备份）- 增强版
+    logging.info("正在通过Tavily搜索补充财务数据...")
     try:
-        # 初始化增强版搜索器
-        searcher = EnhancedTavilySearcher()
-        
-        # 使用多策略搜索获取全面信息（带超时保护）
-        logging.info("正在执行多策略搜索...")
+        # 策略1：专门搜索估值指标（带超时保护）
+        pe_pb_results = None
         try:
             with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(searcher.search_with_multiple_strategies, stock_name, ticker, 60)
-                all_search_results = future.result(timeout=120)  # 总搜索超时2分钟
-                logging.info("多策略搜索完成")
+                future = executor.submit(searcher.search, 
+                                       f'"{stock_name}" {ticker} 市盈率 市净率 PE PB 估值 股价 2025年最新', 60)
+                pe_pb_results = future.result(timeout=30)  # 30秒超时
         except FutureTimeoutError:
-            logging.error("多策略搜索超时，使用备用搜索")
-            # 备用搜索：只搜索基本信息
-            all_search_results = {
-                "fundamental": [],
-                "market": [],
-                "policy": [],
-                "competition": [],
-                "risk": []
-            }
-            # 尝试单个搜索
-            try:
-                basic_result = searcher.search(f'"{stock_name}" {ticker} 最新', days=30)
-                if basic_result and basic_result.get('results'):
-                    all_search_results["fundamental"] = basic_result.get('results', [])
-            except Exception as e:
-                logging.warning(f"备用搜索也失败: {e}")
-        
-        # 初始化LLM客户端
-        llm = llm_client_factory(provider=ANALYSIS_LLM_PROVIDER)
-        
-        # 获取最新财务指标（实时/最近季度）- 多重备份策略
-        logging.info("正在拉取最新财务指标用于估值与盈利质量分析...")
-        metrics_dict = get_financial_metrics_for_analysis(ticker)
+            logging.warning("PE/PB搜索超时")
         
-        # 通过Tavily搜索补充财务数据（作为备份）- 增强版
-        logging.info("正在通过Tavily搜索补充财务数据...")
+        # 策略2：搜索财务数据摘要（带超时保护）
+        financial_summary_results = None
         try:
-            # 策略1：专门搜索估值指标（带超时保护）
-            pe_pb_results = None
-            try:
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(searcher.search, 
-                                           f'"{stock_name}" {ticker} 市盈率 市净率 PE PB 估值 股价 2025年最新', 60)
-                    pe_pb_results = future.result(timeout=30)  # 30秒超时
-            except FutureTimeoutError:
-                logging.warning("PE/PB搜索超时")
-            
-            # 策略2：搜索财务数据摘要（带超时保护）
-            financial_summary_results = None
-            try:
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(searcher.search,
-                                           f'"{stock_name}" 600600 财务分析 盈利能力 市值 投资价值 最新财报', 90)
-                    financial_summary_results = future.result(timeout=30)  # 30秒超时
-            except FutureTimeoutError:
-                logging.warning("财务摘要搜索超时")
-            
-            # 合并搜索结果
-            all_financial_results = []
-            if pe_pb_results and 'results' in pe_pb_results:
-                all_financial_results.extend(pe_pb_results['results'][:5])
-            if financial_summary_results and 'results' in financial_summary_results:
-                all_financial_results.extend(financial_summary_results['results'][:5])
-            
-            # 从搜索结果中提取财务相关信息
-            pe_found = False
-            pb_found = False
-            
-            for result in all_financial_results:
-                content = result.get('content', '')
-                title = result.get('title', '')
-                combined_text = f"{title} {content}".lower()
-                
-                logging.debug(f"分析搜索结果: {title[:50]}...")
-                
-                # 更精确的PE提取
-                if not pe_found:
-                    # 匹配多种PE格式
-                    pe_patterns = [
-                        r'市盈率[：:\s]*(\d+\.?\d*)',
-                        r'PE[：:\s]*(\d+\.?\d*)',
-                        r'pe[：:\s]*(\d+\.?\d*)',
-                        r'P/E[：:\s]*(\d+\.?\d*)',
-                        r'动态市盈率[：:\s]*(\d+\.?\d*)',
-                        r'静态市盈率[：:\s]*(\d+\.?\d*)',
-                        r'市盈率\(TTM\)[：:\s]*(\d+\.?\d*)',
-                        r'市盈率（TTM）[：:\s]*(\d+\.?\d*)'
-                    ]
-                    
-                    for pattern in pe_patterns:
-                        pe_match = re.search(pattern, combined_text)
-                        if pe_match:
-                            try:
-                                pe_value = float(pe_match.group(1))
-                                if 0 < pe_value < 1000:  # 合理范围检查
-                                    metrics_dict['pe_ttm'] = pe_value
-                                    pe_found = True
-                                    logging.info(f"通过Tavily成功提取PE: {pe_value}")
-                                    break
-                            except ValueError:
-                                continue
-                
-                # 更精确的PB提取
-                if not pb_found:
-                    # 匹配多种PB格式
-                    pb_patterns = [
-                        r'市净率[：:\s]*(\d+\.?\d*)',
-                        r'PB[：:\s]*(\d+\.?\d*)',
-                        r'pb[：:\s]*(\d+\.?\d*)',
-                        r'P/B[：:\s]*(\d+\.?\d*)',
-                        r'市帐率[：:\s]*(\d+\.?\d*)'
-                    ]
-                    
-                    for pattern in pb_patterns:
-                        pb_match = re.search(pattern, combined_text)
-                        if pb_match:
-                            try:
-                                pb_value = float(pb_match.group(1))
-                                if 0 < pb_value < 100:  # 合理范围检查
-                                    metrics_dict['pb'] = pb_value
-                                    pb_found = True
-                                    logging.info(f"通过Tavily成功提取PB: {pb_value}")
-                                    break
-                            except ValueError:
-                                continue
-                
-                # 提取其他财务指标
-                # 净利润提取
-                net_profit_patterns = [
-                    r'净利润[：:\s]*(\d+\.?\d*)([万亿千百]?)',
-                    r'归母净利润[：:\s]*(\d+\.?\d*)([万亿千百]?)',
-                    r'净利[：:\s]*(\d+\.?\d*)([万亿千百]?)'
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(searcher.search,
+                                       f'"{stock_name}" 600600 财务分析 盈利能力 市值 投资价值 最新财报', 90)
+                financial_summary_results = future.result(timeout=30)  # 30秒超时
+        except FutureTimeoutError:
+            logging.warning("财务摘要搜索超时")
+        
+        # 合并搜索结果
+        all_financial_results = []
+        if pe_pb_results and 'results' in pe_pb_results:
+            all_financial_results.extend(pe_pb_results['results'][:5])
+        if financial_summary_results and 'results' in financial_summary_results:
+            all_financial_results.extend(financial_summary_results['results'][:5])
+        
+        # 从搜索结果中提取财务相关信息
+        pe_found = False
+        pb_found = False
+        
+        for result in all_financial_results:
+            content = result.get('content', '')
+            title = result.get('title', '')
+            combined_text = f"{title} {content}".lower()
+            
+            logging.debug(f"分析搜索结果: {title[:50]}...")
+            
+            # 更精确的PE提取
+            if not pe_found:
+                # 匹配多种PE格式
+                pe_patterns = [
+                    r'市盈率[：:\s]*(\d+\.?\d*)',
+                    r'PE[：:\s]*(\d+\.?\d*)',
+                    r'pe[：:\s]*(\d+\.?\d*)',
+                    r'P/E[：:\s]*(\d+\.?\d*)',
+                    r'动态市盈率[：:\s]*(\d+\.?\d*)',
+                    r'静态市盈率[：:\s]*(\d+\.?\d*)',
+                    r'市盈率\(TTM\)[：:\s]*(\d+\.?\d*)',
+                    r'市盈率（TTM）[：:\s]*(\d+\.?\d*)'
                 ]
                 
-                for pattern in net_profit_patterns:
-                    np_match = re.search(pattern, combined_text)
-                    if np_match and 'net_profit' not in metrics_dict:
+                for pattern in pe_patterns:
+                    pe_match = re.search(pattern, combined_text)
+                    if pe_match:
                         try:
-                            base_value = float(np_match.group(1))
-                            unit = np_match.group(2) if len(np_match.groups()) > 1 else ''
-                            
-                            # 单位转换
-                            if '亿' in unit:
-                                final_value = base_value * 100000000
-                            elif '万' in unit:
-                                final_value = base_value * 10000
-                            else:
-                                final_value = base_value
-                            
-                            metrics_dict['net_profit'] = final_value
-                            logging.info(f"通过Tavily提取净利润: {final_value}")
-                            break
+                            pe_value = float(pe_match.group(1))
+                            if 0 < pe_value < 1000:  # 合理范围检查
+                                metrics_dict['pe_ttm'] = pe_value
+                                pe_found = True
+                                logging.info(f"通过Tavily成功提取PE: {pe_value}")
+                                break
                         except ValueError:
                             continue
-                
-                # 营收提取
-                revenue_patterns = [
-                    r'营收[：:\s]*(\d+\.?\d*)([万亿千百]?)',
-                    r'营业收入[：:\s]*(\d+\.?\d*)([万亿千百]?)',
-                    r'总营收[：:\s]*(\d+\.?\d*)([万亿千百]?)'
+            
+            # 更精确的PB提取
+            if not pb_found:
+                # 匹配多种PB格式
+                pb_patterns = [
+                    r'市净率[：:\s]*(\d+\.?\d*)',
+                    r'PB[：:\s]*(\d+\.?\d*)',
+                    r'pb[：:\s]*(\d+\.?\d*)',
+                    r'P/B[：:\s]*(\d+\.?\d*)',
+                    r'市帐率[：:\s]*(\d+\.?\d*)'
                 ]
                 
-                for pattern in revenue_patterns:
-                    rev_match = re.search(pattern, combined_text)
-                    if rev_match and 'revenue' not in metrics_dict:
+                for pattern in pb_patterns:
+                    pb_match = re.search(pattern, combined_text)
+                    if pb_match:
                         try:
-                            base_value = float(rev_match.group(1))
-                            unit = rev_match.group(2) if len(rev_match.groups()) > 1 else ''
-                            
-                            # 单位转换
-                            if '亿' in unit:
-                                final_value = base_value * 100000000
-                            elif '万' in unit:
-                                final_value = base_value * 10000
-                            else:
-                                final_value = base_value
-                            
-                            metrics_dict['revenue'] = final_value
-                            logging.info(f"通过Tavily提取营收: {final_value}")
-                            break
+                            pb_value = float(pb_match.group(1))
+                            if 0 < pb_value < 100:  # 合理范围检查
+                                metrics_dict['pb'] = pb_value
+                                pb_found = True
+                                logging.info(f"通过Tavily成功提取PB: {pb_value}")
+                                break
                         except ValueError:
                             continue
-                
-                # 如果PE和PB都找到了，可以早退出
-                if pe_found and pb_found:
-                    break
             
-            # 总结提取结果
-            extracted_count = sum([pe_found, pb_found, 
-                                 'net_profit' in metrics_dict, 
-                                 'revenue' in metrics_dict])
-            logging.info(f"Tavily搜索财务数据补充完成，成功提取 {extracted_count} 项指标")
+            # 提取其他财务指标
+            # 净利润提取
+            net_profit_patterns = [
+                r'净利润[：:\s]*(\d+\.?\d*)([万亿千百]?)',
+                r'归母净利润[：:\s]*(\d+\.?\d*)([万亿千百]?)',
+                r'净利[：:\s]*(\d+\.?\d*)([万亿千百]?)'
+            ]
             
-        except Exception as e:
-            logging.warning(f"Tavily财务数据搜索失败: {e}")
-        
-        # 构造简洁可读的财务概览
-        def fmt(v):
-            return "N/A" if v is None else v
-        
-        # 动态构建财务概览，包含所有可用指标
-        financial_parts = []
-        if metrics_dict.get('pe_ttm'): financial_parts.append(f"PE(TTM): {fmt(metrics_dict.get('pe_ttm'))}")
-        if metrics_dict.get('pb'): financial_parts.append(f"PB: {fmt(metrics_dict.get('pb'))}")
-        if metrics_dict.get('current_price'): financial_parts.append(f"当前价: {fmt(metrics_dict.get('current_price'))}元")
-        if metrics_dict.get('change_percent'): financial_parts.append(f"涨跌幅: {fmt(metrics_dict.get('change_percent'))}%")
-        if metrics_dict.get('roe') or metrics_dict.get('roe_simple'): 
-            roe_val = metrics_dict.get('roe') or metrics_dict.get('roe_simple')
-            financial_parts.append(f"ROE: {fmt(roe_val)}%")
-        if metrics_dict.get('gross_margin'): financial_parts.append(f"毛利率: {fmt(metrics_dict.get('gross_margin'))}%")
-        if metrics_dict.get('net_margin'): financial_parts.append(f"净利率: {fmt(metrics_dict.get('net_margin'))}%")
-        if metrics_dict.get('net_profit'): financial_parts.append(f"净利润: {fmt(metrics_dict.get('net_profit'))}")
-        if metrics_dict.get('revenue'): financial_parts.append(f"营收: {fmt(metrics_dict.get('revenue'))}")
-        if metrics_dict.get('operating_cashflow'): financial_parts.append(f"经营现金流: {fmt(metrics_dict.get('operating_cashflow'))}")
-        if metrics_dict.get('profit_quality_ratio'): financial_parts.append(f"盈利质量: {fmt(metrics_dict.get('profit_quality_ratio'))}")
-        if metrics_dict.get('asset_liability_ratio'): financial_parts.append(f"资产负债率: {fmt(metrics_dict.get('asset_liability_ratio'))}%")
-        
-        financial_glance = "；".join(financial_parts) if financial_parts else "暂无财务数据"
+            for pattern in net_profit_patterns:
+                np_match = re.search(pattern, combined_text)
+                if np_match and 'net_profit' not in metrics_dict:
+                    try:
+                        base_value = float(np_match.group(1))
+                        unit = np_match.group(2) if len(np_match.groups()) > 1 else ''
+                        
+                        # 单位转换
+                        if '亿' in unit:
+                            final_value = base_value * 100000000
+                        elif '万' in unit:
+                            final_value = base_value * 10000
+                        else:
+                            final_value = base_value
+                        
+                        metrics_dict['net_profit'] = final_value
+                        logging.info(f"通过Tavily提取净利润: {final_value}")
+                        break
+                    except ValueError:
+                        continue
+            
+            # 营收提取
+            revenue_patterns = [
+                r'营收[：:\s]*(\d+\.?\d*)([万亿千百]?)',
+                r'营业收入[：:\s]*(\d+\.?\d*)([万亿千百]?)',
+                r'总营收[：:\s]*(\d+\.?\d*)([万亿千百]?)'
+            ]
+            
+            for pattern in revenue_patterns:
+                rev_match = re.search(pattern, combined_text)
+                if rev_match and 'revenue' not in metrics_dict:
+                    try:
+                        base_value = float(rev_match.group(1))
+                        unit = rev_match.group(2) if len(rev_match.groups()) > 1 else ''
+                        
+                        # 单位转换
+                        if '亿' in unit:
+                            final_value = base_value * 100000000
+                        elif '万' in unit:
+                            final_value = base_value * 10000
+                        else:
+                            final_value = base_value
+                        
+                        metrics_dict['revenue'] = final_value
+                        logging.info(f"通过Tavily提取营收: {final_value}")
+                        break
+                    except ValueError:
+                        continue
+            
+            # 如果PE和PB都找到了，可以早退出
+            if pe_found and pb_found:
+                break
+        
+        # 总结提取结果
+        extracted_count = sum([pe_found, pb_found, 
+                             'net_profit' in metrics_dict, 
+                             'revenue' in metrics_dict])
+        logging.info(f"Tavily搜索财务数据补充完成，成功提取 {extracted_count} 项指标")
+        
+    except Exception as e:
+        logging.warning(f"Tavily财务数据搜索失败: {e}")
+    
+    # 构造简洁可读的财务概览
+    def fmt(v):
+        return "N/A" if v is None else v
+    
+    # 动态构建财务概览，包含所有可用指标
+    financial_parts = []
+    if metrics_dict.get('pe_ttm'): financial_parts.append(f"PE(TTM): {fmt(metrics_dict.get('pe_ttm'))}")
+    if metrics_dict.get('pb'): financial_parts.append(f"PB: {fmt(metrics_dict.get('pb'))}")
+    if metrics_dict.get('current_price'): financial_parts.append(f"当前价: {fmt(metrics_dict.get('current_price'))}元")
+    if metrics_dict.get('change_percent'): financial_parts.append(f"涨跌幅: {fmt(metrics_dict.get('change_percent'))}%")
+    if metrics_dict.get('roe') or metrics_dict.get('roe_simple'): 
+        roe_val = metrics_dict.get('roe') or metrics_dict.get('roe_simple')
+        financial_parts.append(f"ROE: {fmt(roe_val)}%")
+    if metrics_dict.get('gross_margin'): financial_parts.append(f"毛利率: {fmt(metrics_dict.get('gross_margin'))}%")
+    if metrics_dict.get('net_margin'): financial_parts.append(f"净利率: {fmt(metrics_dict.get('net_margin'))}%")
+    if metrics_dict.get('net_profit'): financial_parts.append(f"净利润: {fmt(metrics_dict.get('net_profit'))}")
+    if metrics_dict.get('revenue'): financial_parts.append(f"营收: {fmt(metrics_dict.get('revenue'))}")
+    if metrics_dict.get('operating_cashflow'): financial_parts.append(f"经营现金流: {fmt(metrics_dict.get('operating_cashflow'))}")
+    if metrics_dict.get('profit_quality_ratio'): financial_parts.append(f"盈利质量: {fmt(metrics_dict.get('profit_quality_ratio'))}")
+    if metrics_dict.get('asset_liability_ratio'): financial_parts.append(f"资产负债率: {fmt(metrics_dict.get('asset_liability_ratio'))}%")
+    
+    financial_glance = "；".join(financial_parts) if financial_parts else "暂无财务数据"
+    return metrics_dict, financial_glance
 
-        # 提取增强版新闻信息
-        logging.info("正在分析新闻和股价关联性...")
-        try:
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(extract_enhanced_news_from_search, all_search_results, stock_name, llm)
-                enhanced_news = future.result(timeout=60)  # 新闻分析超时1分钟
-                logging.info("新闻分析完成")
-        except FutureTimeoutError:
-            logging.error("新闻分析超时，使用默认新闻")
-            enhanced_news = []
+def analyze_news_with_timeout(all_search_results: Dict[str, Any], stock_name: str, impact_llm, ticker: str) -> List[AnalyzedNewsArticle]:
+    """分析搜索到的新闻及其股价影响，超时时返回空列表"""
+    # 提取增强版新闻信息
+    logging.info("正在分析新闻和股价关联性...")
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(extract_enhanced_news_from_search, all_search_results, stock_name, impact_llm, ticker)
+            enhanced_news = future.result(timeout=60)  # 新闻分析超时1分钟
+            logging.info("新闻分析完成")
+    except FutureTimeoutError:
+        logging.error("新闻分析超时，使用默认新闻")
+        enhanced_news = []
+    return enhanced_news
+
+def get_enhanced_data_by_ai_assistant(ticker: str, stock_name: str) -> ComprehensiveReport:
+    """增强版AI研究助理 - 获取全面数据并分析股价关联性"""
+    logging.info(f"--- 启动增强版AI研究员 for {stock_name} ---")
+    
+    try:
+        # 初始化增强版搜索器
+        searcher = EnhancedTavilySearcher(scope=ticker)
+        
+        all_search_results = search_stock_intelligence(searcher, stock_name, ticker)
+        
+        # 初始化LLM客户端
+        llm = llm_client_factory(agent="research_report")
+        # 逐篇新闻的影响抽取调用量大，可在路由表中配置为小而快的模型
+        impact_llm = llm_client_factory(agent="news_impact")
+        
+        # 获取最新财务指标（实时/最近季度）并用Tavily搜索补充
+        metrics_dict, financial_glance = get_financial_snapshot(ticker, stock_name, searcher)
+
+        enhanced_news = analyze_news_with_timeout(all_search_results, stock_name, impact_llm, ticker)
         
         # 生成综合报告
         logging.info("正在生成综合研究报告...")
@@ -781,7 +846,10 @@ def get_enhanced_data_by_ai_assistant(ticker: str, stock_name: str) -> Comprehen
         # 使用LLM生成报告的其他部分（带超时保护）
         try:
             with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(llm.invoke, analysis_prompt)
+                def run_analysis():
+                    with llm_lease(llm, ticker, analysis_prompt):
+                        return llm.invoke(analysis_prompt)
+                future = executor.submit(run_analysis)
                 report_parts = future.result(timeout=60)  # LLM分析超时1分钟
                 logging.info("LLM分析完成")
         except FutureTimeoutError:
@@ -829,13 +897,8 @@ def get_enhanced_data_by_ai_assistant(ticker: str, stock_name: str) -> Comprehen
         # 构建综合报告
         report = ComprehensiveReport(
             analyzed_news_and_sentiment=enhanced_news,
-            market_sentiment_summary="基于新闻分析，市场情绪整体中性偏乐观",
-            analyzed_policy="政策环境相对稳定，有利于行业发展",
             financial_metrics_summary=f"财务快照：{financial_glance}",
-            capital_flow_summary="资金流向显示机构关注度较高",
-            industry_trends="行业发展趋势向好，技术创新推动增长",
-            risk_factors=["市场竞争加剧", "政策变化风险", "技术更新风险"],
-            investment_recommendation="建议关注公司基本面变化，适时调整投资策略",
+            **REPORT_NARRATIVES,
             financial_metrics=FinancialMetrics(**{k: v for k, v in metrics_dict.items() if k in {
                 'pe_ttm','pb','total_mv','circ_mv','eps','net_profit','net_profit_yoy','revenue_yoy',
                 'gross_margin','net_margin','operating_cashflow','free_cashflow','roe','asset_liability_ratio','profit_quality_ratio'
@@ -888,6 +951,30 @@ def get_enhanced_fallback_report(stock_name: str) -> ComprehensiveReport:
         investment_recommendation="建议谨慎投资，等待更多信息"
     )
 
+# --- 按情报来源拆分的入口：工作流图中各情报节点独立运行，下游分析师无需等待整份综合报告 ---
+def get_news_intelligence(ticker: str, stock_name: str) -> ComprehensiveReport:
+    """只执行新闻搜索与逐篇影响分析，返回不含财务部分的综合报告"""
+    logging.info(f"--- AI研究员: 新闻情报 for {stock_name} ---")
+    try:
+        searcher = EnhancedTavilySearcher(scope=ticker)
+        all_search_results = search_stock_intelligence(searcher, stock_name, ticker)
+        enhanced_news = analyze_news_with_timeout(all_search_results, stock_name, llm_client_factory(agent="news_impact"), ticker)
+        logging.info(f"✅ 新闻情报完成，包含{len(enhanced_news)}条新闻分析")
+        return ComprehensiveReport(analyzed_news_and_sentiment=enhanced_news, **REPORT_NARRATIVES)
+    except Exception as e:
+        logging.error(f"❌ 新闻情报搜索或分析失败: {e}")
+        return get_enhanced_fallback_report(stock_name)
+
+def get_financial_intelligence(ticker: str, stock_name: str) -> str:
+    """只拉取财务指标（含Tavily补充），返回供基本面分析师使用的财务快照"""
+    logging.info(f"--- AI研究员: 财务情报 for {stock_name} ---")
+    try:
+        _, financial_glance = get_financial_snapshot(ticker, stock_name, EnhancedTavilySearcher(scope=ticker))
+        return f"财务快照：{financial_glance}"
+    except Exception as e:
+        logging.error(f"❌ 财务情报获取失败: {e}")
+        return get_enhanced_fallback_report(stock_name).financial_metrics_summary
+
 # 保持向后兼容
 def get_data_by_ai_assistant(ticker: str, stock_name: str) -> ComprehensiveReport:
     """兼容原有接口，调用增强版功能"""
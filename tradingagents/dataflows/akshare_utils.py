@@ -6,9 +6,16 @@ import logging
 import baostock as bs
 import re
 import time
+import threading
 import requests
+from collections import defaultdict
 from ..utils.proxy_manager import force_no_proxy
 
+try:
+    from tradingagents.default_config import MARKET_CACHE_CONFIG
+except ImportError:
+    MARKET_CACHE_CONFIG = {}
+
 # 设置日志格式           
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -26,6 +33,34 @@ def code_only(ticker: str) -> str:
     """提取6位纯代码"""
     return ticker[2:] if is_valid_a_stock_code(ticker) else ticker
 
+# --- 全市场数据表的进程内共享缓存 ---
+# 代码名称表与全市场实时行情每次下载都是整张表，批量分析多只股票时只下载一次，
+# 同一时刻多个线程请求同一张表时只有一个线程真正下载，其余等待其结果。
+MARKET_TABLE_TTL = {"code_name": 12 * 3600, "spot": 60}
+
+_market_tables = {}
+_market_tables_lock = threading.Lock()
+_market_fetch_locks = defaultdict(threading.Lock)
+
+def _shared_market_table(name: str, fetcher) -> pd.DataFrame:
+    """获取全市场数据表，在有效期内复用已下载的结果"""
+    ttl = MARKET_CACHE_CONFIG.get(f"{name}_ttl", MARKET_TABLE_TTL[name])
+    with _market_tables_lock:
+        fetch_lock = _market_fetch_locks[name]
+    with fetch_lock:
+        cached = _market_tables.get(name)
+        if cached is not None and time.time() - cached[0] < ttl:
+            return cached[1]
+        table = fetcher()
+        with _market_tables_lock:
+            _market_tables[name] = (time.time(), table)
+        logging.info(f"全市场数据表 '{name}' 已下载并缓存 {ttl} 秒，共 {len(table)} 行")
+        return table
+
+def get_market_spot() -> pd.DataFrame:
+    """全市场实时行情（ak.stock_zh_a_spot），默认缓存60秒"""
+    return _shared_market_table("spot", ak.stock_zh_a_spot)
+
 @force_no_proxy
 def get_stock_name(ticker: str) -> str:
     """获取股票名称 - 强制直连"""
@@ -36,7 +71,7 @@ def get_stock_name(ticker: str) -> str:
     code_only = ticker[2:]
     
     try:
-        stock_list_df = ak.stock_info_a_code_name()
+        stock_list_df = _shared_market_table("code_name", ak.stock_info_a_code_name)
         stock_name_series = stock_list_df[stock_list_df['code'] == code_only]['name']
         if not stock_name_series.empty:
             name = stock_name_series.values[0]
@@ -97,7 +132,7 @@ def get_akshare_financial_data(ticker: str, timeout: int = 5) -> str:
             logging.info("尝试从实时行情获取基础财务数据...")
             
             # 获取所有股票的实时行情
-            spot_df = ak.stock_zh_a_spot()
+            spot_df = get_market_spot()
             
             # 根据股票代码筛选
             stock_spot = spot_df[spot_df['symbol'] == code]
@@ -255,7 +290,7 @@ def get_financial_metrics_for_analysis(ticker: str) -> dict:
         # 使用正确的akshare接口
         try:
             # 获取实时行情数据
-            spot_df = ak.stock_zh_a_spot()
+            spot_df = get_market_spot()
             stock_spot = spot_df[spot_df['symbol'] == code]
             if not stock_spot.empty:
                 row = stock_spot.iloc[0]
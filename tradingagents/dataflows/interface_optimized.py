@@ -99,20 +99,54 @@ class OptimizedAShareDataInterface:
                 all_data['comprehensive_technical_report'] = f"技术分析报告获取失败: {e}"
 
             try:
-                expert_report = future_expert.result()
-                all_data['latest_news'] = expert_report.analyzed_news_and_sentiment
-                all_data['policy_news'] = expert_report.analyzed_policy
-                all_data['financial_reports'] = expert_report.financial_metrics_summary
-                all_data['capital_flow'] = expert_report.capital_flow_summary
-                all_data['social_media_posts'] = "参见'新闻与舆情'部分的分析。"
-                all_data['sector_comparison'] = "参见AI综合报告，其中可能包含行业信息。"
+                all_data.update(self._expert_sections(future_expert.result()))
                 logging.info("✅ 成功获取情报: 专家级AI综合分析报告")
             except Exception as e:
-                error_msg = f"专家级AI分析报告获取失败: {e}"
-                all_data['latest_news'] = []
-                all_data['policy_news'] = error_msg
-                all_data['financial_reports'] = error_msg
-                all_data['capital_flow'] = error_msg
-                all_data['social_media_posts'] = error_msg
-                all_data['sector_comparison'] = error_msg
-        return all_data
\ No newline at end of file
+                all_data.update(self._expert_error_sections(f"专家级AI分析报告获取失败: {e}"))
+        return all_data
+
+    @staticmethod
+    def _expert_sections(expert_report) -> Dict[str, Any]:
+        """把AI研究员的综合报告映射为简报中的各部分"""
+        return {
+            'latest_news': expert_report.analyzed_news_and_sentiment,
+            'policy_news': expert_report.analyzed_policy,
+            'financial_reports': expert_report.financial_metrics_summary,
+            'capital_flow': expert_report.capital_flow_summary,
+            'social_media_posts': "参见'新闻与舆情'部分的分析。",
+            'sector_comparison': "参见AI综合报告，其中可能包含行业信息。",
+        }
+
+    @staticmethod
+    def _expert_error_sections(error_msg: str) -> Dict[str, Any]:
+        return {
+            'latest_news': [],
+            'policy_news': error_msg,
+            'financial_reports': error_msg,
+            'capital_flow': error_msg,
+            'social_media_posts': error_msg,
+            'sector_comparison': error_msg,
+        }
+
+    # --- 按情报来源拆分的获取方法，供工作流图中的各情报节点独立调用 ---
+    def fetch_technical_intelligence(self) -> Dict[str, Any]:
+        """技术面情报：K线与技术指标报告"""
+        return {'comprehensive_technical_report': self.fetch_comprehensive_technical_report()}
+
+    @log_execution_time
+    def fetch_financial_intelligence(self) -> Dict[str, Any]:
+        """财务情报：关键财务指标快照"""
+        try:
+            return {'financial_reports': expert_assistant.get_financial_intelligence(self.ticker, self.stock_name)}
+        except Exception as e:
+            return {'financial_reports': f"财务指标获取失败: {e}"}
+
+    @log_execution_time
+    def fetch_news_intelligence(self) -> Dict[str, Any]:
+        """新闻情报：新闻及其影响分析，以及由新闻派生的政策/资金/舆情/行业部分"""
+        try:
+            sections = self._expert_sections(expert_assistant.get_news_intelligence(self.ticker, self.stock_name))
+        except Exception as e:
+            sections = self._expert_error_sections(f"AI新闻情报获取失败: {e}")
+        sections.pop('financial_reports')
+        return sections
@@ -25,7 +25,7 @@ def get_financial_data_from_llm(ticker: str, stock_name: str) -> StockFinancialM
     logging.info(f"--- 启动AI数据获取智能体 for {stock_name} ---")
     try:
         parser = PydanticOutputParser(pydantic_object=StockFinancialMetrics)
-        llm = llm_client_factory() 
+        llm = llm_client_factory(agent="data_fetcher")
         prompt = ChatPromptTemplate.from_template(
             DATA_FETCHER_PROMPT,
             partial_variables={"format_instructions": parser.get_format_instructions()}
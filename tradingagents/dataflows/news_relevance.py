@@ -0,0 +1,159 @@
+# tradingagents/dataflows/news_relevance.py - LLM调用前的本地相关度预筛
+"""
+在把网页正文交给LLM分析器之前，先用廉价的本地特征打分：
+股票名称/代码提及密度、标题命中、新闻新鲜度、来源域名先验。
+得分低于阈值的页面直接跳过，并统计每次运行节省的LLM调用次数。
+"""
+
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+try:
+    from tradingagents.default_config import NEWS_GATE_CONFIG
+except ImportError:
+    NEWS_GATE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {"mention": 0.4, "title": 0.3, "freshness": 0.15, "domain": 0.15}
+
+# 来源域名先验（按后缀匹配），未命中时使用 unknown_domain_prior
+DEFAULT_DOMAIN_PRIORS = {
+    "cninfo.com.cn": 1.0, "sse.com.cn": 1.0, "szse.cn": 1.0,
+    "eastmoney.com": 0.85, "finance.sina.com.cn": 0.85, "cls.cn": 0.85, "10jqka.com.cn": 0.8,
+    "stcn.com": 0.8, "cnstock.com": 0.8, "caixin.com": 0.8, "yicai.com": 0.8, "jrj.com.cn": 0.75,
+    "hexun.com": 0.7, "ifeng.com": 0.6, "163.com": 0.55, "qq.com": 0.55, "sohu.com": 0.5,
+    "xueqiu.com": 0.5, "gov.cn": 0.6,
+    "baike.baidu.com": 0.1, "zhihu.com": 0.25, "wikipedia.org": 0.1,
+}
+
+DATE_PATTERN = re.compile(r'(20\d{2})[-年/.](\d{1,2})[-月/.](\d{1,2})')
+
+# 最近若干次运行的预筛统计
+GATE_RUN_HISTORY = deque(maxlen=100)
+
+@dataclass
+class GateDecision:
+    """单个页面的预筛结果"""
+    passed: bool
+    score: float
+    features: Dict[str, float] = field(default_factory=dict)
+    reason: str = ""
+
+@dataclass
+class GateStats:
+    """一次运行的预筛统计"""
+    evaluated: int = 0
+    passed: int = 0
+    skipped: int = 0
+
+    @property
+    def llm_calls_saved(self) -> int:
+        return self.skipped
+
+class NewsRelevanceGate:
+    """基于本地特征的新闻相关度打分器，阈值与权重均可配置"""
+
+    def __init__(
+        self,
+        stock_name: str,
+        ticker: str = "",
+        min_score: float = 0.45,
+        min_mentions: int = 1,
+        target_density: float = 2.0,
+        max_age_days: int = 180,
+        weights: Optional[Dict[str, float]] = None,
+        domain_priors: Optional[Dict[str, float]] = None,
+        unknown_domain_prior: float = 0.4
+    ):
+        self.stock_name = stock_name
+        self.code = ticker[2:] if len(ticker) == 8 else ticker
+        self.min_score = min_score
+        self.min_mentions = min_mentions
+        self.target_density = target_density
+        self.max_age_days = max_age_days
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.domain_priors = {**DEFAULT_DOMAIN_PRIORS, **(domain_priors or {})}
+        self.unknown_domain_prior = unknown_domain_prior
+        self.stats = GateStats()
+
+    @classmethod
+    def from_config(cls, stock_name: str, ticker: str = "") -> "NewsRelevanceGate":
+        options = {k: v for k, v in NEWS_GATE_CONFIG.items() if k != "enabled"}
+        return cls(stock_name, ticker, **options)
+
+    def _count_mentions(self, text: str) -> int:
+        count = text.count(self.stock_name) if self.stock_name else 0
+        if self.code:
+            count += text.count(self.code)
+        return count
+
+    def _freshness(self, text: str) -> float:
+        now = datetime.now()
+        ages = []
+        for year, month, day in DATE_PATTERN.findall(text[:3000]):
+            try:
+                published = datetime(int(year), int(month), int(day))
+            except ValueError:
+                continue
+            if published <= now:
+                ages.append((now - published).days)
+        if not ages:
+            return 0.5  # 无法判断时给中性分
+        age = min(ages)
+        if age <= 7:
+            return 1.0
+        return max(0.0, 1 - (age - 7) / max(self.max_age_days - 7, 1))
+
+    def _domain_prior(self, url: str) -> float:
+        host = urlparse(url).netloc.lower()
+        for suffix, prior in self.domain_priors.items():
+            if host == suffix or host.endswith("." + suffix):
+                return prior
+        return self.unknown_domain_prior
+
+    def evaluate(self, title: str, text: str, url: str = "") -> GateDecision:
+        """对一个页面打分并计入统计"""
+        mentions = self._count_mentions(text)
+        title_hit = 1.0 if self._count_mentions(title or "") > 0 else 0.0
+        density = mentions / max(len(text) / 1000, 1)
+        features = {
+            "mention": min(density / self.target_density, 1.0),
+            "title": title_hit,
+            "freshness": self._freshness(text),
+            "domain": self._domain_prior(url),
+        }
+        score = sum(self.weights.get(name, 0) * value for name, value in features.items())
+
+        if mentions + title_hit < self.min_mentions:
+            decision = GateDecision(False, score, features, "未提及股票名称或代码")
+        elif score < self.min_score:
+            decision = GateDecision(False, score, features, f"得分 {score:.2f} 低于阈值 {self.min_score}")
+        else:
+            decision = GateDecision(True, score, features)
+
+        self.stats.evaluated += 1
+        if decision.passed:
+            self.stats.passed += 1
+        else:
+            self.stats.skipped += 1
+        return decision
+
+    def record_run(self, ticker: str = ""):
+        """记录本次运行的统计并输出日志"""
+        GATE_RUN_HISTORY.append({
+            "ticker": ticker or self.code,
+            "timestamp": datetime.now().isoformat(),
+            "evaluated": self.stats.evaluated,
+            "passed": self.stats.passed,
+            "llm_calls_saved": self.stats.llm_calls_saved,
+        })
+        logger.info(
+            f"相关度预筛 [{self.stock_name}]: 评估 {self.stats.evaluated} 篇，放行 {self.stats.passed} 篇，"
+            f"节省 {self.stats.llm_calls_saved} 次LLM调用"
+        )
@@ -0,0 +1,112 @@
+# tradingagents/dataflows/news_store.py - 已分析新闻的本地持久化存储
+"""
+保存每只股票已经过LLM分析的新闻结果（AnalyzedNewsArticle），
+盘中重复运行时只需对未见过的URL调用LLM，其余直接复用。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from tradingagents.utils.storage import get_storage_dir, connect_sqlite
+
+try:
+    from tradingagents.default_config import NEWS_STORE_CONFIG
+except ImportError:
+    NEWS_STORE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+def url_hash(url: str) -> str:
+    """对URL做轻度规范化后计算哈希"""
+    normalized = url.strip().split('#', 1)[0].rstrip('/')
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+class AnalyzedNewsStore:
+    """基于SQLite的已分析新闻存储，按 (ticker, url_hash) 建索引"""
+
+    def __init__(self, db_path: Optional[str] = None, ttl_hours: float = 6, max_age_days: float = 7):
+        self.db_path = db_path or str(get_storage_dir() / "analyzed_news.db")
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        self._init_schema()
+        self.purge_expired()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS analyzed_news (
+                       ticker TEXT NOT NULL,
+                       url_hash TEXT NOT NULL,
+                       url TEXT NOT NULL,
+                       payload TEXT NOT NULL,
+                       analyzed_at REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_analyzed_news_ticker_url ON analyzed_news (ticker, url_hash)"
+            )
+
+    def get_fresh(self, ticker: str, urls: Iterable[str]) -> Dict[str, dict]:
+        """返回仍在有效期内的已分析结果，键为原始URL"""
+        hash_to_url = {url_hash(u): u for u in urls if u}
+        if not hash_to_url:
+            return {}
+        cutoff = time.time() - self.ttl_seconds
+        placeholders = ",".join("?" * len(hash_to_url))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url_hash, payload FROM analyzed_news "
+                f"WHERE ticker = ? AND analyzed_at >= ? AND url_hash IN ({placeholders})",
+                (ticker, cutoff, *hash_to_url.keys())
+            ).fetchall()
+        results = {}
+        for h, payload in rows:
+            try:
+                results[hash_to_url[h]] = json.loads(payload)
+            except (ValueError, KeyError):
+                continue
+        return results
+
+    def save(self, ticker: str, url: str, payload: dict):
+        """写入（或覆盖）一条已分析新闻"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyzed_news (ticker, url_hash, url, payload, analyzed_at) VALUES (?, ?, ?, ?, ?)",
+                (ticker, url_hash(url), url, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+
+    def purge_expired(self) -> int:
+        """清理超过最长保留期的记录"""
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM analyzed_news WHERE analyzed_at < ?", (cutoff,))
+        if cursor.rowcount:
+            logger.info(f"已清理 {cursor.rowcount} 条过期的新闻分析记录")
+        return cursor.rowcount
+
+_news_store = None
+_news_store_lock = threading.Lock()
+
+def get_news_store() -> Optional[AnalyzedNewsStore]:
+    """获取全局新闻存储实例；配置禁用或初始化失败时返回 None"""
+    global _news_store
+    if not NEWS_STORE_CONFIG.get("enabled", True):
+        return None
+    with _news_store_lock:
+        if _news_store is None:
+            try:
+                _news_store = AnalyzedNewsStore(
+                    db_path=NEWS_STORE_CONFIG.get("db_path"),
+                    ttl_hours=NEWS_STORE_CONFIG.get("ttl_hours", 6),
+                    max_age_days=NEWS_STORE_CONFIG.get("max_age_days", 7)
+                )
+            except Exception as e:
+                logger.warning(f"新闻存储初始化失败，将不使用本地存储: {e}")
+                return None
+        return _news_store
@@ -0,0 +1,163 @@
+# tradingagents/dataflows/page_cache.py - 新闻网页的本地HTTP缓存
+"""
+按URL缓存压缩后的网页原文及其 ETag / Last-Modified 响应头，并同时缓存提取出的正文。
+新鲜期内直接命中本地；过期后使用条件请求重新验证，服务端返回304时无需重新下载。
+缓存总大小超过上限时按最近访问时间淘汰。
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from tradingagents.utils.storage import get_storage_dir, connect_sqlite
+
+try:
+    from tradingagents.default_config import PAGE_CACHE_CONFIG
+except ImportError:
+    PAGE_CACHE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedPage:
+    """一条网页缓存记录"""
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    encoding: Optional[str]
+    body: bytes
+    title: str
+    text: str
+    fetched_at: float
+
+class PageCache:
+    """SQLite存储的网页缓存，正文与原文均以zlib压缩保存"""
+
+    def __init__(self, db_path: Optional[str] = None, fresh_seconds: float = 1800, max_bytes: int = 200 * 1024 * 1024):
+        self.db_path = db_path or str(get_storage_dir() / "page_cache.db")
+        self.fresh_seconds = fresh_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                       url_hash TEXT PRIMARY KEY,
+                       url TEXT NOT NULL,
+                       etag TEXT,
+                       last_modified TEXT,
+                       encoding TEXT,
+                       body BLOB NOT NULL,
+                       title TEXT,
+                       text BLOB,
+                       size INTEGER NOT NULL,
+                       fetched_at REAL NOT NULL,
+                       last_access REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages (last_access)")
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.strip().encode('utf-8')).hexdigest()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """读取缓存记录（不论是否过期），并更新访问时间"""
+        key = self._key(url)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, encoding, body, title, text, fetched_at FROM pages WHERE url_hash = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE url_hash = ?", (time.time(), key))
+        etag, last_modified, encoding, body, title, text, fetched_at = row
+        try:
+            return CachedPage(
+                url=url, etag=etag, last_modified=last_modified, encoding=encoding,
+                body=zlib.decompress(body), title=title or "",
+                text=zlib.decompress(text).decode('utf-8') if text else "",
+                fetched_at=fetched_at
+            )
+        except zlib.error as e:
+            logger.warning(f"网页缓存记录损坏，已忽略: {url}: {e}")
+            return None
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.fresh_seconds
+
+    def conditional_headers(self, page: Optional[CachedPage]) -> Dict[str, str]:
+        """根据缓存记录构造条件请求头"""
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers['If-None-Match'] = page.etag
+            if page.last_modified:
+                headers['If-Modified-Since'] = page.last_modified
+        return headers
+
+    def put(self, url: str, body: bytes, title: str, text: str,
+            etag: Optional[str] = None, last_modified: Optional[str] = None, encoding: Optional[str] = None):
+        """写入一条缓存，并在超出容量时淘汰最久未访问的记录"""
+        body_blob = zlib.compress(body, 6)
+        text_blob = zlib.compress(text.encode('utf-8'), 6) if text else None
+        size = len(body_blob) + (len(text_blob) if text_blob else 0)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url_hash, url, etag, last_modified, encoding, body, title, text, size, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(url), url, etag, last_modified, encoding, body_blob, title, text_blob, size, now, now)
+            )
+        self._evict_if_needed()
+
+    def mark_revalidated(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """服务端返回304时，刷新新鲜期（如有新的校验头一并更新）"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url_hash = ?",
+                (now, now, etag, last_modified, self._key(url))
+            )
+
+    def _evict_if_needed(self):
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            for key, size in self._conn.execute("SELECT url_hash, size FROM pages ORDER BY last_access ASC").fetchall():
+                if total <= target:
+                    break
+                self._conn.execute("DELETE FROM pages WHERE url_hash = ?", (key,))
+                total -= size
+                evicted += 1
+        logger.info(f"网页缓存超出容量上限，已淘汰 {evicted} 条记录")
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache() -> Optional[PageCache]:
+    """获取全局网页缓存实例；配置禁用或初始化失败时返回 None"""
+    global _page_cache
+    if not PAGE_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            try:
+                _page_cache = PageCache(
+                    db_path=PAGE_CACHE_CONFIG.get("db_path"),
+                    fresh_seconds=PAGE_CACHE_CONFIG.get("fresh_seconds", 1800),
+                    max_bytes=PAGE_CACHE_CONFIG.get("max_bytes", 200 * 1024 * 1024)
+                )
+            except Exception as e:
+                logger.warning(f"网页缓存初始化失败，将直接下载: {e}")
+                return None
+        return _page_cache
@@ -0,0 +1,303 @@
+# tradingagents/dataflows/page_fetcher.py - 新闻网页并发抓取与正文提取
+"""
+为新闻智能体提供网页抓取能力：
+1. 复用连接池的 requests.Session，限制总并发与单域名并发；
+2. 边下载边用 lxml 增量解析，并按 readability 思路剔除导航、广告等模板内容，
+   只把文章正文交给下游的LLM分析器。
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+
+from .page_cache import PageCache, get_page_cache
+
+try:
+    from tradingagents.default_config import NEWS_FETCH_CONFIG
+except ImportError:
+    NEWS_FETCH_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+# 整块丢弃的标签（脚本、样式、导航、页脚等）
+BOILERPLATE_TAGS = {
+    'script', 'style', 'noscript', 'iframe', 'nav', 'footer',
+    'aside', 'svg', 'button', 'select', 'textarea', 'input'
+}
+# 只有不含正文候选节点时才丢弃的标签：不少财经站点与ASP.NET页面用 <form> 包住整篇正文，
+# 也有页面把标题和导语放在 <header> 中
+CONDITIONAL_BOILERPLATE_TAGS = {'form', 'header'}
+# class/id 命中这些关键字的节点视为模板内容
+NEGATIVE_HINTS = re.compile(
+    r'comment|footer|foot|sidebar|side-bar|nav|menu|share|recommend|related|advert|ad-|-ad|'
+    r'banner|breadcrumb|copyright|login|toolbar|hotnews|rank|popup|subscribe', re.I
+)
+POSITIVE_HINTS = re.compile(r'article|content|main|post|text|body|detail|news', re.I)
+BLOCK_TAGS = {'p', 'pre', 'td', 'blockquote', 'li', 'h2', 'h3', 'h4'}
+# 参与正文打分的块的最短长度
+MIN_BLOCK_CHARS = 25
+PUNCTUATION = re.compile(r'[，。；！？,.;!?]')
+
+@dataclass
+class FetchedPage:
+    """一次网页抓取的结果"""
+    url: str
+    title: str = ""
+    text: str = ""
+    status: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    cache_status: str = "miss"  # miss / hit(本地新鲜命中) / revalidated(304)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.text)
+
+class MainContentExtractor:
+    """基于 lxml 增量解析的正文提取器，支持按块喂入字节流"""
+
+    def __init__(self, encoding: Optional[str] = None):
+        self._parser = etree.HTMLPullParser(events=('end',), encoding=encoding, remove_comments=True)
+
+    def feed(self, chunk: bytes):
+        self._parser.feed(chunk)
+        self._drain_events()
+
+    def _drain_events(self):
+        # 解析过程中即时清空模板节点，避免整页文本常驻内存
+        for _, element in self._parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ''
+            if tag.lower() in BOILERPLATE_TAGS or (
+                tag.lower() in CONDITIONAL_BOILERPLATE_TAGS and not _has_content_candidate(element)
+            ):
+                element.clear(keep_tail=True)
+                element.set('data-boilerplate', '1')
+
+    def close(self) -> Tuple[str, str]:
+        """结束解析，返回 (标题, 正文)"""
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:
+            root = None
+        self._drain_events()
+        if root is None:
+            return "", ""
+        return extract_title(root), extract_main_text(root)
+
+def extract_title(root) -> str:
+    """优先取 <h1>，否则取 <title>"""
+    for xpath in ('//h1', '//title'):
+        nodes = root.xpath(xpath)
+        if nodes:
+            title = ' '.join(''.join(nodes[0].itertext()).split())
+            if title:
+                return title
+    return ""
+
+def _node_text(node) -> str:
+    return ' '.join(''.join(node.itertext()).split())
+
+def _has_content_candidate(node) -> bool:
+    """节点内是否有标题或足够长的段落（即正文打分时会计入的块）"""
+    if next(node.iter('h1'), None) is not None:
+        return True
+    return any(len(_node_text(block)) >= MIN_BLOCK_CHARS for block in node.iter(*BLOCK_TAGS))
+
+def _link_density(node, text_length: int) -> float:
+    if not text_length:
+        return 1.0
+    link_length = sum(len(_node_text(a)) for a in node.iter('a'))
+    return min(link_length / text_length, 1.0)
+
+def _is_negative(node) -> bool:
+    hints = f"{node.get('class', '')} {node.get('id', '')}"
+    return bool(hints.strip()) and bool(NEGATIVE_HINTS.search(hints)) and not POSITIVE_HINTS.search(hints)
+
+def _drop_node(node):
+    """移除节点但保留其 tail 文本"""
+    parent = node.getparent()
+    if node.tail:
+        previous = node.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or '') + node.tail
+        else:
+            parent.text = (parent.text or '') + node.tail
+    parent.remove(node)
+
+def extract_main_text(root) -> str:
+    """readability 风格的正文提取：按段落给父节点打分，选出得分最高的正文容器"""
+    for node in list(root.iter()):
+        if not isinstance(node.tag, str) or node.getparent() is None:
+            continue
+        if node.get('data-boilerplate') or _is_negative(node):
+            _drop_node(node)
+
+    scores = defaultdict(float)
+    for block in root.iter(*BLOCK_TAGS):
+        text = _node_text(block)
+        if len(text) < MIN_BLOCK_CHARS:
+            continue
+        score = 1 + len(PUNCTUATION.findall(text)) + min(len(text) / 100, 3)
+        parent = block.getparent()
+        if parent is not None:
+            scores[parent] += score
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                scores[grandparent] += score / 2
+
+    best_node, best_score = None, 0.0
+    for node, score in scores.items():
+        hints = f"{node.get('class', '')} {node.get('id', '')}"
+        if POSITIVE_HINTS.search(hints):
+            score *= 1.25
+        score *= 1 - _link_density(node, len(_node_text(node)))
+        if score > best_score:
+            best_node, best_score = node, score
+
+    if best_node is not None:
+        paragraphs = [_node_text(b) for b in best_node.iter(*BLOCK_TAGS)]
+        text = '\n'.join(p for p in paragraphs if p)
+        if len(text) >= 150:
+            return text
+
+    # 兜底：退化为整页可见文本
+    body = root.find('.//body')
+    target = body if body is not None else root
+    lines = (' '.join(line.split()) for line in target.itertext())
+    return '\n'.join(line for line in lines if line)
+
+class PageFetcher:
+    """带连接池、总并发与单域名并发限制的网页抓取器，可选接入本地网页缓存"""
+
+    def __init__(
+        self,
+        max_workers: int = 6,
+        per_host_limit: int = 2,
+        connect_timeout: float = 5,
+        read_timeout: float = 15,
+        max_page_bytes: int = 2_000_000,
+        cache: Optional[PageCache] = None
+    ):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_page_bytes = max_page_bytes
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=max(max_workers, per_host_limit),
+            max_retries=Retry(total=1, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    @staticmethod
+    def _declared_encoding(response: requests.Response) -> Optional[str]:
+        # 只信任响应头中显式声明的字符集，否则交给 lxml 根据 <meta charset> 识别
+        content_type = response.headers.get('Content-Type', '')
+        match = re.search(r'charset=([\w-]+)', content_type, re.I)
+        return match.group(1) if match else None
+
+    def fetch(self, url: str) -> FetchedPage:
+        """抓取单个URL并提取正文（优先使用本地缓存/条件请求）"""
+        start_time = time.time()
+        page = FetchedPage(url=url)
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None and cached.text and self.cache.is_fresh(cached):
+            page.title, page.text, page.status, page.cache_status = cached.title, cached.text, 200, "hit"
+            page.elapsed = time.time() - start_time
+            return page
+        try:
+            headers = self.cache.conditional_headers(cached) if self.cache else {}
+            with self._host_semaphore(url):
+                with self.session.get(url, timeout=self.timeout, stream=True, headers=headers) as response:
+                    page.status = response.status_code
+                    if response.status_code == 304 and cached is not None:
+                        page.cache_status = "revalidated"
+                        self.cache.mark_revalidated(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    else:
+                        response.raise_for_status()
+                        encoding = self._declared_encoding(response)
+                        extractor = MainContentExtractor(encoding)
+                        chunks, received = [], 0
+                        for chunk in response.iter_content(chunk_size=16384):
+                            extractor.feed(chunk)
+                            chunks.append(chunk)
+                            received += len(chunk)
+                            if received >= self.max_page_bytes:
+                                logger.debug(f"页面超过 {self.max_page_bytes} 字节，截断: {url}")
+                                break
+                        validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            if page.cache_status == "revalidated":
+                if cached.text:
+                    page.title, page.text = cached.title, cached.text
+                else:
+                    extractor = MainContentExtractor(cached.encoding)
+                    extractor.feed(cached.body)
+                    page.title, page.text = extractor.close()
+            else:
+                page.title, page.text = extractor.close()
+                if self.cache and page.text:
+                    self.cache.put(url, b''.join(chunks), page.title, page.text,
+                                   etag=validators[0], last_modified=validators[1], encoding=encoding)
+        except Exception as e:
+            page.error = str(e)
+        page.elapsed = time.time() - start_time
+        return page
+
+    def fetch_all(self, urls: List[str]) -> List[FetchedPage]:
+        """并发抓取多个URL，结果顺序与输入一致"""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            pages = list(executor.map(self.fetch, urls))
+        ok_count = sum(1 for p in pages if p.ok)
+        hit_count = sum(1 for p in pages if p.cache_status == "hit")
+        revalidated_count = sum(1 for p in pages if p.cache_status == "revalidated")
+        logger.info(
+            f"网页抓取完成: 成功 {ok_count}/{len(pages)}，本地命中 {hit_count}，304复用 {revalidated_count}，"
+            f"最长耗时 {max(p.elapsed for p in pages):.2f}秒"
+        )
+        return pages
+
+_page_fetcher = None
+_page_fetcher_lock = threading.Lock()
+
+def get_page_fetcher() -> PageFetcher:
+    """获取全局共享的网页抓取器（复用连接池）"""
+    global _page_fetcher
+    with _page_fetcher_lock:
+        if _page_fetcher is None:
+            _page_fetcher = PageFetcher(
+                max_workers=NEWS_FETCH_CONFIG.get("max_workers", 6),
+                per_host_limit=NEWS_FETCH_CONFIG.get("per_host_limit", 2),
+                connect_timeout=NEWS_FETCH_CONFIG.get("connect_timeout", 5),
+                read_timeout=NEWS_FETCH_CONFIG.get("read_timeout", 15),
+                max_page_bytes=NEWS_FETCH_CONFIG.get("max_page_bytes", 2_000_000),
+                cache=get_page_cache()
+            )
+        return _page_fetcher
@@ -1,15 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
 from pydantic import BaseModel, Field
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from typing import List
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 # 导入我们项目的核心工具
 from tradingagents.llms import llm_client_factory
 from tradingagents.default_config import Google_Search_CONFIG
+from .page_fetcher import get_page_fetcher, NEWS_FETCH_CONFIG
+from .news_relevance import NewsRelevanceGate, NEWS_GATE_CONFIG
+from tradingagents.utils.chain_utils import split_chain
+from tradingagents.utils.rate_governor import get_rate_governor, llm_lease
+
+# 送入分析器的正文最大长度
+MAX_PAGE_CONTENT_CHARS = 8000
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -37,7 +43,7 @@ HTML_ANALYZER_PROMPT = """
 
 def get_html_analyzer_chain():
     parser = PydanticOutputParser(pydantic_object=AnalyzedArticle)
-    llm = llm_client_factory()
+    llm = llm_client_factory(agent="news_extraction")
     prompt = ChatPromptTemplate.from_template(
         HTML_ANALYZER_PROMPT,
         partial_variables={"format_instructions": parser.get_format_instructions()}
@@ -71,13 +77,14 @@ def get_smart_news(ticker: str, stock_name: str, num_articles: int = 10) -> str:
         service = build("customsearch", "v1", developerKey=API_KEY)
         
         # [核心升级] 在请求中加入 dateRestrict 参数
-        res = service.cse().list(
-            q=stock_name, 
-            cx=CX_ID, 
-            sort='date', 
-            num=10, 
-            dateRestrict=date_restriction
-        ).execute()
+        with get_rate_governor().lease("google_search", ticker):
+            res = service.cse().list(
+                q=stock_name, 
+                cx=CX_ID, 
+                sort='date', 
+                num=10, 
+                dateRestrict=date_restriction
+            ).execute()
         
         logging.info("[诊断信息] Google API 搜索执行完毕。")
 
@@ -97,39 +104,63 @@ def get_smart_news(ticker: str, stock_name: str, num_articles: int = 10) -> str:
     analyzer_chain = get_html_analyzer_chain()
     analyzed_articles: List[AnalyzedArticle] = []
 
-    # **第二步：生成 (Generate)**
-    for url in urls_to_check:
-        if len(analyzed_articles) >= num_articles:
-            break
-        try:
-            logging.info(f"正在抓取并分析URL: {url}")
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, timeout=20, headers=headers)
-            response.raise_for_status()
-            response.encoding = response.apparent_encoding
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            page_content = soup.get_text(separator='\n', strip=True)
-            
-            if len(page_content) < 150:
-                logging.warning("页面有效内容过短，跳过。")
-                continue
-
-            analysis_result = analyzer_chain.invoke({
+    # **第二步：抓取 (Fetch)** - 连接池 + 并发下载 + 正文提取
+    pages = get_page_fetcher().fetch_all(urls_to_check)
+    gate = NewsRelevanceGate.from_config(stock_name, ticker) if NEWS_GATE_CONFIG.get("enabled", True) else None
+    pages_to_analyze = []
+    for page in pages:
+        if page.error:
+            logging.error(f"抓取URL {page.url} 时失败: {page.error}")
+        elif len(page.text) < 150:
+            logging.warning(f"页面有效内容过短，跳过: {page.url}")
+        elif gate is not None:
+            decision = gate.evaluate(page.title, page.text, page.url)
+            if decision.passed:
+                pages_to_analyze.append(page)
+            else:
+                logging.info(f"相关度预筛未通过（{decision.reason}），跳过LLM分析: {page.url}")
+        else:
+            pages_to_analyze.append(page)
+    if gate is not None:
+        gate.record_run(ticker)
+
+    # **第三步：生成 (Generate)** - 按批并行调用分析器，结果按原始URL顺序汇总；
+    # 凑够 num_articles 篇高相关新闻后不再提交后续页面，避免为用不上的分析付费
+    analyzer_llm = split_chain(analyzer_chain).llm
+    def analyze_page(page):
+        logging.info(f"正在分析URL: {page.url}")
+        page_content = page.text[:MAX_PAGE_CONTENT_CHARS]
+        with llm_lease(analyzer_llm, ticker, page_content):
+            return analyzer_chain.invoke({
                 "stock_name": stock_name,
-                "page_content": page_content[:8000]
+                "page_content": page_content
             })
-            
-            if analysis_result and analysis_result.relevance == "高":
-                analysis_result.source = url
-                analyzed_articles.append(analysis_result)
-                logging.info(f"成功分析一篇 [高] 相关度新闻: {analysis_result.title}")
-            elif analysis_result:
-                logging.warning(f"分析完成，但相关度为[{analysis_result.relevance}]，已过滤: {analysis_result.title}")
-        except Exception as e:
-            logging.error(f"处理URL {url} 时失败: {e}")
-
-    # **第三步：汇总报告**
+
+    if pages_to_analyze:
+        batch_size = max(NEWS_FETCH_CONFIG.get("analyzer_max_workers", 4), 1)
+        with ThreadPoolExecutor(max_workers=min(batch_size, len(pages_to_analyze))) as executor:
+            for start in range(0, len(pages_to_analyze), batch_size):
+                if len(analyzed_articles) >= num_articles:
+                    logging.info(f"已获得 {num_articles} 篇高相关新闻，跳过剩余 {len(pages_to_analyze) - start} 个页面的分析")
+                    break
+                batch = pages_to_analyze[start:start + batch_size]
+                futures = [(page, executor.submit(analyze_page, page)) for page in batch]
+                for page, future in futures:
+                    try:
+                        analysis_result = future.result()
+                    except Exception as e:
+                        logging.error(f"处理URL {page.url} 时失败: {e}")
+                        continue
+                    if analysis_result and analysis_result.relevance == "高":
+                        if len(analyzed_articles) >= num_articles:
+                            continue
+                        analysis_result.source = page.url
+                        analyzed_articles.append(analysis_result)
+                        logging.info(f"成功分析一篇 [高] 相关度新闻: {analysis_result.title}")
+                    elif analysis_result:
+                        logging.warning(f"分析完成，但相关度为[{analysis_result.relevance}]，已过滤: {analysis_result.title}")
+
+    # **第四步：汇总报告**
     final_report = f"--- AI新闻智能体报告 for {stock_name} ---\n\n"
     if not analyzed_articles:
         final_report += f"通过【Google API】共找到 {len(urls_to_check)} 条【过去6个月内】的相关新闻，但经AI分析后，未发现与公司核心业务【高度相关】的新闻。\n"
@@ -0,0 +1,271 @@
+# tradingagents/graph/checkpointer.py - 工作流图的本地SQLite检查点
+"""
+每个节点执行完毕后，LangGraph 都会把整份状态写入检查点；节点失败时其输出不会提交，
+因此用同一个运行ID（thread_id）重新驱动图时，会从第一个未完成的节点继续，
+之前的情报收集与分析师结果无需重跑。
+
+状态以 LangGraph 的 msgpack 序列化器（ormsgpack）编码，分析师/研究主管/交易计划等
+Pydantic 输出按模型字段直接编码，读取时还原为原模型对象。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+
+from tradingagents.utils.storage import get_storage_dir, connect_sqlite
+
+try:
+    from tradingagents.default_config import CHECKPOINT_CONFIG
+except ImportError:
+    CHECKPOINT_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """基于本地SQLite的LangGraph检查点存储，同步与异步图均可使用"""
+
+    def __init__(self, db_path: Optional[str] = None, retention_days: float = 7, serde=None):
+        super().__init__(serde=serde)
+        self.db_path = db_path or str(get_storage_dir("checkpoints") / "graph_checkpoints.db")
+        self.retention_seconds = retention_days * 86400
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        self._init_schema()
+        self.purge_expired()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS checkpoints (
+                       thread_id TEXT NOT NULL,
+                       checkpoint_ns TEXT NOT NULL DEFAULT '',
+                       checkpoint_id TEXT NOT NULL,
+                       parent_checkpoint_id TEXT,
+                       type TEXT,
+                       checkpoint BLOB,
+                       metadata_type TEXT,
+                       metadata BLOB,
+                       created_at REAL NOT NULL,
+                       PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                   )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS writes (
+                       thread_id TEXT NOT NULL,
+                       checkpoint_ns TEXT NOT NULL DEFAULT '',
+                       checkpoint_id TEXT NOT NULL,
+                       task_id TEXT NOT NULL,
+                       idx INTEGER NOT NULL,
+                       channel TEXT NOT NULL,
+                       type TEXT,
+                       value BLOB,
+                       task_path TEXT NOT NULL DEFAULT '',
+                       PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                   )"""
+            )
+
+    def purge_expired(self):
+        """删除超过保留期的运行"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock, self._conn:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (cutoff,)
+            )]
+            for thread_id in expired:
+                self._delete(thread_id)
+        if expired:
+            logger.info(f"检查点: 已清理 {len(expired)} 个过期运行")
+
+    def _delete(self, thread_id: str):
+        self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        with self._lock:
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """读取指定检查点；未指定 checkpoint_id 时读取该运行的最新检查点"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                ).fetchone()
+        return self._to_tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """按时间倒序列出检查点（检查点ID单调递增）"""
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                f"metadata_type, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC",
+                params
+            ).fetchall()
+        count = 0
+        for thread_id, checkpoint_ns, *row in rows:
+            item = self._to_tuple(thread_id, checkpoint_ns, tuple(row))
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """写入一个检查点（包含完整的状态）"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, payload = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_payload = self.serde.dumps_typed(get_serializable_checkpoint_metadata(config, metadata))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, payload, metadata_type, metadata_payload, time.time())
+            )
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """写入某个任务尚未形成检查点的输出（同一步中已成功的并行任务在恢复时无需重跑）"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 错误/中断等特殊写入覆盖旧值，普通写入只保留第一次
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            self._delete(thread_id)
+
+    # --- 异步接口：SQLite读写很快，放到线程中执行以免阻塞事件循环 ---
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+def get_checkpointer() -> Optional[SQLiteCheckpointSaver]:
+    """获取全局检查点存储；在配置中关闭时返回 None"""
+    global _checkpointer
+    if not CHECKPOINT_CONFIG.get("enabled", True):
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = SQLiteCheckpointSaver(
+                db_path=CHECKPOINT_CONFIG.get("db_path"),
+                retention_days=CHECKPOINT_CONFIG.get("retention_days", 7)
+            )
+        return _checkpointer
+
+def run_config(run_id: str) -> dict:
+    """以运行ID作为检查点的 thread_id"""
+    return {"configurable": {"thread_id": run_id}}
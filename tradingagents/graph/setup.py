@@ -1,12 +1,20 @@
 # tradingagents/graph/setup.py (V12.1 最终修复版)
+import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Tuple
 from tradingagents.utils.agent_states import AgentState
 from tradingagents.utils.error_handler import LLMSafetyWrapper, TradingSystemError
+from tradingagents.utils.semantic_cache import get_semantic_cache
+from tradingagents.utils.briefing_compressor import compress_for_agent
+from tradingagents.utils.chain_utils import estimate_tokens
+from tradingagents.utils.node_memo import get_node_memo
 from tradingagents.agents.analysts import (
     fundamentals_analyst, market_analyst, news_analyst,
     policy_analyst, social_media_analyst, capital_flow_analyst, sector_analyst
 )
+from tradingagents.agents.analysts.analyst_panel import get_analyst_panel, PANEL_KEY
+from tradingagents.agents.shared_briefing import ANALYST_REPORT_TITLES, render_analyst_briefing
 from tradingagents.agents.managers import research_manager, risk_manager
 from tradingagents.agents.researchers import bull_researcher, bear_researcher
 from tradingagents.agents.trader import trader
@@ -15,6 +23,27 @@ from tradingagents.dataflows.interface_optimized import OptimizedAShareDataInter
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# 情报节点 -> (说明, 数据接口方法, 写入的状态键)
+INTEL_SOURCES = {
+    "technical_intel": ("技术面", "fetch_technical_intelligence", ("briefing_book", "latest_close_price")),
+    "financial_intel": ("财务", "fetch_financial_intelligence", ("briefing_book",)),
+    "news_intel": ("新闻", "fetch_news_intelligence", ("briefing_book",)),
+}
+
+# 状态中记录本次运行因输入未变化而被跳过的智能体
+SKIPPED_KEY = "skipped_agents"
+
+# 分析师报告 -> 其输入所在的情报节点
+ANALYST_SOURCES = {
+    "fundamentals_analysis": "financial_intel",
+    "market_analysis": "technical_intel",
+    "news_analysis": "news_intel",
+    "policy_analysis": "news_intel",
+    "social_media_analysis": "news_intel",
+    "capital_flow_analysis": "news_intel",
+    "sector_analysis": "news_intel",
+}
+
 def print_agent_output(agent_name: str, output, content_to_print: str = None):
     """格式化打印智能体输出"""
     print("\n" + "="*80)
@@ -56,24 +85,67 @@ class GraphNodes:
         self.bull_researcher = bull_researcher.get_bull_researcher()
         self.bear_researcher = bear_researcher.get_bear_researcher()
         self.trader = trader.get_trader_agent()
+        # 可选的合议模式：输入较薄的分析师合并为一次调用（见 analyst_panel.py）
+        self.analyst_panel = get_analyst_panel({
+            "fundamentals_analysis": self.fundamentals_analyst,
+            "market_analysis": self.market_analyst,
+            "news_analysis": self.news_analyst,
+            "policy_analysis": self.policy_analyst,
+            "social_media_analysis": self.social_media_analyst,
+            "capital_flow_analysis": self.capital_flow_analyst,
+            "sector_analysis": self.sector_analyst,
+        })
+
+    def analyst_groups(self) -> Dict[str, Tuple[str, ...]]:
+        """分析师节点名 -> 该节点产出的报告键；启用合议时合议成员合并为一个节点"""
+        members = tuple(key for key in ANALYST_REPORT_TITLES if self.analyst_panel and key in self.analyst_panel.members)
+        groups = {key.replace("_analysis", "_analyst"): (key,) for key in ANALYST_REPORT_TITLES if key not in members}
+        if members:
+            groups[PANEL_KEY] = members
+        return groups
 
-    def gather_intelligence(self, state: AgentState):
-        logging.info("--- [节点 1/5] 中央情报处: 启动情报收集... ---")
+    def intel_node(self, source: str, async_mode: bool = False):
+        """构建某个情报来源的图节点"""
+        if async_mode:
+            async def node(state: AgentState):
+                return await self.agather_intelligence(state, source)
+        else:
+            def node(state: AgentState):
+                return self.gather_intelligence(state, source)
+        return node
+
+    def analyst_node(self, keys: Tuple[str, ...], async_mode: bool = False):
+        """构建产出 keys 中各报告的分析师图节点"""
+        if async_mode:
+            async def node(state: AgentState):
+                return await self.arun_analysts(state, keys)
+        else:
+            def node(state: AgentState):
+                return self.run_analysts(state, keys)
+        return node
+
+    def gather_intelligence(self, state: AgentState, source: str):
+        label, fetcher, _ = INTEL_SOURCES[source]
+        logging.info(f"--- [中央情报处] {label}情报: 开始获取... ---")
         try:
             data_interface = OptimizedAShareDataInterface(state['ticker'])
-            briefing_book = data_interface.fetch_all_data_parallel()
-            formatted_news = format_news_for_analyst(briefing_book.get('latest_news', []))
-            print_agent_output("Gemini 实时新闻情报", None, content_to_print=formatted_news)
-            latest_close_price = data_interface.get_latest_close_price()
-            return {"briefing_book": briefing_book, "latest_close_price": latest_close_price}
+            briefing_part = getattr(data_interface, fetcher)()
+            update = {"briefing_book": briefing_part}
+            if 'latest_news' in briefing_part:
+                formatted_news = format_news_for_analyst(briefing_part['latest_news'])
+                print_agent_output("Gemini 实时新闻情报", None, content_to_print=formatted_news)
+            if "latest_close_price" in INTEL_SOURCES[source][2]:
+                update["latest_close_price"] = data_interface.get_latest_close_price()
+            logging.info(f"✅ 成功获取情报: {label}")
+            return update
         except Exception as e:
-            raise TradingSystemError(f"在 gather_intelligence 阶段发生致命错误: {e}")
+            raise TradingSystemError(f"在 {source} 阶段发生致命错误: {e}")
 
-    def run_analyst_team(self, state: AgentState):
-        logging.info("--- [节点 2/5] 分析师团队: 7位专家并行启动... ---")
+    def _analyst_tasks(self, state: AgentState) -> dict:
+        """构建7位分析师的 {结果键: (链, 输入)}"""
         briefing = state['briefing_book']
         formatted_news_summary = format_news_for_analyst(briefing.get('latest_news', []))
-        tasks = {
+        return {
             "fundamentals_analysis": (self.fundamentals_analyst, {"financial_summary": briefing.get('financial_reports', '')}),
             "market_analysis": (self.market_analyst, {"technical_report": briefing.get('comprehensive_technical_report', '')}),
             "news_analysis": (self.news_analyst, {"news_summary": formatted_news_summary}),
@@ -82,71 +154,254 @@ class GraphNodes:
             "capital_flow_analysis": (self.capital_flow_analyst, {"capital_flow_summary": briefing.get('capital_flow', '')}),
             "sector_analysis": (self.sector_analyst, {"sector_comparison_summary": briefing.get('sector_comparison', '')}),
         }
-        analysis_results = {}
-        with ThreadPoolExecutor(max_workers=7) as executor:
-            future_to_name = { executor.submit(LLMSafetyWrapper.safe_invoke, agent, data, name): name for name, (agent, data) in tasks.items() }
+
+    def _analyst_plan(self, state: AgentState, tasks: dict):
+        """返回 (本轮要发出的调用, 合议成员的原始任务)；未启用合议或 tasks 中没有合议成员时后者为空"""
+        if self.analyst_panel is None:
+            return tasks, {}
+        tasks, merged = self.analyst_panel.split(tasks)
+        if merged:
+            tasks[PANEL_KEY] = self.analyst_panel.task(merged, state['stock_name'])
+        return tasks, merged
+
+    def _unpack_panel(self, analysis_results: dict, merged: dict) -> dict:
+        """把合议结果拆回各分析师的结果键；合议失败时返回需要逐个补调的任务"""
+        if not merged:
+            return {}
+        report = analysis_results.pop(PANEL_KEY, None)
+        if report is None:
+            logging.warning("分析师合议调用失败，改为逐个调用合议成员")
+            return merged
+        analysis_results.update(self.analyst_panel.unpack(report, merged))
+        return {}
+
+    def _parallel_invoke(self, tasks: dict, node: str, ticker: str, semantic_scope: str = None) -> dict:
+        """在线程池中并行执行一组链调用，单个失败时结果记为 None"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+            future_to_name = { executor.submit(LLMSafetyWrapper.safe_invoke, agent, data, name, semantic_scope=semantic_scope, node=node, ticker=ticker): name for name, (agent, data) in tasks.items() }
             for future in as_completed(future_to_name):
                 name = future_to_name[future]
                 try:
                     result = future.result()
-                    analysis_results[name] = result
+                    results[name] = result
                     print_agent_output(name.replace('_', ' ').title(), result)
                 except Exception as e:
-                    analysis_results[name] = None
-        return analysis_results
+                    results[name] = None
+        return results
+
+    def run_analysts(self, state: AgentState, keys: Tuple[str, ...]):
+        logging.info(f"--- [分析师团队] {', '.join(keys)}: 输入已就绪，启动分析... ---")
+        tasks = {key: task for key, task in self._analyst_tasks(state).items() if key in keys}
+        hashes, hits = self._memo_lookup(tasks, state['ticker'])
+        tasks, merged = self._analyst_plan(state, {key: task for key, task in tasks.items() if key not in hits})
+        analysis_results = self._parallel_invoke(tasks, "analyst_team", state['ticker'], semantic_scope=state['ticker'])
+        fallback = self._unpack_panel(analysis_results, merged)
+        if fallback:
+            analysis_results.update(self._parallel_invoke(fallback, "analyst_team", state['ticker'], semantic_scope=state['ticker']))
+        self._memo_store_results(analysis_results, hashes, state['ticker'])
+        return self._merge_skipped(analysis_results, hits)
+
+    # --- 节点记忆：输入哈希未变化的智能体直接复用上次的输出（见 node_memo.py） ---
+    @staticmethod
+    def _memo_lookup(tasks: dict, ticker: str):
+        """按 {名称: (链, 该智能体消费的输入)} 计算该股票的输入哈希，返回 (各名称的哈希, 命中记忆的状态更新)"""
+        memo = get_node_memo()
+        if memo is None:
+            return {}, {}
+        hashes = {name: memo.input_hash(name, ticker, inputs, chain) for name, (chain, inputs) in tasks.items()}
+        hits = {}
+        for name, input_hash in hashes.items():
+            update = memo.get(name, input_hash)
+            if update is not None:
+                hits[name] = update
+        return hashes, hits
+
+    @staticmethod
+    def _memo_store(updates: dict, hashes: dict, ticker: str):
+        """记忆 {名称: 状态更新}"""
+        memo = get_node_memo()
+        if memo is None:
+            return
+        for name, update in updates.items():
+            if name in hashes:
+                memo.put(name, hashes[name], update, ticker)
+
+    @classmethod
+    def _memo_store_results(cls, results: dict, hashes: dict, ticker: str):
+        """记忆一组并行调用的结果，每个结果键就是其状态更新的键"""
+        cls._memo_store({name: {name: result} for name, result in results.items()}, hashes, ticker)
+
+    @staticmethod
+    def _merge_skipped(results: dict, hits: dict) -> dict:
+        """合并命中记忆的状态更新，并在状态中记录被跳过的智能体"""
+        for update in hits.values():
+            results.update(update)
+        if hits:
+            logging.info(f"♻️ 节点记忆: {', '.join(hits)} 的输入未变化，跳过并复用上次结果")
+            results[SKIPPED_KEY] = list(hits)
+        return results
+
+    @staticmethod
+    def _log_semantic_cache_stats():
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            logging.info(f"语义缓存统计: {semantic_cache.stats()}")
 
     # --- [核心修复] 补全以下缺失的函数 ---
+    @staticmethod
+    def _analyst_briefing(state: AgentState) -> str:
+        """渲染《投研简报》：研究主管与首席投资官的共享Prompt前缀"""
+        reports = {key: state[key].analysis for key in ANALYST_REPORT_TITLES if state.get(key) and hasattr(state[key], 'analysis')}
+        return render_analyst_briefing(compress_for_agent(reports, "research_manager"))
+
+    @classmethod
+    def _research_manager_input(cls, state: AgentState) -> dict:
+        return {"ticker": state['ticker'], "stock_name": state['stock_name'], "analyst_briefing": cls._analyst_briefing(state)}
+
+    def _research_manager_memo(self, state: AgentState):
+        """研究主管以压缩前的7份报告为记忆输入，命中时连同简报压缩一起跳过"""
+        reports = {key: state.get(key) for key in ANALYST_REPORT_TITLES}
+        return self._memo_lookup({"research_manager": (
+            self.research_manager, {"ticker": state['ticker'], "stock_name": state['stock_name'], "reports": reports}
+        )}, state['ticker'])
+
     def run_research_manager(self, state: AgentState):
         logging.info("--- [节点 3/5] 研究主管: 正在整合7份报告... ---")
-        manager_input = { "ticker": state['ticker'], "stock_name": state['stock_name'] }
-        for key, value in state.items():
-            if "analysis" in key and value and hasattr(value, 'analysis'):
-                manager_input[key] = value.analysis
-            else:
-                manager_input[key] = ""
-        summary = LLMSafetyWrapper.safe_invoke(self.research_manager, manager_input, "研究主管")
+        self._log_semantic_cache_stats()
+        hashes, hits = self._research_manager_memo(state)
+        if hits:
+            return self._merge_skipped({}, hits)
+        manager_input = self._research_manager_input(state)
+        summary = LLMSafetyWrapper.safe_invoke(self.research_manager, manager_input, "研究主管", node="research_manager", ticker=state['ticker'])
         print_agent_output("研究主管 (会议纪要)", summary)
-        return {"research_summary": summary}
+        update = {"research_summary": summary, "analyst_briefing": manager_input["analyst_briefing"]}
+        self._memo_store({"research_manager": update}, hashes, state['ticker'])
+        return update
 
     def run_debate_and_risk_team(self, state: AgentState):
         logging.info("--- [节点 4/5] 辩论与风控团队: 并行启动... ---")
+        tasks = self._debate_tasks(state)
+        hashes, hits = self._memo_lookup(tasks, state['ticker'])
+        results = self._parallel_invoke({name: task for name, task in tasks.items() if name not in hits}, "debate_and_risk_team", state['ticker'])
+        self._memo_store_results(results, hashes, state['ticker'])
+        return self._merge_skipped(results, hits)
+
+    def _debate_tasks(self, state: AgentState) -> dict:
+        """构建多头、空头与风控的 {结果键: (链, 输入)}；三者共用同一份会议纪要输入，Prompt前缀一致"""
         summary = state['research_summary']
         if not summary:
             raise TradingSystemError("研究主管未能生成摘要，无法进行辩论和风控。")
-        tasks = {
-            "bullish_report": (self.bull_researcher, {"ticker": state['ticker'], "stock_name": state['stock_name'], "bull_case_points": summary.bull_case, "key_confirmations": summary.key_confirmations, "key_contradictions": summary.key_contradictions}),
-            "bearish_report": (self.bear_researcher, {"ticker": state['ticker'], "stock_name": state['stock_name'], "bear_case_points": summary.bear_case, "key_confirmations": summary.key_confirmations, "key_contradictions": summary.key_contradictions}),
-            "risk_analysis": (self.risk_manager, {"key_confirmations": summary.key_confirmations, "key_contradictions": summary.key_contradictions, "bull_case": summary.bull_case, "bear_case": summary.bear_case})
+        briefing = {
+            "ticker": state['ticker'], "stock_name": state['stock_name'],
+            "key_confirmations": summary.key_confirmations, "key_contradictions": summary.key_contradictions,
+            "bull_case": summary.bull_case, "bear_case": summary.bear_case
+        }
+        return {
+            "bullish_report": (self.bull_researcher, dict(briefing)),
+            "bearish_report": (self.bear_researcher, dict(briefing)),
+            "risk_analysis": (self.risk_manager, dict(briefing))
         }
-        results = {}
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_name = { executor.submit(LLMSafetyWrapper.safe_invoke, agent, data, name): name for name, (agent, data) in tasks.items() }
-            for future in as_completed(future_to_name):
-                name = future_to_name[future]
-                try:
-                    result = future.result()
-                    results[name] = result
-                    print_agent_output(name.replace('_', ' ').title(), result)
-                except Exception as e:
-                    results[name] = None
-        return results
+
+    def _trader_memo(self, state: AgentState):
+        """首席投资官以压缩前的简报、多空/风控报告与最新收盘价为记忆输入"""
+        inputs = {
+            "ticker": state['ticker'], "stock_name": state['stock_name'], "latest_close_price": state['latest_close_price'],
+            "analyst_briefing": state.get('analyst_briefing'),
+            "reports": {key: state.get(key) for key in ("bullish_report", "bearish_report", "risk_analysis")},
+        }
+        return self._memo_lookup({"trader": (self.trader, inputs)}, state['ticker'])
 
     def run_trader(self, state: AgentState):
         logging.info("--- [节点 5/5] 首席投资官: 正在进行最终决策... ---")
-        full_briefing_book_parts = []
-        analyst_keys = ['fundamentals_analysis', 'market_analysis', 'news_analysis', 'policy_analysis', 'social_media_analysis', 'capital_flow_analysis', 'sector_analysis']
-        for key in analyst_keys:
-            report = state.get(key)
-            if report and hasattr(report, 'analysis'):
-                title = key.replace('_', ' ').title()
-                full_briefing_book_parts.append(f"--- {title} ---\n{report.analysis}\n")
-        full_briefing_book = "\n".join(full_briefing_book_parts)
-        trader_input = {
-            "ticker": state['ticker'], "stock_name": state['stock_name'], "latest_close_price": state['latest_close_price'],
-            "full_briefing_book": full_briefing_book,
+        hashes, hits = self._trader_memo(state)
+        if hits:
+            return self._merge_skipped({}, hits)
+        trader_input = self._trader_input(state)
+        decision = LLMSafetyWrapper.safe_invoke(self.trader, trader_input, "首席投资官", node="trader", ticker=state['ticker'])
+        self._memo_store({"trader": {"final_decision": decision}}, hashes, state['ticker'])
+        return {"final_decision": decision}
+
+    @classmethod
+    def _trader_input(cls, state: AgentState) -> dict:
+        # 原样复用研究主管的《投研简报》，两次调用的Prompt前缀逐字节一致
+        analyst_briefing = state.get('analyst_briefing') or cls._analyst_briefing(state)
+        reports = {
             "bull_report": state['bullish_report'].analysis if state.get('bullish_report') else "多头报告生成失败",
             "bear_report": state['bearish_report'].analysis if state.get('bearish_report') else "空头报告生成失败",
             "risk_report": state['risk_analysis'].analysis if state.get('risk_analysis') else "风险报告生成失败"
         }
-        decision = LLMSafetyWrapper.safe_invoke(self.trader, trader_input, "首席投资官")
-        return {"final_decision": decision}
\ No newline at end of file
+        # 多空/风控报告使用首席投资官输入预算中简报之外的部分
+        reports = compress_for_agent(reports, "trader", reserved_tokens=estimate_tokens(analyst_briefing))
+        trader_input = {
+            "ticker": state['ticker'], "stock_name": state['stock_name'], "latest_close_price": state['latest_close_price'],
+            "analyst_briefing": analyst_briefing,
+            "bull_report": reports["bull_report"],
+            "bear_report": reports["bear_report"],
+            "risk_report": reports["risk_report"]
+        }
+        return trader_input
+
+    # --- 异步执行路径: 节点为协程，LLM调用通过 safe_ainvoke 在共享信号量下并发 ---
+    async def _gather_ainvoke(self, tasks: dict, node: str, ticker: str, semantic_scope: str = None) -> dict:
+        """并发执行一组链调用，单个失败时结果记为 None"""
+        names = list(tasks)
+        outcomes = await asyncio.gather(
+            *(LLMSafetyWrapper.safe_ainvoke(agent, data, name, semantic_scope=semantic_scope, node=node, ticker=ticker)
+              for name, (agent, data) in tasks.items()),
+            return_exceptions=True
+        )
+        results = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                results[name] = None
+            else:
+                results[name] = outcome
+                print_agent_output(name.replace('_', ' ').title(), outcome)
+        return results
+
+    async def agather_intelligence(self, state: AgentState, source: str):
+        # 数据接口为同步实现（akshare/requests），放到线程中执行以免阻塞事件循环
+        return await asyncio.to_thread(self.gather_intelligence, state, source)
+
+    async def arun_analysts(self, state: AgentState, keys: Tuple[str, ...]):
+        logging.info(f"--- [分析师团队] {', '.join(keys)}: 输入已就绪，异步启动分析... ---")
+        tasks = {key: task for key, task in self._analyst_tasks(state).items() if key in keys}
+        hashes, hits = self._memo_lookup(tasks, state['ticker'])
+        tasks, merged = self._analyst_plan(state, {key: task for key, task in tasks.items() if key not in hits})
+        analysis_results = await self._gather_ainvoke(tasks, "analyst_team", state['ticker'], semantic_scope=state['ticker'])
+        fallback = self._unpack_panel(analysis_results, merged)
+        if fallback:
+            analysis_results.update(await self._gather_ainvoke(fallback, "analyst_team", state['ticker'], semantic_scope=state['ticker']))
+        self._memo_store_results(analysis_results, hashes, state['ticker'])
+        return self._merge_skipped(analysis_results, hits)
+
+    async def arun_research_manager(self, state: AgentState):
+        logging.info("--- [节点 3/5] 研究主管: 正在整合7份报告... ---")
+        self._log_semantic_cache_stats()
+        hashes, hits = self._research_manager_memo(state)
+        if hits:
+            return self._merge_skipped({}, hits)
+        manager_input = self._research_manager_input(state)
+        summary = await LLMSafetyWrapper.safe_ainvoke(self.research_manager, manager_input, "研究主管", node="research_manager", ticker=state['ticker'])
+        print_agent_output("研究主管 (会议纪要)", summary)
+        update = {"research_summary": summary, "analyst_briefing": manager_input["analyst_briefing"]}
+        self._memo_store({"research_manager": update}, hashes, state['ticker'])
+        return update
+
+    async def arun_debate_and_risk_team(self, state: AgentState):
+        logging.info("--- [节点 4/5] 辩论与风控团队: 异步并发启动... ---")
+        tasks = self._debate_tasks(state)
+        hashes, hits = self._memo_lookup(tasks, state['ticker'])
+        results = await self._gather_ainvoke({name: task for name, task in tasks.items() if name not in hits}, "debate_and_risk_team", state['ticker'])
+        self._memo_store_results(results, hashes, state['ticker'])
+        return self._merge_skipped(results, hits)
+
+    async def arun_trader(self, state: AgentState):
+        logging.info("--- [节点 5/5] 首席投资官: 正在进行最终决策... ---")
+        hashes, hits = self._trader_memo(state)
+        if hits:
+            return self._merge_skipped({}, hits)
+        decision = await LLMSafetyWrapper.safe_ainvoke(self.trader, self._trader_input(state), "首席投资官", node="trader", ticker=state['ticker'])
+        self._memo_store({"trader": {"final_decision": decision}}, hashes, state['ticker'])
+        return {"final_decision": decision}
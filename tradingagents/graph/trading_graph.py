@@ -1,33 +1,84 @@
 # tradingagents/graph/trading_graph.py (V6.3 最终版)
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 import logging
+from typing_extensions import TypedDict
 # [路径修正] 从正确的 utils 路径导入
 from tradingagents.utils.agent_states import AgentState
-from .setup import GraphNodes
+from .setup import GraphNodes, INTEL_SOURCES, ANALYST_SOURCES, SKIPPED_KEY
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def build_graph() -> callable:
-    """构建并编译 LangGraph 工作流图"""
+def _branch_name(source: str) -> str:
+    return source.replace("_intel", "_branch")
+
+def _build_branch(nodes: GraphNodes, source: str, analysts: dict, async_mode: bool):
+    """
+    一个情报来源连同只依赖它的分析师组成一个子图：情报节点 → 各分析师节点并行。
+    LangGraph 按超步执行，同一超步的节点全部完成后才进入下一步；放进子图后，
+    各来源的分析师只等待自己的情报，不必等待最慢的情报节点（如Tavily搜索）。
+    """
+    branch = StateGraph(AgentState, output_schema=TypedDict(f"{_branch_name(source)}_output", {
+        key: AgentState.__annotations__[key]
+        for key in (*INTEL_SOURCES[source][2], *(k for keys in analysts.values() for k in keys), SKIPPED_KEY)
+    }))
+    branch.add_node(source, nodes.intel_node(source, async_mode))
+    branch.add_edge(START, source)
+    for name, keys in analysts.items():
+        branch.add_node(name, nodes.analyst_node(keys, async_mode))
+        branch.add_edge(source, name)
+        branch.add_edge(name, END)
+    if not analysts:
+        branch.add_edge(source, END)
+    # 不单独指定检查点存储，沿用父图的（检查点按子图命名空间保存，恢复时只重跑子图中未完成的节点）
+    return branch.compile()
+
+def build_graph(async_mode: bool = False, checkpointer=None) -> callable:
+    """
+    构建并编译 LangGraph 工作流图。
+    async_mode=True 时节点注册为协程版本，需用 `ainvoke`/`astream` 驱动，
+    多只股票可在同一事件循环上并发运行并共享LLM并发上限。
+    传入 checkpointer（见 checkpointer.py）时每个节点完成后写入检查点，调用时需在 config 中指定 thread_id。
+
+    情报收集与分析师按数据依赖拆分为细粒度节点：技术面、财务、新闻三个情报分支并行，
+    技术分析师拿到技术报告、基本面分析师拿到财务指标后立即开始，各分支结果经状态的
+    reducer 合并后汇入研究主管。
+    """
     nodes = GraphNodes()
     workflow = StateGraph(AgentState)
-    
-    # 定义所有节点
-    workflow.add_node("gather_intelligence", nodes.gather_intelligence)
-    workflow.add_node("analyst_team", nodes.run_analyst_team)
-    workflow.add_node("research_manager", nodes.run_research_manager)
-    workflow.add_node("debate_and_risk_team", nodes.run_debate_and_risk_team)
-    workflow.add_node("trader", nodes.run_trader)
-    
-    # 定义工作流的边（执行顺序）
-    workflow.set_entry_point("gather_intelligence")
-    workflow.add_edge("gather_intelligence", "analyst_team")
-    workflow.add_edge("analyst_team", "research_manager")
+
+    # 按依赖的情报来源划分分析师节点；依赖多个来源的（如跨来源的分析师合议）放在父图中等待这些分支
+    branches = {source: {} for source in INTEL_SOURCES}
+    joined = {}
+    for name, keys in nodes.analyst_groups().items():
+        sources = sorted({ANALYST_SOURCES[key] for key in keys})
+        if len(sources) == 1:
+            branches[sources[0]][name] = keys
+        else:
+            joined[name] = (keys, sources)
+
+    for source, analysts in branches.items():
+        workflow.add_node(_branch_name(source), _build_branch(nodes, source, analysts, async_mode))
+        workflow.add_edge(START, _branch_name(source))
+    for name, (keys, sources) in joined.items():
+        workflow.add_node(name, nodes.analyst_node(keys, async_mode))
+        workflow.add_edge([_branch_name(source) for source in sources], name)
+
+    if async_mode:
+        workflow.add_node("research_manager", nodes.arun_research_manager)
+        workflow.add_node("debate_and_risk_team", nodes.arun_debate_and_risk_team)
+        workflow.add_node("trader", nodes.arun_trader)
+    else:
+        workflow.add_node("research_manager", nodes.run_research_manager)
+        workflow.add_node("debate_and_risk_team", nodes.run_debate_and_risk_team)
+        workflow.add_node("trader", nodes.run_trader)
+
+    # 研究主管等待所有分支（及跨来源的分析师节点）完成
+    workflow.add_edge([*(_branch_name(source) for source in branches), *joined], "research_manager")
     workflow.add_edge("research_manager", "debate_and_risk_team")
     workflow.add_edge("debate_and_risk_team", "trader")
     workflow.add_edge("trader", END)
-    
+
     # 编译图
-    graph = workflow.compile()
-    logging.info("投研工作流图编译完成！")
-    return graph
\ No newline at end of file
+    graph = workflow.compile(checkpointer=checkpointer)
+    logging.info(f"投研工作流图编译完成！（{'异步' if async_mode else '同步'}模式，{len(branches)} 个情报分支）")
+    return graph
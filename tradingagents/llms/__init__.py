@@ -1,7 +1,7 @@
 # tradingagents/llms/__init__.py (V16.0 修复版)
 import os
 import logging
-import httpx
+import functools
 from langchain_core.language_models.chat_models import BaseChatModel
 
 try:
@@ -19,52 +19,93 @@ except ImportError:
     logging.critical("无法加载 default_config.py，程序无法启动。")
     exit()
 
-def llm_client_factory(provider: str = None) -> BaseChatModel:
-    """创建LLM客户端，支持代理配置"""
-    provider_to_use = provider if provider else ANALYSIS_LLM_PROVIDER
-    logging.info(f"LLM客户端工厂: 正在为 '{provider_to_use}' 任务创建模型客户端...")
+from tradingagents.utils.output_repair import parse_locally
+from .registry import get_llm_registry
+from .router import hedging_enabled_for, build_hedged_model, LLM_HEDGING_CONFIG
+from .fake_provider import build_fake_llm
+from .routing import LLMRoute, resolve_route
+
+# 非空时所有LLM调用都改用该提供商（如 main.py --fake-llm 离线压测时为 "fake"）
+_provider_override = os.environ.get("TRADINGAGENTS_LLM_PROVIDER") or None
+
+def set_provider_override(provider: str = None):
+    """强制所有智能体使用同一提供商；传 None 恢复按配置选择"""
+    global _provider_override
+    _provider_override = provider
+
+def llm_client_factory(provider: str = None, agent: str = None, output_parser=None) -> BaseChatModel:
+    """
+    获取LLM客户端，同一提供商（及模型参数）在进程内只构建一次（见 registry.py）。
+    agent 为智能体或处理阶段名，按 LLM_ROUTING_CONFIG 选择提供商、模型、温度与最大输出Token（见 routing.py）；
+    研究主管/首席投资官等启用了对冲的步骤返回跨提供商的对冲模型（见 router.py），
+    output_parser 用于校验各提供商的回答是否可被解析。
+    """
+    # 强制使用某提供商（如离线压测）时不套用路由表
+    route = LLMRoute() if _provider_override else resolve_route(agent, provider)
+    provider_to_use = _provider_override or provider or route.provider or ANALYSIS_LLM_PROVIDER
+    if hedging_enabled_for(agent) and not _provider_override:
+        hedged = _build_hedged_client(provider_to_use, agent, output_parser, route)
+        if hedged is not None:
+            return hedged
+    return get_llm_registry().get(route.registry_key(provider_to_use),
+                                  lambda: _build_llm_client(provider_to_use, **route.options))
+
+def _build_hedged_client(primary: str, agent: str, output_parser=None, route: LLMRoute = LLMRoute()):
+    """主提供商（按路由表的模型参数）在前，其余已配置的提供商作为对冲/故障切换备选；可用提供商不足两个时返回 None"""
+    registry = get_llm_registry()
+    providers = [primary] + [p for p in LLM_HEDGING_CONFIG.get("providers", ("gemini", "qwen")) if p != primary]
+    clients = []
+    for name in providers:
+        options = route.options if name == primary else {}
+        key = route.registry_key(name) if name == primary else name
+        try:
+            clients.append((name, registry.get(key, lambda name=name, options=options: _build_llm_client(name, **options))))
+        except ValueError as e:
+            logging.warning(f"LLM客户端工厂: 备选提供商 '{name}' 不可用，已跳过: {e}")
+    if len(clients) < 2 or clients[0][0] != primary:
+        return None
+    # 能在本地修复的输出也视为有效（见 utils/output_repair.py）
+    validator = functools.partial(parse_locally, parser=output_parser) if output_parser is not None else None
+    # 解析器不同，对冲模型按智能体分别缓存
+    return registry.get(("hedged", agent, tuple(n for n, _ in clients)),
+                        lambda: build_hedged_model(agent, clients, validator))
+
+def _build_llm_client(provider_to_use: str, model: str = None, temperature: float = None,
+                      max_output_tokens: int = None) -> BaseChatModel:
+    """创建LLM客户端，支持代理配置；model/temperature/max_output_tokens 为空时使用提供商配置中的默认值"""
+    logging.info(
+        f"LLM客户端工厂: 正在为 '{provider_to_use}' 任务创建模型客户端..."
+        + (f" (模型 {model or '默认'}，温度 {temperature if temperature is not None else '默认'}，"
+           f"最大输出 {max_output_tokens or '默认'})" if model or temperature is not None or max_output_tokens else "")
+    )
 
     if provider_to_use == "gemini":
         api_key = GEMINI_CONFIG.get("api_key")
         if not api_key or "在这里粘贴" in api_key:
             raise ValueError("Gemini API Key 未在 default_config.py 中正确配置。")
         
-        # 修复：使用httpx处理代理
+        options = dict(
+            model=model or GEMINI_CONFIG.get("model_name", "gemini-1.5-flash"),
+            google_api_key=api_key,
+            temperature=0.7 if temperature is None else temperature,
+            convert_system_message_to_human=True,
+            max_retries=3,
+            timeout=60
+        )
+        if max_output_tokens:
+            options["max_output_tokens"] = max_output_tokens
+
         proxies = NETWORK_CONFIG.get('proxy') if NETWORK_CONFIG else None
         
         if proxies:
-            # 设置环境变量方式（推荐）
-            if 'http' in proxies:
-                os.environ['HTTP_PROXY'] = proxies['http']
-                os.environ['HTTPS_PROXY'] = proxies.get('https', proxies['http'])
-                logging.info(f"已通过环境变量配置Gemini代理: {proxies['http']}")
-            
-            # 创建自定义httpx客户端
-            transport = httpx.HTTPTransport(proxy=proxies.get('http'))
-            client = httpx.Client(transport=transport)
-            
-            llm = ChatGoogleGenerativeAI(
-                model=GEMINI_CONFIG.get("model_name", "gemini-1.5-flash"),
-                google_api_key=api_key,
-                temperature=0.7,
-                convert_system_message_to_human=True,
-                max_retries=3,
-                timeout=60,
-                # 使用自定义client
-                client=client if proxies else None
-            )
-        else:
-            # 无代理配置
-            llm = ChatGoogleGenerativeAI(
-                model=GEMINI_CONFIG.get("model_name", "gemini-1.5-flash"),
-                google_api_key=api_key,
-                temperature=0.7,
-                convert_system_message_to_human=True,
-                max_retries=3,
-                timeout=60
-            )
+            # 代理环境变量与httpx连接池在注册表中只配置一次，代理模式下的Gemini客户端共享；
+            # 未配置代理的Gemini与通义千问由各自SDK管理连接，不经过共享连接池
+            registry = get_llm_registry()
+            registry.configure_proxy_env(proxies)
+            # 使用共享client
+            options["client"] = registry.get_http_client(proxy=proxies.get('http'))
         
-        return llm
+        return ChatGoogleGenerativeAI(**options)
 
     elif provider_to_use == "qwen":
         api_key = QWEN_CONFIG.get("api_key")
@@ -73,10 +114,17 @@ def llm_client_factory(provider: str = None) -> BaseChatModel:
         
         os.environ["DASHSCOPE_API_KEY"] = api_key
         return ChatTongyi(
-            model_name=QWEN_CONFIG.get("model_name", "qwen-max"),
-            temperature=QWEN_CONFIG.get("temperature", 0.7),
-            max_retries=3
+            model_name=model or QWEN_CONFIG.get("model_name", "qwen-max"),
+            temperature=QWEN_CONFIG.get("temperature", 0.7) if temperature is None else temperature,
+            max_retries=3,
+            # DashScope 的最大输出长度参数为 max_tokens
+            model_kwargs={"max_tokens": max_output_tokens} if max_output_tokens else {}
         )
 
+    elif provider_to_use == "fake":
+        # 离线模拟模型，无需API Key与网络（见 fake_provider.py）
+        overrides = {"model": model, "temperature": temperature}
+        return build_fake_llm(**{k: v for k, v in overrides.items() if v is not None})
+
     else:
-        raise ValueError(f"不支持的LLM提供商: '{provider_to_use}'")
\ No newline at end of file
+        raise ValueError(f"不支持的LLM提供商: '{provider_to_use}'")
@@ -0,0 +1,397 @@
+# tradingagents/llms/fake_provider.py - 离线可复现的模拟LLM提供商
+"""
+用于在没有API Key与外网的环境下压测编排、缓存与并发逻辑的模拟聊天模型（提供商名 "fake"）：
+- 从Prompt中的 format_instructions 提取JSON Schema，生成满足该Schema的输出
+  （TradePlan、ResearchSummary、各分析师模型等都能直接被 PydanticOutputParser 解析）；
+  Prompt中没有Schema时返回一段模拟文本；
+- 首Token延迟按配置的分布抽样（fixed / uniform / normal / lognormal），
+  之后按 tokens_per_second 模拟输出速率，流式调用逐块返回；
+- 可按比例注入调用失败、超时与格式错误的输出；
+- 支持 bind_tools，可用于验证原生结构化输出（工具调用）模式；
+- 模拟提供商的前缀缓存：Prompt按固定长度分块做链式哈希，与此前调用相同的前缀块计为缓存命中，
+  在用量中以 input_token_details.cache_read 返回，且只有未命中的输入Token计入预填充耗时；
+  与真实提供商一样，写入的前缀要等该次调用开始输出后才能被其他调用命中；
+- 同一随机种子下，相同Prompt的第N次调用结果固定，便于复现。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from tradingagents.utils.chain_utils import estimate_tokens
+
+try:
+    from tradingagents.default_config import FAKE_LLM_CONFIG
+except ImportError:
+    FAKE_LLM_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATTERN = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+FILLER_SENTENCES = (
+    "近{n}个交易日成交量较前期放大{x}%，资金关注度有所提升。",
+    "公司最新季度营收同比增长{x}%，毛利率维持在{y}%附近。",
+    "行业景气度边际改善，但估值已处于近{n}年{y}%分位。",
+    "主要风险在于原材料价格波动，可能压缩{x}%的利润空间。",
+    "综合来看，短期维持中性判断，关注{n}日均线附近的支撑。",
+    "政策面整体偏暖，预计对板块情绪形成{x}%左右的提振。",
+)
+
+class FakeLLMError(ConnectionError):
+    """模拟的提供商调用失败"""
+    pass
+
+def _sample_latency(spec: Dict[str, Any], rng: random.Random) -> float:
+    """按分布配置抽样一个延迟（秒），结果截断在 [min, max] 内"""
+    distribution = spec.get("distribution", "lognormal")
+    if distribution == "fixed":
+        value = spec.get("value", 1.0)
+    elif distribution == "uniform":
+        value = rng.uniform(spec.get("low", 0.5), spec.get("high", 2.0))
+    elif distribution == "normal":
+        value = rng.gauss(spec.get("mean", 1.0), spec.get("sigma", 0.3))
+    else:
+        # 对数正态：大部分请求接近中位数，少量请求形成长尾，接近真实LLM的延迟分布
+        value = rng.lognormvariate(math.log(spec.get("median", 1.0)), spec.get("sigma", 0.5))
+    return min(max(value, spec.get("min", 0.0)), spec.get("max", 60.0))
+
+def _filler(rng: random.Random, chars: int) -> str:
+    parts, size = [], 0
+    while size < chars:
+        sentence = rng.choice(FILLER_SENTENCES).format(
+            n=rng.randint(3, 60), x=round(rng.uniform(1, 30), 1), y=round(rng.uniform(10, 90), 1)
+        )
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+def extract_schema(prompt_text: str) -> Optional[Dict[str, Any]]:
+    """从 PydanticOutputParser 的格式说明中取出JSON Schema（取最后一个带 properties 的代码块）"""
+    for block in reversed(SCHEMA_PATTERN.findall(prompt_text)):
+        try:
+            schema = json.loads(block)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(schema, dict) and "properties" in schema:
+            return schema
+    return None
+
+class SchemaFaker:
+    """按JSON Schema生成符合约束的模拟数据"""
+
+    def __init__(self, rng: random.Random, text_chars: int = 200):
+        self.rng = rng
+        self.text_chars = text_chars
+
+    def generate(self, schema: Dict[str, Any]) -> Any:
+        return self._value(schema, schema.get("$defs", {}), "")
+
+    def _value(self, schema: Dict[str, Any], defs: Dict[str, Any], name: str) -> Any:
+        if "$ref" in schema:
+            return self._value(defs.get(schema["$ref"].split("/")[-1], {}), defs, name)
+        for key in ("anyOf", "oneOf", "allOf"):
+            if key in schema:
+                options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+                return self._value({**options[0], **{k: v for k, v in schema.items() if k != key}}, defs, name)
+        if "const" in schema:
+            return schema["const"]
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        # format_instructions 会去掉顶层的 type，有 properties 即视为对象
+        kind = schema.get("type") or ("object" if "properties" in schema else "string")
+        if kind == "object":
+            return {
+                prop: self._value(sub, defs, prop)
+                for prop, sub in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            low = schema.get("minItems", 1)
+            high = max(low, min(schema.get("maxItems", 3), 3))
+            return [self._value(schema.get("items", {}), defs, name) for _ in range(self.rng.randint(low, high))]
+        if kind == "integer":
+            low, high = self._bounds(schema, 1, 100, 1)
+            return self.rng.randint(math.ceil(low), math.floor(high))
+        if kind == "number":
+            low, high = self._bounds(schema, -1.0, 1.0, 0.01)
+            return round(self.rng.uniform(low, high), 2)
+        if kind == "boolean":
+            return self.rng.random() < 0.5
+        return self._string(schema, name)
+
+    @staticmethod
+    def _bounds(schema: Dict[str, Any], low: float, high: float, step: float) -> Tuple[float, float]:
+        if "minimum" in schema:
+            low = schema["minimum"]
+        elif "exclusiveMinimum" in schema:
+            low = schema["exclusiveMinimum"] + step
+        if "maximum" in schema:
+            high = schema["maximum"]
+        elif "exclusiveMaximum" in schema:
+            high = schema["exclusiveMaximum"] - step
+        return low, max(low, high)
+
+    def _string(self, schema: Dict[str, Any], name: str) -> str:
+        description = schema.get("description", "")
+        if schema.get("format") == "date" or "日期" in description or "date" in name:
+            return date.today().isoformat()
+        if "url" in name.lower() or "链接" in description:
+            return f"https://example.com/fake/{self.rng.randint(1000, 9999)}"
+        title = schema.get("title") or name or "内容"
+        text = f"【模拟】{title}：{_filler(self.rng, self.text_chars)}"
+        max_length = schema.get("maxLength")
+        return text[:max_length] if max_length else text
+
+def _malform(data: Dict[str, Any], rng: random.Random) -> str:
+    """模拟真实模型常见的格式问题：多包一层、数字带单位、Python字典风格、代码块内尾逗号且被截断"""
+    style = rng.choice(("wrapped", "units", "python", "truncated"))
+    if style == "wrapped":
+        return json.dumps({"结果": data}, ensure_ascii=False)
+    if style == "units":
+        data = {k: f"{v}分" if isinstance(v, int) and not isinstance(v, bool) else v for k, v in data.items()}
+        return json.dumps(data, ensure_ascii=False)
+    if style == "python":
+        return "以下是分析结果：" + repr(data)
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    return "好的，以下是结果：\n```json\n" + text[:-2].rstrip() + ",\n```"
+
+@dataclass
+class _FakeReply:
+    """一次模拟调用的计划：输出文本（工具调用时为参数JSON）、首Token延迟与注入的异常"""
+    text: str
+    first_token_delay: float
+    prompt_text: str
+    error: Optional[Exception] = None
+    tool_name: Optional[str] = None
+    cached_tokens: int = 0
+
+    @property
+    def call_id(self) -> str:
+        return "call_" + hashlib.md5(self.text.encode("utf-8")).hexdigest()[:12]
+
+class FakeChatModel(BaseChatModel):
+    """离线模拟聊天模型，可直接放进 `prompt | llm | parser` 链"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    seed: int = 42
+    latency: Dict[str, Any] = Field(default_factory=lambda: {"distribution": "lognormal", "median": 1.0, "sigma": 0.5})
+    tokens_per_second: float = 80.0
+    time_scale: float = 1.0
+    failure_rate: float = 0.0
+    timeout_rate: float = 0.0
+    malformed_rate: float = 0.0
+    text_chars: int = 200
+    chunk_chars: int = 8
+    prefill_tokens_per_second: float = 5000.0
+    prefix_cache: bool = True
+    cache_block_chars: int = 256
+    cache_capacity: int = 8192
+    model: str = "fake-chat"
+    provider_name: str = "fake"
+    temperature: float = 0.0
+
+    _occurrences: Dict[str, int] = PrivateAttr(default_factory=lambda: defaultdict(int))
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: defaultdict(int))
+    _prefix_blocks: Any = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @staticmethod
+    def _prompt_text(messages: List[BaseMessage]) -> str:
+        return "\n".join(m.content if isinstance(m.content, str) else json.dumps(m.content, ensure_ascii=False)
+                         for m in messages)
+
+    def _rng(self, prompt_text: str) -> random.Random:
+        """相同Prompt的第N次调用使用相同的随机序列，与并发调度顺序无关"""
+        digest = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences[digest]
+            self._occurrences[digest] += 1
+            self._stats["calls"] += 1
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _prefix_keys(self, prompt_text: str) -> List[str]:
+        """按块对Prompt做链式哈希，第N个键代表前N块组成的前缀"""
+        digest, keys = hashlib.sha256(), []
+        for end in range(self.cache_block_chars, len(prompt_text) + 1, self.cache_block_chars):
+            digest.update(prompt_text[end - self.cache_block_chars:end].encode("utf-8"))
+            keys.append(digest.hexdigest())
+        return keys
+
+    def _cached_prefix_chars(self, keys: List[str]) -> int:
+        """已可用的最长缓存前缀（字符数）"""
+        now, hits = time.monotonic(), 0
+        with self._lock:
+            for key in keys:
+                ready_at = self._prefix_blocks.get(key)
+                if ready_at is None or ready_at > now:
+                    break
+                hits += 1
+        return hits * self.cache_block_chars
+
+    def _remember_prefix(self, keys: List[str], ready_at: float):
+        """写入本次Prompt的前缀块，超出容量时淘汰最久未用的块"""
+        with self._lock:
+            for key in keys:
+                self._prefix_blocks[key] = min(self._prefix_blocks.get(key, ready_at), ready_at)
+                self._prefix_blocks.move_to_end(key)
+            while len(self._prefix_blocks) > self.cache_capacity:
+                self._prefix_blocks.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs):
+        """模拟原生结构化输出：绑定工具后以工具调用的形式返回结果"""
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _plan(self, messages: List[BaseMessage], tools: Optional[List[dict]] = None) -> _FakeReply:
+        """决定本次调用的输出、首Token延迟与注入的异常"""
+        prompt_text = self._prompt_text(messages)
+        rng = self._rng(prompt_text)
+        reply = _FakeReply("", _sample_latency(self.latency, rng) * self.time_scale, prompt_text)
+        self._prefill(reply)
+        roll = rng.random()
+        if roll < self.failure_rate:
+            self._count("failures")
+            reply.error = FakeLLMError("模拟的LLM调用失败")
+            return reply
+        if roll < self.failure_rate + self.timeout_rate:
+            self._count("timeouts")
+            reply.first_token_delay = self.latency.get("max", 60.0) * self.time_scale
+            reply.error = TimeoutError("模拟的LLM调用超时")
+            return reply
+        if tools:
+            # 原生结构化输出：按工具参数的Schema生成，不注入格式错误
+            function = tools[0]["function"]
+            reply.tool_name = function["name"]
+            reply.text = json.dumps(SchemaFaker(rng, self.text_chars).generate(function["parameters"]), ensure_ascii=False)
+            return reply
+        schema = extract_schema(prompt_text)
+        if schema is None:
+            reply.text = f"【模拟回复】{_filler(rng, self.text_chars)}"
+            return reply
+        data = SchemaFaker(rng, self.text_chars).generate(schema)
+        if rng.random() < self.malformed_rate:
+            self._count("malformed")
+            reply.text = _malform(data, rng)
+        else:
+            reply.text = json.dumps(data, ensure_ascii=False, indent=2)
+        return reply
+
+    def _prefill(self, reply: _FakeReply):
+        """查询前缀缓存，把未命中部分的预填充耗时计入首Token延迟"""
+        keys = self._prefix_keys(reply.prompt_text) if self.prefix_cache else []
+        if keys:
+            reply.cached_tokens = estimate_tokens(reply.prompt_text[:self._cached_prefix_chars(keys)])
+        prompt_tokens = estimate_tokens(reply.prompt_text)
+        if self.prefill_tokens_per_second:
+            reply.first_token_delay += (prompt_tokens - reply.cached_tokens) / self.prefill_tokens_per_second * self.time_scale
+        if keys:
+            self._remember_prefix(keys, time.monotonic() + reply.first_token_delay)
+        self._count("prompt_tokens", prompt_tokens)
+        self._count("cached_tokens", reply.cached_tokens)
+
+    def _chunks(self, text: str) -> Iterator[Tuple[str, float]]:
+        """把输出切成小块，并给出按输出速率每块应耗费的时间"""
+        for i in range(0, len(text), self.chunk_chars):
+            piece = text[i:i + self.chunk_chars]
+            delay = estimate_tokens(piece) / self.tokens_per_second * self.time_scale if self.tokens_per_second else 0.0
+            yield piece, delay
+
+    def _message(self, reply: _FakeReply) -> AIMessage:
+        if reply.tool_name:
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": reply.tool_name, "args": json.loads(reply.text), "id": reply.call_id}],
+                usage_metadata=self._usage(reply)
+            )
+        return AIMessage(content=reply.text, usage_metadata=self._usage(reply))
+
+    @staticmethod
+    def _chunk(reply: _FakeReply, piece: str, first: bool) -> ChatGenerationChunk:
+        if reply.tool_name:
+            return ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": reply.tool_name if first else None, "args": piece,
+                "id": reply.call_id if first else None, "index": 0
+            }]))
+        return ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    @staticmethod
+    def _usage(reply: _FakeReply) -> Dict[str, Any]:
+        input_tokens, output_tokens = estimate_tokens(reply.prompt_text), estimate_tokens(reply.text)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+                "input_token_details": {"cache_read": reply.cached_tokens}}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        reply = self._plan(messages, kwargs.get("tools"))
+        time.sleep(reply.first_token_delay)
+        if reply.error is not None:
+            raise reply.error
+        time.sleep(sum(delay for _, delay in self._chunks(reply.text)))
+        return ChatResult(generations=[ChatGeneration(message=self._message(reply))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        reply = self._plan(messages, kwargs.get("tools"))
+        await asyncio.sleep(reply.first_token_delay)
+        if reply.error is not None:
+            raise reply.error
+        await asyncio.sleep(sum(delay for _, delay in self._chunks(reply.text)))
+        return ChatResult(generations=[ChatGeneration(message=self._message(reply))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        reply = self._plan(messages, kwargs.get("tools"))
+        time.sleep(reply.first_token_delay)
+        if reply.error is not None:
+            raise reply.error
+        for index, (piece, delay) in enumerate(self._chunks(reply.text)):
+            time.sleep(delay)
+            chunk = self._chunk(reply, piece, index == 0)
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(reply)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._plan(messages, kwargs.get("tools"))
+        await asyncio.sleep(reply.first_token_delay)
+        if reply.error is not None:
+            raise reply.error
+        for index, (piece, delay) in enumerate(self._chunks(reply.text)):
+            await asyncio.sleep(delay)
+            chunk = self._chunk(reply, piece, index == 0)
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(reply)))
+
+def build_fake_llm(**overrides) -> FakeChatModel:
+    """按 FAKE_LLM_CONFIG（及调用方覆盖项）创建模拟模型"""
+    options = {**FAKE_LLM_CONFIG, **overrides}
+    options = {k: v for k, v in options.items() if k in FakeChatModel.model_fields}
+    logger.info(f"LLM客户端工厂: 使用离线模拟模型，配置: {options or '默认'}")
+    return FakeChatModel(**options)
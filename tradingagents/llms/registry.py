@@ -0,0 +1,136 @@
+# tradingagents/llms/registry.py - LLM客户端注册表与共享HTTP连接池
+"""
+按提供商（及模型参数）缓存LLM客户端，整个进程内每种配置只构建一次；代理环境变量也只设置一次。
+
+共享的带连接池的 httpx.Client 目前只覆盖配置了代理（NETWORK_CONFIG['proxy']）的Gemini客户端：
+未配置代理的Gemini由其SDK自行管理连接，通义千问（DashScope SDK基于requests）不接受httpx客户端。
+pool_stats() 中的连接池统计只反映这部分流量，未使用共享连接池时标记为未使用。
+"""
+
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class LLMClientRegistry:
+    """线程安全的LLM客户端注册表"""
+
+    def __init__(
+        self,
+        max_connections: int = 64,
+        max_keepalive_connections: int = 32,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._clients: Dict[Hashable, Any] = {}
+        self._lock = threading.RLock()
+        self._http_client: Optional[httpx.Client] = None
+        self._http_proxy: Optional[str] = None
+        self._proxy_env_configured = False
+        self._stats = {"clients_built": 0, "client_reuses": 0, "http_requests": 0, "http_responses": 0}
+        self._build_seconds = 0.0
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def configure_proxy_env(self, proxies: Optional[dict]):
+        """仅在首次调用时把代理写入环境变量，避免每次创建客户端都改写 os.environ"""
+        with self._lock:
+            if self._proxy_env_configured or not proxies or 'http' not in proxies:
+                return
+            os.environ['HTTP_PROXY'] = proxies['http']
+            os.environ['HTTPS_PROXY'] = proxies.get('https', proxies['http'])
+            self._http_proxy = proxies['http']
+            self._proxy_env_configured = True
+            logger.info(f"已通过环境变量配置LLM代理: {proxies['http']}")
+
+    def get_http_client(self, proxy: Optional[str] = None) -> httpx.Client:
+        """获取进程内共享的 httpx.Client（连接池、keep-alive 参数统一调优）；目前仅代理模式下的Gemini客户端使用"""
+        with self._lock:
+            if self._http_client is None:
+                proxy = proxy or self._http_proxy
+                transport = httpx.HTTPTransport(proxy=proxy, limits=self.limits, retries=1)
+                self._http_client = httpx.Client(
+                    transport=transport,
+                    timeout=self.timeout,
+                    event_hooks={
+                        "request": [lambda request: self._count("http_requests")],
+                        "response": [lambda response: self._count("http_responses")],
+                    }
+                )
+                logger.info(f"已创建共享HTTP连接池: {self.limits}")
+            return self._http_client
+
+    def get(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """按 key 获取客户端，不存在时调用 builder 构建一次"""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats["client_reuses"] += 1
+                return client
+            start_time = time.time()
+            client = builder()
+            self._build_seconds += time.time() - start_time
+            self._clients[key] = client
+            self._stats["clients_built"] += 1
+            logger.info(f"LLM客户端注册表: 已构建 {key}，当前共 {len(self._clients)} 个客户端")
+            return client
+
+    def clear(self):
+        """清空已缓存的客户端并关闭共享连接池"""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """返回客户端复用与共享HTTP连接池的统计信息（连接池只覆盖代理模式下的Gemini流量）"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["clients"] = [str(k) for k in self._clients]
+            stats["client_build_seconds"] = round(self._build_seconds, 3)
+            stats["limits"] = {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+            }
+            http_client = self._http_client
+        if http_client is None:
+            stats["http_pool"] = "未使用（共享连接池仅用于代理模式下的Gemini客户端）"
+            return stats
+        stats["http_pool"] = "使用中（仅覆盖代理模式下的Gemini客户端）"
+        # httpcore 未公开连接池状态，这里尽力读取，失败时仅返回计数
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        stats["connections_open"] = len(connections)
+        stats["connections_idle"] = sum(1 for c in connections if getattr(c, "is_idle", lambda: False)())
+        return stats
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_llm_registry() -> LLMClientRegistry:
+    """获取全局LLM客户端注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            try:
+                from tradingagents.default_config import LLM_POOL_CONFIG
+            except ImportError:
+                LLM_POOL_CONFIG = {}
+            _registry = LLMClientRegistry(**LLM_POOL_CONFIG)
+        return _registry
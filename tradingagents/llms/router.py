@@ -0,0 +1,304 @@
+# tradingagents/llms/router.py - 基于延迟的对冲请求与提供商故障切换
+"""
+为研究主管、首席投资官等串行关键步骤提供多提供商路由：
+1. 按提供商维护滚动的延迟样本（p50/p95）与错误率；
+2. 主提供商超过其 p95 仍未返回时，向备用提供商发出对冲请求，取先返回且能通过解析校验的结果，放弃另一路；
+3. 某提供商近期错误率过高时熔断一段时间，期间直接改用其他提供商。
+
+对冲会重复付费，默认关闭；在 default_config.py 中设置
+LLM_HEDGING_CONFIG = {"enabled": True, "agents": ("research_manager", "trader")} 并配置备用提供商的密钥后启用。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+from tradingagents.utils.chain_utils import estimate_tokens, message_text
+from tradingagents.utils.rate_governor import get_rate_governor, expected_completion_tokens
+
+try:
+    from tradingagents.default_config import LLM_HEDGING_CONFIG
+except ImportError:
+    LLM_HEDGING_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+class ProviderLatencyTracker:
+    """按提供商记录最近的调用延迟与成败，并据此给出对冲阈值与熔断状态"""
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 5,
+        default_hedge_delay: float = 20.0,
+        min_hedge_delay: float = 3.0,
+        error_window: int = 20,
+        error_rate_threshold: float = 0.5,
+        cooldown_seconds: float = 120.0
+    ):
+        self.min_samples = min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._outcomes: Dict[str, deque] = defaultdict(lambda: deque(maxlen=error_window))
+        self._tripped_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, provider: str, latency: float, success: bool):
+        with self._lock:
+            self._outcomes[provider].append(success)
+            if success:
+                self._latencies[provider].append(latency)
+            outcomes = self._outcomes[provider]
+            if len(outcomes) >= self.min_samples and self._error_rate(provider) >= self.error_rate_threshold:
+                if self._tripped_until.get(provider, 0) < time.time():
+                    logger.warning(f"LLM路由: {provider} 近期错误率过高，熔断 {self.cooldown_seconds:.0f} 秒")
+                self._tripped_until[provider] = time.time() + self.cooldown_seconds
+                outcomes.clear()
+
+    def _error_rate(self, provider: str) -> float:
+        outcomes = self._outcomes[provider]
+        return 1 - sum(outcomes) / len(outcomes) if outcomes else 0.0
+
+    def percentile(self, provider: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latencies[provider])
+        return self._percentile(samples, q)
+
+    def _percentile(self, samples: List[float], q: float) -> Optional[float]:
+        if len(samples) < self.min_samples:
+            return None
+        samples = sorted(samples)
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+    def hedge_delay(self, provider: str) -> float:
+        """主请求等待多久后发出对冲请求：样本充足时取 p95，否则用默认值"""
+        p95 = self.percentile(provider, 0.95)
+        return max(p95 if p95 is not None else self.default_hedge_delay, self.min_hedge_delay)
+
+    def is_available(self, provider: str) -> bool:
+        with self._lock:
+            return self._tripped_until.get(provider, 0) <= time.time()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        # 在锁内复制样本与状态，工作线程可能同时写入
+        with self._lock:
+            now = time.time()
+            copies = {
+                p: (list(self._latencies.get(p, ())), round(self._error_rate(p), 3), self._tripped_until.get(p, 0) <= now)
+                for p in set(self._latencies) | set(self._outcomes)
+            }
+        return {
+            p: {
+                "p50": self._percentile(samples, 0.5),
+                "p95": self._percentile(samples, 0.95),
+                "error_rate": error_rate,
+                "available": available,
+            }
+            for p, (samples, error_rate, available) in sorted(copies.items())
+        }
+
+class ProviderRouter:
+    """全局路由状态：延迟统计与对冲/故障切换计数"""
+
+    def __init__(self, **tracker_options):
+        self.tracker = ProviderLatencyTracker(**tracker_options)
+        self._stats = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def order(self, providers: List[str]) -> List[str]:
+        """可用的提供商排在前面；全部熔断时仍按原顺序尝试"""
+        available = [p for p in providers if self.tracker.is_available(p)]
+        if available and available[0] != providers[0]:
+            self.count("failovers")
+            logger.warning(f"LLM路由: {providers[0]} 处于熔断期，改用 {available[0]}")
+        return available + [p for p in providers if p not in available] if available else list(providers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["providers"] = self.tracker.snapshot()
+        return stats
+
+class HedgedChatModel(BaseChatModel):
+    """
+    包装多个提供商客户端的聊天模型，可直接放进 `prompt | llm | parser` 链。
+    validator（通常为链中解析器的 parse）用于判断一份回答是否“有效”，无效回答视同失败。
+    每一路请求各自向对应提供商申请限流配额，因此 LLMSafetyWrapper 不再为它整体限流。
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    clients: Dict[str, Any]
+    providers: List[str]
+    router: Any
+    agent: str = ""
+    validator: Optional[Callable[[str], Any]] = None
+    provider_name: str = "hedged"
+    self_rate_limited: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-chat"
+
+    @property
+    def model(self) -> str:
+        return "+".join(self.providers)
+
+    @staticmethod
+    def _estimate_tokens(messages: List[BaseMessage]) -> int:
+        return sum(estimate_tokens(str(m.content)) for m in messages) + expected_completion_tokens()
+
+    @staticmethod
+    def _rate_scope(run_manager) -> Optional[str]:
+        return (getattr(run_manager, "metadata", None) or {}).get("rate_scope")
+
+    def _call_provider(self, provider: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                       scope: Optional[str] = None, **kwargs) -> AIMessage:
+        with get_rate_governor().lease(provider, scope, self._estimate_tokens(messages)):
+            start_time = time.perf_counter()
+            try:
+                message = self.clients[provider].invoke(messages, stop=stop, **kwargs)
+                if self.validator is not None:
+                    self.validator(message_text(message))
+            except Exception:
+                self.router.tracker.observe(provider, time.perf_counter() - start_time, False)
+                raise
+            self.router.tracker.observe(provider, time.perf_counter() - start_time, True)
+            return message
+
+    async def _acall_provider(self, provider: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                              scope: Optional[str] = None, **kwargs) -> AIMessage:
+        async with get_rate_governor().alease(provider, scope, self._estimate_tokens(messages)):
+            start_time = time.perf_counter()
+            try:
+                message = await self.clients[provider].ainvoke(messages, stop=stop, **kwargs)
+                if self.validator is not None:
+                    self.validator(message_text(message))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.router.tracker.observe(provider, time.perf_counter() - start_time, False)
+                raise
+            self.router.tracker.observe(provider, time.perf_counter() - start_time, True)
+            return message
+
+    def _launch_backup(self, backup: str, primary_failed: bool):
+        # 主请求超时发出的是对冲请求；主请求已失败时则是普通的故障切换
+        self.router.count("backup_after_error" if primary_failed else "hedges_fired")
+        logger.info(f"LLM路由 [{self.agent}]: {'主请求失败' if primary_failed else '主请求超过对冲阈值'}，向 {backup} 发出请求")
+
+    def _result(self, message: AIMessage, provider: str, primary: str) -> ChatResult:
+        if provider != primary:
+            self.router.count("backup_wins")
+            logger.info(f"LLM路由 [{self.agent}]: 采用 {provider} 的结果")
+        message.response_metadata = {**(message.response_metadata or {}), "routed_provider": provider}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        order = self.router.order(self.providers)
+        primary, backups = order[0], order[1:]
+        scope = self._rate_scope(run_manager)
+        executor = ThreadPoolExecutor(max_workers=len(order))
+        try:
+            futures = {executor.submit(self._call_provider, primary, messages, stop, scope, **kwargs): primary}
+            done, _ = wait(futures, timeout=self.router.tracker.hedge_delay(primary))
+            last_error = None
+            while True:
+                for future in done:
+                    provider = futures.pop(future)
+                    try:
+                        message = future.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"LLM路由 [{self.agent}]: {provider} 调用失败: {e}")
+                        continue
+                    return self._result(message, provider, primary)
+                # 主请求超时或失败：向下一个提供商发出请求
+                if backups:
+                    backup = backups.pop(0)
+                    self._launch_backup(backup, primary_failed=last_error is not None)
+                    futures[executor.submit(self._call_provider, backup, messages, stop, scope, **kwargs)] = backup
+                if not futures:
+                    raise last_error or RuntimeError("所有LLM提供商均调用失败")
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        finally:
+            # 不等待落后的请求，其结果直接丢弃
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        order = self.router.order(self.providers)
+        primary, backups = order[0], order[1:]
+        scope = self._rate_scope(run_manager)
+        tasks = {asyncio.ensure_future(self._acall_provider(primary, messages, stop, scope, **kwargs)): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.router.tracker.hedge_delay(primary))
+            last_error = None
+            while True:
+                for task in done:
+                    provider = tasks.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"LLM路由 [{self.agent}]: {provider} 调用失败: {last_error}")
+                        continue
+                    return self._result(task.result(), provider, primary)
+                if backups:
+                    backup = backups.pop(0)
+                    self._launch_backup(backup, primary_failed=last_error is not None)
+                    tasks[asyncio.ensure_future(self._acall_provider(backup, messages, stop, scope, **kwargs))] = backup
+                if not tasks:
+                    raise last_error or RuntimeError("所有LLM提供商均调用失败")
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # 取消落后的请求
+            for task in tasks:
+                task.cancel()
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_provider_router() -> ProviderRouter:
+    """获取全局LLM路由状态"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            options = {k: v for k, v in LLM_HEDGING_CONFIG.items() if k in (
+                "window", "min_samples", "default_hedge_delay", "min_hedge_delay",
+                "error_window", "error_rate_threshold", "cooldown_seconds"
+            )}
+            _router = ProviderRouter(**options)
+        return _router
+
+def hedging_enabled_for(agent: Optional[str]) -> bool:
+    """对冲需在配置中显式开启；开启后默认只用于串行的关键步骤（研究主管、首席投资官）"""
+    if not agent or not LLM_HEDGING_CONFIG.get("enabled", False):
+        return False
+    return agent in LLM_HEDGING_CONFIG.get("agents", ("research_manager", "trader"))
+
+def build_hedged_model(
+    agent: str,
+    clients: List[Tuple[str, Any]],
+    validator: Optional[Callable[[str], Any]] = None
+) -> HedgedChatModel:
+    return HedgedChatModel(
+        clients=dict(clients),
+        providers=[name for name, _ in clients],
+        router=get_provider_router(),
+        agent=agent,
+        validator=validator
+    )
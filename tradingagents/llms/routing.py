@@ -0,0 +1,74 @@
+# tradingagents/llms/routing.py - 按智能体/处理阶段选择模型
+"""
+按 LLM_ROUTING_CONFIG 为每个智能体或处理阶段选择提供商、模型、温度与最大输出Token，
+由 llm_client_factory 统一应用，各智能体代码无需改动。default_config.py 中的配置示例：
+
+    LLM_ROUTING_CONFIG = {
+        "default": {"temperature": 0.7},
+        # 高频、低风险的抽取类阶段使用小而快的模型
+        "news_impact": {"provider": "qwen", "model": "qwen-turbo", "temperature": 0.2, "max_output_tokens": 600},
+        "news_extraction": {"provider": "qwen", "model": "qwen-turbo", "temperature": 0.2},
+        "social_media_analyst": {"provider": "qwen", "model": "qwen-plus", "temperature": 0.5},
+        # 关键决策保留强模型
+        "research_manager": {"provider": "gemini", "model": "gemini-2.5-pro", "temperature": 0.4},
+        "trader": {"provider": "gemini", "model": "gemini-2.5-pro", "temperature": 0.3, "max_output_tokens": 2048},
+    }
+
+智能体的阶段名为其模块名（如 market_analyst、bull_researcher、trader），其余LLM调用点见 STAGES。
+表中没有的阶段使用 "default" 项；字段缺省时沿用 ANALYSIS_LLM_PROVIDER 与各提供商配置中的模型和温度。
+某阶段改了提供商却没写模型时，不继承 "default" 中的模型（模型名只对其所属提供商有效）。
+"""
+
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Hashable, Optional
+
+try:
+    from tradingagents.default_config import LLM_ROUTING_CONFIG
+except ImportError:
+    LLM_ROUTING_CONFIG = {}
+
+ROUTE_FIELDS = ("provider", "model", "temperature", "max_output_tokens")
+
+# 智能体之外的LLM调用点
+STAGES = {
+    "news_impact": "逐篇新闻的股价影响JSON抽取（AI研究助手）",
+    "research_report": "AI研究助手的综合研究报告",
+    "news_extraction": "新闻网页内容抽取（AI新闻智能体）",
+    "data_fetcher": "通过LLM查询财务指标",
+    "briefing_compressor": "简报压缩的LLM摘要兜底",
+    "analyst_panel": "分析师合议调用",
+}
+
+@dataclass(frozen=True)
+class LLMRoute:
+    """某个阶段使用的模型参数；为 None 的字段沿用提供商的默认配置"""
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        """传给客户端构建函数的模型参数"""
+        return {k: v for k, v in asdict(self).items() if k != "provider" and v is not None}
+
+    def registry_key(self, provider: str) -> Hashable:
+        """客户端注册表的键：没有自定义参数时与按提供商共享的客户端相同"""
+        options = self.options
+        return (provider, *sorted(options.items())) if options else provider
+
+def resolve_route(agent: Optional[str], provider: Optional[str] = None) -> LLMRoute:
+    """合并 "default" 与该阶段的配置；调用方显式指定了其他提供商时不套用路由中的模型参数"""
+    default = LLM_ROUTING_CONFIG.get("default", {})
+    entry = LLM_ROUTING_CONFIG.get(agent, {}) if agent else {}
+    merged = {**default, **entry}
+    if "provider" in entry and "model" not in entry:
+        merged.pop("model", None)
+    unknown = set(merged) - set(ROUTE_FIELDS)
+    if unknown:
+        logging.warning(f"LLM路由: 阶段 '{agent}' 的配置中有无法识别的字段 {sorted(unknown)}，已忽略")
+    route = LLMRoute(**{k: merged.get(k) for k in ROUTE_FIELDS})
+    if provider and route.provider and provider != route.provider:
+        return LLMRoute(provider=provider)
+    return route
@@ -0,0 +1,82 @@
+# tradingagents/llms/structured_output.py - 智能体链的构建：原生结构化输出 / 格式说明解析
+"""
+所有智能体链统一由 build_structured_chain 构建，仍保持 `prompt | llm | parser` 的结构：
+- parser 模式（默认）：Prompt 中注入 PydanticOutputParser 的格式说明（数百Token的JSON Schema），
+  模型以文本输出JSON；
+- native 模式：把报告模型作为工具绑定到模型上（function calling），Prompt 中的格式说明
+  换成一句简短提示，结果从工具调用参数中读取。模型不支持绑定工具时自动退回 parser 模式；
+  模型未调用工具而直接输出文本JSON时，解析器也会按文本解析。
+"""
+
+import logging
+from typing import Any, List, Optional, Type
+
+from langchain.prompts import ChatPromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+from langchain_core.outputs import Generation
+from pydantic import BaseModel
+
+from tradingagents.llms import llm_client_factory
+from tradingagents.utils.chain_utils import describe_llm
+from .router import HedgedChatModel
+
+try:
+    from tradingagents.default_config import STRUCTURED_OUTPUT_CONFIG
+except ImportError:
+    STRUCTURED_OUTPUT_CONFIG = {}
+
+NATIVE_FORMAT_HINT = "请调用 `{name}` 工具提交你的最终结果，各字段的含义见工具说明。"
+
+# 支持按名称强制调用工具的提供商；其余提供商只绑定工具，由Prompt提示模型调用
+TOOL_CHOICE_BY_PROVIDER = {"gemini": True, "fake": True}
+
+class ToolCallOutputParser(PydanticOutputParser):
+    """优先从工具调用参数解析报告模型，没有工具调用时按文本JSON解析（与 PydanticOutputParser 相同）"""
+
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> Any:
+        message = getattr(result[0], "message", None) if result else None
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            return self._parse_obj(tool_calls[0]["args"])
+        return super().parse_result(result, partial=partial)
+
+def native_output_enabled_for(agent: Optional[str]) -> bool:
+    if STRUCTURED_OUTPUT_CONFIG.get("mode", "parser") != "native":
+        return False
+    agents = STRUCTURED_OUTPUT_CONFIG.get("agents")
+    return agents is None or agent in agents
+
+def _bind_tool(llm: Any, output_model: Type[BaseModel], provider: str) -> Any:
+    if TOOL_CHOICE_BY_PROVIDER.get(provider):
+        return llm.bind_tools([output_model], tool_choice=output_model.__name__)
+    return llm.bind_tools([output_model])
+
+def bind_structured_output(llm: Any, output_model: Type[BaseModel]) -> Optional[Any]:
+    """把报告模型作为工具绑定到模型上；不支持时返回 None"""
+    try:
+        if isinstance(llm, HedgedChatModel):
+            # 对冲模型的每个提供商按各自的格式分别绑定
+            clients = {name: _bind_tool(client, output_model, name) for name, client in llm.clients.items()}
+            return llm.model_copy(update={"clients": clients})
+        return _bind_tool(llm, output_model, describe_llm(llm)["provider"])
+    except (NotImplementedError, AttributeError, TypeError, ValueError) as e:
+        logging.warning(f"结构化输出: {describe_llm(llm)['provider']} 不支持原生结构化输出，改用格式说明解析: {e}")
+        return None
+
+def build_structured_chain(template: str, output_model: Type[BaseModel], agent: Optional[str] = None) -> Any:
+    """按 STRUCTURED_OUTPUT_CONFIG 构建 `prompt | llm | parser` 链，template 中需包含 {format_instructions}"""
+    parser = ToolCallOutputParser(pydantic_object=output_model)
+    llm = llm_client_factory(agent=agent, output_parser=parser)
+    if native_output_enabled_for(agent):
+        bound_llm = bind_structured_output(llm, output_model)
+        if bound_llm is not None:
+            prompt = ChatPromptTemplate.from_template(
+                template,
+                partial_variables={"format_instructions": NATIVE_FORMAT_HINT.format(name=output_model.__name__)}
+            )
+            return prompt | bound_llm | parser
+    prompt = ChatPromptTemplate.from_template(
+        template,
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+    return prompt | llm | parser
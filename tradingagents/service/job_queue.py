@@ -0,0 +1,274 @@
+# tradingagents/service/job_queue.py - 分析任务的持久化队列
+"""
+常驻服务接收的分析任务先写入本地SQLite队列再执行，服务重启后排队中的任务不会丢失；
+执行中被中断的任务重新排队，并以任务ID作为检查点的 thread_id 从未完成的节点继续。
+每个任务的节点进度作为事件追加保存，客户端可按序号增量拉取或流式订阅。
+
+队列可被多个进程（见 worker.py）共享：领取任务时获得租约，执行期间定期心跳续约；
+持有者崩溃后租约过期，任务被其他worker重新领取，超过最大尝试次数的判为失败。
+执行方只使用 submit/claim/heartbeat/release/complete/fail/add_progress 与查询接口，
+换成网络化的消息代理时提供同名方法的实现即可。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from tradingagents.utils.storage import get_storage_dir, connect_sqlite
+from tradingagents.utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED_STATUSES = (DONE, FAILED)
+
+_COLUMNS = ("job_id, ticker, status, created_at, started_at, finished_at, result, error, "
+            "worker_id, attempts, heartbeat_at, lease_expires_at")
+
+# 租约相关的列：旧版本创建的数据库在启动时补齐
+_LEASE_COLUMNS = {
+    "worker_id": "TEXT",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "heartbeat_at": "REAL",
+    "lease_expires_at": "REAL",
+}
+
+class JobQueue:
+    """基于SQLite的任务队列，可被多个线程与进程共享"""
+
+    def __init__(self, db_path: Optional[str] = None, retention_days: float = 7, max_attempts: int = 3):
+        self.db_path = db_path or str(get_storage_dir("service") / "jobs.db")
+        self.retention_seconds = retention_days * 86400
+        self.max_attempts = max(max_attempts, 1)
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        self._init_schema()
+        self.purge_expired()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                       job_id TEXT PRIMARY KEY,
+                       ticker TEXT NOT NULL,
+                       status TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       started_at REAL,
+                       finished_at REAL,
+                       result TEXT,
+                       error TEXT
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS job_events (
+                       job_id TEXT NOT NULL,
+                       seq INTEGER NOT NULL,
+                       created_at REAL NOT NULL,
+                       event TEXT NOT NULL,
+                       PRIMARY KEY (job_id, seq)
+                   )"""
+            )
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, decl in _LEASE_COLUMNS.items():
+                if name in existing:
+                    continue
+                try:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+                except sqlite3.OperationalError as e:
+                    # 另一个进程同时完成了迁移
+                    if "duplicate column" not in str(e):
+                        raise
+
+    def purge_expired(self):
+        """删除超过保留期的已结束任务及其事件"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock, self._conn:
+            expired = [row[0] for row in self._conn.execute(
+                f"SELECT job_id FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+                (*FINISHED_STATUSES, cutoff)
+            )]
+            for job_id in expired:
+                self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+        if expired:
+            logger.info(f"任务队列: 已清理 {len(expired)} 个过期任务")
+
+    def submit(self, ticker: str) -> str:
+        """提交一个分析任务，返回任务ID"""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, ticker, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, ticker, QUEUED, time.time())
+            )
+        self._append_event(job_id, {"type": "queued", "ticker": ticker})
+        return job_id
+
+    def claim(self, worker_id: str = "", lease_seconds: float = 60) -> Optional[Dict[str, Any]]:
+        """
+        按提交顺序领取一个排队中或租约已过期的任务，标记为由 worker_id 执行并获得租约；
+        队列为空时返回 None。领取是单条UPDATE语句，多个进程同时领取也不会重复。
+        """
+        self._fail_exhausted()
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """UPDATE jobs SET status = ?, worker_id = ?, started_at = ?, heartbeat_at = ?,
+                                   lease_expires_at = ?, attempts = attempts + 1
+                   WHERE job_id = (
+                       SELECT job_id FROM jobs
+                       WHERE status = ? OR (status = ? AND lease_expires_at < ? AND attempts < ?)
+                       ORDER BY created_at LIMIT 1
+                   )
+                   RETURNING job_id, attempts""",
+                (RUNNING, worker_id, now, now, now + lease_seconds, QUEUED, RUNNING, now, self.max_attempts)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, attempts = row
+        if attempts > 1:
+            logger.warning(f"任务队列: 任务 {job_id} 的上一个执行者已失联，由 {worker_id} 第 {attempts} 次执行")
+        self._append_event(job_id, {"type": "claimed", "worker_id": worker_id, "attempt": attempts})
+        return self.get(job_id)
+
+    def _fail_exhausted(self):
+        """租约过期且已达最大尝试次数的任务判为失败（多次导致执行者崩溃的任务不再重试）"""
+        now = time.time()
+        error = f"执行者连续 {self.max_attempts} 次失联，任务已放弃"
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_expires_at = NULL "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= ? RETURNING job_id",
+                (FAILED, now, error, RUNNING, now, self.max_attempts)
+            ).fetchall()
+        for (job_id,) in rows:
+            logger.error(f"任务队列: 任务 {job_id} {error}")
+            self._append_event(job_id, {"type": FAILED, "error": error})
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = 60) -> bool:
+        """续约；返回 False 表示租约已失效（任务已被其他worker接管或已结束）"""
+        now = time.time()
+        with self._lock, self._conn:
+            count = self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?, lease_expires_at = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+                (now, now + lease_seconds, job_id, worker_id, RUNNING)
+            ).rowcount
+        return count == 1
+
+    def release(self, worker_id: str) -> int:
+        """worker正常退出时交还执行中的任务，其他worker可立即领取（不计入尝试次数）"""
+        with self._lock, self._conn:
+            count = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, started_at = NULL, lease_expires_at = NULL, "
+                "attempts = MAX(attempts - 1, 0) WHERE worker_id = ? AND status = ?",
+                (QUEUED, worker_id, RUNNING)
+            ).rowcount
+        if count:
+            logger.info(f"任务队列: {worker_id} 退出，{count} 个执行中的任务已重新排队")
+        return count
+
+    def requeue_running(self) -> int:
+        """把没有租约的执行中任务（旧版本服务中断时遗留）重新排队；有租约的由过期机制处理"""
+        with self._lock, self._conn:
+            count = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND lease_expires_at IS NULL",
+                (QUEUED, RUNNING)
+            ).rowcount
+        if count:
+            logger.info(f"任务队列: {count} 个中断的任务已重新排队")
+        return count
+
+    def complete(self, job_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        if not self._finish(job_id, DONE, worker_id, result=dumps(result)):
+            return False
+        self._append_event(job_id, {"type": DONE, "result": result})
+        return True
+
+    def fail(self, job_id: str, error: str, worker_id: Optional[str] = None) -> bool:
+        if not self._finish(job_id, FAILED, worker_id, error=error):
+            return False
+        self._append_event(job_id, {"type": FAILED, "error": error})
+        return True
+
+    def _finish(self, job_id: str, status: str, worker_id: Optional[str] = None,
+                result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        """写入结果；指定 worker_id 时只有仍持有该任务的worker能写入"""
+        sql = ("UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, lease_expires_at = NULL "
+               "WHERE job_id = ?")
+        params = [status, time.time(), result, error, job_id]
+        if worker_id is not None:
+            sql += " AND worker_id = ? AND status = ?"
+            params += [worker_id, RUNNING]
+        with self._lock, self._conn:
+            count = self._conn.execute(sql, params).rowcount
+        if not count and worker_id is not None:
+            logger.warning(f"任务队列: {worker_id} 已不再持有任务 {job_id}，结果被丢弃")
+        return count == 1
+
+    def add_progress(self, job_id: str, node: str, **fields):
+        """记录一个节点执行完毕的进度事件"""
+        self._append_event(job_id, {"type": "progress", "node": node, **fields})
+
+    def _append_event(self, job_id: str, event: Dict[str, Any]):
+        now = time.time()
+        with self._lock, self._conn:
+            # BEGIN IMMEDIATE 先取得写锁，多个进程为同一任务追加事件时序号不会冲突
+            self._conn.execute("BEGIN IMMEDIATE")
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, seq, created_at, event) VALUES (?, ?, ?, ?)",
+                (job_id, seq, now, dumps({"seq": seq, "time": now, **event}))
+            )
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """返回序号大于 after 的事件"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+            ).fetchall()
+        return [loads(row[0]) for row in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def active_workers(self) -> Dict[str, Dict[str, Any]]:
+        """租约仍有效的worker及其执行中的任务数与最近心跳时间"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worker_id, COUNT(*), MAX(heartbeat_at) FROM jobs "
+                "WHERE status = ? AND lease_expires_at >= ? GROUP BY worker_id",
+                (RUNNING, time.time())
+            ).fetchall()
+        return {worker_id: {"running": count, "last_heartbeat": heartbeat_at} for worker_id, count, heartbeat_at in rows}
+
+    @staticmethod
+    def _to_dict(row: tuple) -> Dict[str, Any]:
+        (job_id, ticker, status, created_at, started_at, finished_at, result, error,
+         worker_id, attempts, heartbeat_at, lease_expires_at) = row
+        return {
+            "job_id": job_id, "ticker": ticker, "status": status,
+            "created_at": created_at, "started_at": started_at, "finished_at": finished_at,
+            "result": loads(result) if result else None, "error": error,
+            "worker_id": worker_id, "attempts": attempts,
+            "heartbeat_at": heartbeat_at, "lease_expires_at": lease_expires_at,
+        }
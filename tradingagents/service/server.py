@@ -0,0 +1,325 @@
+# tradingagents/service/server.py - 常驻分析服务
+"""
+常驻进程在启动时完成一次性的重量级准备（导入akshare/langchain/langgraph、构建12条智能体链与
+LLM客户端、编译工作流图），之后通过本地HTTP接口接收分析任务，每个任务只需支付流水线本身的耗时。
+
+接口（默认仅监听 127.0.0.1）：
+    POST /jobs                  {"ticker": "sh600519"} 或 {"tickers": [...]}，返回任务ID；?wait=1 时等待结果，
+                                超过 SERVICE_CONFIG["wait_timeout"] 秒仍未结束则返回 202 与任务ID
+    GET  /jobs                  最近的任务列表
+    GET  /jobs/<id>             任务状态与结果（result.trade_plan 为 TradePlan 的字段）
+    GET  /jobs/<id>/events      节点进度事件，?after=<序号> 增量拉取
+    GET  /jobs/<id>/stream      以 NDJSON 流式推送进度事件，任务结束后关闭连接
+    GET  /health                服务状态与吞吐统计
+
+任务写入持久化队列（job_queue.py）后由事件循环上的多个协程并发执行，共享编译好的异步图、
+LLM客户端、限流器与各级缓存；任务ID同时作为检查点的 thread_id，服务重启后中断的任务从未完成的节点继续。
+同一个队列也可由独立的worker进程（worker.py）消费，此时服务可以只负责接收任务（max_concurrent_jobs=0）。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from tradingagents.dataflows.akshare_utils import get_stock_name, is_valid_a_stock_code
+from tradingagents.graph.checkpointer import get_checkpointer, run_config
+from tradingagents.graph.trading_graph import build_graph
+from tradingagents.service.job_queue import JobQueue, FINISHED_STATUSES
+from tradingagents.utils.error_handler import TradingSystemError
+from tradingagents.utils.llm_metrics import llm_metrics
+from tradingagents.utils.performance_monitor import global_monitor
+from tradingagents.utils.serialization import dumps, loads
+
+try:
+    from tradingagents.default_config import SERVICE_CONFIG
+except ImportError:
+    SERVICE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class AnalysisService:
+    """持有编译好的工作流图，在后台事件循环上执行队列中的任务"""
+
+    def __init__(self, max_concurrent_jobs: int = 4, queue: Optional[JobQueue] = None, poll_interval: float = 5.0,
+                 worker_id: Optional[str] = None, lease_seconds: Optional[float] = None):
+        self.max_concurrent_jobs = max(max_concurrent_jobs, 0)
+        self.poll_interval = poll_interval
+        self.queue = queue or JobQueue(max_attempts=SERVICE_CONFIG.get("max_attempts", 3))
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds or SERVICE_CONFIG.get("lease_seconds", 60)
+        # 只接收任务、由独立worker进程执行时不需要编译工作流图
+        self.app = build_graph(async_mode=True, checkpointer=get_checkpointer()) if self.max_concurrent_jobs else None
+        self.run_id = llm_metrics.start_run()
+        self.started_at = time.time()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeups: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"active": 0, "completed": 0, "failed": 0, "pipeline_seconds": 0.0}
+
+    # --- 生命周期 ---
+    def start(self):
+        self.queue.requeue_running()
+        self._thread = threading.Thread(target=self._run_loop, name="analysis-service", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        logger.info(f"分析服务 [{self.worker_id}]: 已就绪，最多同时执行 {self.max_concurrent_jobs} 个任务（运行ID {self.run_id}）")
+
+    def stop(self, timeout: float = 10.0):
+        """停止领取新任务；执行中的任务交还队列，由其他worker或下次启动时从检查点继续"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.queue.release(self.worker_id)
+        llm_metrics.log_run_summary(self.run_id)
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeups = asyncio.Queue()
+        for index in range(self.max_concurrent_jobs):
+            self._loop.create_task(self._worker(index))
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+        # 停止后取消仍在等待或执行的协程，避免事件循环关闭时遗留挂起的任务
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.close()
+
+    # --- 任务提交与执行 ---
+    def submit(self, ticker: str) -> str:
+        job_id = self.queue.submit(ticker)
+        if self._loop is not None and self.max_concurrent_jobs:
+            # 每个新任务唤醒一个空闲协程；排队中的旧任务由定期轮询领取
+            self._loop.call_soon_threadsafe(self._wakeups.put_nowait, job_id)
+        return job_id
+
+    async def _worker(self, index: int):
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.lease_seconds)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeups.get(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _heartbeat(self, job_id: str):
+        """执行期间按租约的三分之一定期续约"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"分析服务 [{self.worker_id}]: 任务 {job_id} 的租约已失效，停止续约")
+                return
+
+    async def _execute(self, job: Dict[str, Any]):
+        job_id, ticker = job["job_id"], job["ticker"]
+        start_time = time.perf_counter()
+        with self._stats_lock:
+            self._stats["active"] += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            if not is_valid_a_stock_code(ticker):
+                raise TradingSystemError("股票代码格式不正确")
+            stock_name = await asyncio.to_thread(get_stock_name, ticker)
+            if not stock_name:
+                raise TradingSystemError("无法获取股票名称")
+            config = run_config(job_id)
+            graph_input = {"ticker": ticker, "stock_name": stock_name}
+            snapshot = await self.app.aget_state(config) if self.app.checkpointer is not None else None
+            decision, skipped = None, []
+            if snapshot is not None and snapshot.values and not snapshot.next:
+                # 上一个执行者跑完了工作流、但在写入结果前中断：直接采用检查点中的决策，不再重跑
+                decision = snapshot.values.get("final_decision")
+                skipped = list(snapshot.values.get("skipped_agents") or [])
+                await asyncio.to_thread(self.queue.add_progress, job_id, "restored")
+            else:
+                if snapshot is not None and snapshot.next:
+                    # 服务重启前该任务已完成部分节点：从检查点继续
+                    graph_input = None
+                    await asyncio.to_thread(self.queue.add_progress, job_id, "resume")
+                async for step in self.app.astream(graph_input, config):
+                    for node, update in step.items():
+                        update = update if isinstance(update, dict) else {}
+                        if update.get("final_decision") is not None:
+                            decision = update["final_decision"]
+                        skipped.extend(update.get("skipped_agents") or [])
+                        await asyncio.to_thread(self.queue.add_progress, job_id, node,
+                                                elapsed=round(time.perf_counter() - start_time, 2),
+                                                skipped_agents=update.get("skipped_agents") or [])
+                # 分支子图的更新带有继承来的条目，按出现顺序去重
+                skipped = list(dict.fromkeys(skipped))
+            if decision is None:
+                raise TradingSystemError("未能生成最终交易决策")
+            seconds = round(time.perf_counter() - start_time, 2)
+            await asyncio.to_thread(self.queue.complete, job_id, {
+                "ticker": ticker, "stock_name": stock_name, "seconds": seconds, "skipped_agents": skipped,
+                "worker_id": self.worker_id, "trade_plan": decision.model_dump(mode="json"),
+            }, self.worker_id)
+            self._record(seconds, ok=True)
+            logger.info(f"分析服务 [{self.worker_id}]: 任务 {job_id} ({ticker}) 完成，决策 {decision.action}，耗时 {seconds:.1f}s")
+        except Exception as e:
+            logger.error(f"分析服务 [{self.worker_id}]: 任务 {job_id} ({ticker}) 失败: {e}", exc_info=not isinstance(e, TradingSystemError))
+            await asyncio.to_thread(self.queue.fail, job_id, str(e)[:500], self.worker_id)
+            self._record(time.perf_counter() - start_time, ok=False, error=str(e)[:200])
+        finally:
+            heartbeat.cancel()
+
+    def _record(self, seconds: float, ok: bool, error: Optional[str] = None):
+        with self._stats_lock:
+            self._stats["active"] -= 1
+            self._stats["completed" if ok else "failed"] += 1
+            self._stats["pipeline_seconds"] += seconds
+        # 每个worker的任务耗时与成败计入性能监控，导出的性能报告中按worker统计
+        global_monitor.record_agent_performance(f"worker[{self.worker_id}]", seconds, ok, error)
+
+    def status(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        finished = stats["completed"] + stats["failed"]
+        uptime = time.time() - self.started_at
+        return {
+            "run_id": self.run_id,
+            "worker_id": self.worker_id,
+            "uptime_seconds": round(uptime, 1),
+            "max_concurrent_jobs": self.max_concurrent_jobs,
+            "active_jobs": stats["active"],
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "avg_pipeline_seconds": round(stats["pipeline_seconds"] / finished, 2) if finished else 0.0,
+            "jobs_per_hour": round(stats["completed"] / uptime * 3600, 1) if uptime else 0.0,
+            "queue": self.queue.counts(),
+            "workers": self.queue.active_workers(),
+            "checkpointing": self.app is not None and self.app.checkpointer is not None,
+        }
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "TradingAgentsService/1.0"
+
+    @property
+    def service(self) -> AnalysisService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug(f"分析服务 HTTP: {self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, payload: Any):
+        body = dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        try:
+            limit = int(query.get("limit", ["50"])[0])
+            after = int(query.get("after", ["0"])[0])
+        except ValueError:
+            return self._send_json(400, {"error": "limit 与 after 必须是整数"})
+        if parts == ["health"]:
+            return self._send_json(200, self.service.status())
+        if parts == ["jobs"]:
+            return self._send_json(200, self.service.queue.list_jobs(limit))
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = self.service.queue.get(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": f"任务 {parts[1]} 不存在"})
+            if len(parts) == 2:
+                return self._send_json(200, job)
+            if parts[2:] == ["events"]:
+                return self._send_json(200, self.service.queue.events(parts[1], after))
+            if parts[2:] == ["stream"]:
+                return self._stream_events(parts[1])
+        self._send_json(404, {"error": "未知的接口"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if [p for p in url.path.split("/") if p] != ["jobs"]:
+            return self._send_json(404, {"error": "未知的接口"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = loads(self.rfile.read(length)) if length else {}
+            tickers = body.get("tickers") or [body.get("ticker")]
+            tickers = [str(t).strip().lower() for t in tickers if t]
+        except (ValueError, AttributeError) as e:
+            return self._send_json(400, {"error": f"请求体不是有效的JSON: {e}"})
+        invalid = [t for t in tickers if not is_valid_a_stock_code(t)]
+        if not tickers or invalid:
+            return self._send_json(400, {"error": f"股票代码无效: {invalid or '未提供'}"})
+        job_ids = [self.service.submit(t) for t in tickers]
+        if parse_qs(url.query).get("wait", ["0"])[0] in ("1", "true"):
+            jobs = self._wait(job_ids, SERVICE_CONFIG.get("wait_timeout", 600))
+            if jobs is not None:
+                return self._send_json(200, jobs)
+        self._send_json(202, [{"job_id": job_id, "ticker": t} for job_id, t in zip(job_ids, tickers)])
+
+    def _wait(self, job_ids: List[str], timeout: float, interval: float = 0.5) -> Optional[List[Dict[str, Any]]]:
+        """等待所有任务结束；超时（如没有worker在执行或任务卡住）返回 None"""
+        deadline = time.monotonic() + timeout
+        while True:
+            jobs = [self.service.queue.get(job_id) for job_id in job_ids]
+            if all(job["status"] in FINISHED_STATUSES for job in jobs):
+                return jobs
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+
+    def _stream_events(self, job_id: str, interval: float = 0.5):
+        """逐行推送进度事件，直到任务结束"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        after = 0
+        try:
+            while True:
+                for event in self.service.queue.events(job_id, after):
+                    after = event["seq"]
+                    self.wfile.write((dumps(event) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                    if event["type"] in FINISHED_STATUSES:
+                        return
+                time.sleep(interval)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"分析服务: 任务 {job_id} 的进度订阅已断开")
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, max_concurrent_jobs: Optional[int] = None) -> bool:
+    """启动常驻分析服务，阻塞直到收到中断信号"""
+    host = host or SERVICE_CONFIG.get("host", "127.0.0.1")
+    port = port or SERVICE_CONFIG.get("port", 8765)
+    if max_concurrent_jobs is None:
+        max_concurrent_jobs = SERVICE_CONFIG.get("max_concurrent_jobs", 4)
+    service = AnalysisService(max_concurrent_jobs)
+    service.start()
+    httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    print(f"\n🛰️  分析服务已启动: http://{host}:{port}  （POST /jobs 提交任务，GET /jobs/<id>/stream 订阅进度）")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.stop()
+        print("分析服务已停止。")
+    return True
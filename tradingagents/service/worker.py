@@ -0,0 +1,112 @@
+# tradingagents/service/worker.py - 多进程分析worker
+"""
+单个进程内的多协程受GIL限制：pandas/pandas_ta指标计算、新闻与结构化输出解析都是CPU密集的。
+worker进程各自编译工作流图，从共享的持久化队列（job_queue.py）领取任务执行；
+在同一台机器上增加进程数，或在多台机器上启动指向同一队列的worker，即可横向扩展。
+
+领取任务时获得租约，执行期间定期心跳续约；进程崩溃后租约过期，任务由其他worker重新领取，
+并以任务ID为 thread_id 从检查点继续。进程池会重启异常退出的worker进程。
+"""
+
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from tradingagents.service.server import AnalysisService
+from tradingagents.utils.performance_monitor import global_monitor
+from tradingagents.utils.storage import PROJECT_ROOT
+
+try:
+    from tradingagents.default_config import SERVICE_CONFIG
+except ImportError:
+    SERVICE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+def run_worker(max_concurrent_jobs: Optional[int] = None, report_interval: float = 300) -> bool:
+    """在当前进程中执行队列中的任务，阻塞直到收到中断信号"""
+    if max_concurrent_jobs is None:
+        max_concurrent_jobs = SERVICE_CONFIG.get("worker_concurrency", 4)
+    service = AnalysisService(max(max_concurrent_jobs, 1))
+    service.start()
+    print(f"\n🛠️  worker {service.worker_id} 已启动，最多同时执行 {service.max_concurrent_jobs} 个任务")
+    try:
+        while True:
+            time.sleep(report_interval)
+            status = service.status()
+            logger.info(
+                f"worker [{service.worker_id}]: 完成 {status['completed']}，失败 {status['failed']}，"
+                f"执行中 {status['active_jobs']}，吞吐量 {status['jobs_per_hour']} 个/小时，队列 {status['queue']}"
+            )
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        service.stop()
+        _export_worker_report(service.worker_id)
+        print(f"worker {service.worker_id} 已停止。")
+    return True
+
+def _export_worker_report(worker_id: str):
+    """每个worker进程导出自己的性能报告，其中 worker[<id>] 一项即该进程的任务统计"""
+    path = PROJECT_ROOT / "logs" / f"performance_report_{worker_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        global_monitor.export_performance_report(str(path))
+    except Exception as e:
+        logger.warning(f"导出worker性能报告失败: {e}")
+
+def _worker_process(max_concurrent_jobs: Optional[int], initializer: Optional[Callable], initargs: tuple):
+    # 进程池关闭时发送 SIGTERM，转换为正常退出以便交还执行中的任务
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if initializer is not None:
+        initializer(*initargs)
+    run_worker(max_concurrent_jobs)
+
+def run_worker_pool(processes: Optional[int] = None, max_concurrent_jobs: Optional[int] = None,
+                    initializer: Optional[Callable] = None, initargs: tuple = (), check_interval: float = 5.0) -> bool:
+    """
+    启动多个worker进程并监督：异常退出的进程会被重启（其任务的租约过期后由其他worker接管）。
+    initializer 在每个子进程中先执行（如初始化日志、离线模型开关），需可被pickle。
+    """
+    processes = processes or SERVICE_CONFIG.get("worker_processes", 1)
+    if processes <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return run_worker(max_concurrent_jobs)
+    # spawn：子进程不继承父进程的线程与连接，在各平台上行为一致
+    context = multiprocessing.get_context("spawn")
+
+    def launch(index: int):
+        process = context.Process(target=_worker_process, args=(max_concurrent_jobs, initializer, initargs),
+                                  name=f"analysis-worker-{index}", daemon=False)
+        process.start()
+        return process
+
+    pool = {index: launch(index) for index in range(processes)}
+    print(f"\n🛠️  worker进程池已启动: {processes} 个进程（PID {', '.join(str(p.pid) for p in pool.values())}）")
+    try:
+        while pool:
+            time.sleep(check_interval)
+            for index, process in list(pool.items()):
+                if process.is_alive():
+                    continue
+                if process.exitcode == 0:
+                    logger.info(f"worker进程 {index} (PID {process.pid}) 已退出")
+                    del pool[index]
+                else:
+                    logger.warning(f"worker进程 {index} (PID {process.pid}) 异常退出（{process.exitcode}），正在重启")
+                    pool[index] = launch(index)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for process in pool.values():
+            if process.is_alive():
+                process.terminate()
+        for process in pool.values():
+            process.join(timeout=30)
+        print("worker进程池已停止。")
+    return True
@@ -1,5 +1,5 @@
 # tradingagents/utils/agent_states.py (V6.2 路径修正版)
-from typing import TypedDict, Optional
+from typing import Annotated, TypedDict, Optional
 from pydantic import BaseModel
 from tradingagents.agents.analysts.fundamentals_analyst import FundamentalsAnalysis
 from tradingagents.agents.analysts.market_analyst import MarketAnalysis
@@ -14,11 +14,19 @@ from tradingagents.agents.researchers.bull_researcher import BullishReport
 from tradingagents.agents.researchers.bear_researcher import BearishReport
 from tradingagents.agents.trader.trader import TradePlan
 
+def merge_briefing(left: Optional[dict], right: Optional[dict]) -> dict:
+    """合并各情报节点写入的简报部分（并行分支各自只写自己的键）"""
+    return {**(left or {}), **(right or {})}
+
+def merge_unique(left: Optional[list], right: Optional[list]) -> list:
+    """按出现顺序合并并去重：分支子图返回的是继承自父图的完整列表，直接相加会重复计入"""
+    return list(dict.fromkeys([*(left or []), *(right or [])]))
+
 class AgentState(TypedDict):
     """定义了整个投研流程中共享的状态。"""
     ticker: str
     stock_name: str
-    briefing_book: dict 
+    briefing_book: Annotated[dict, merge_briefing]
     latest_close_price: float 
     
     fundamentals_analysis: Optional[FundamentalsAnalysis]
@@ -29,10 +37,14 @@ class AgentState(TypedDict):
     capital_flow_analysis: Optional[CapitalFlowAnalysis]
     sector_analysis: Optional[SectorAnalysis]
     
+    # 研究主管渲染的《投研简报》，首席投资官原样复用作Prompt前缀
+    analyst_briefing: Optional[str]
     research_summary: Optional[ResearchSummary]
     risk_analysis: Optional[RiskAnalysis]
     bullish_report: Optional[BullishReport]
     bearish_report: Optional[BearishReport]
     final_decision: Optional[TradePlan]
+    # 因输入未变化而复用上次输出的智能体（见 node_memo.py），各节点追加，重复项只保留一次
+    skipped_agents: Annotated[list, merge_unique]
     iteration_count: int
     max_iterations: int
\ No newline at end of file
@@ -0,0 +1,28 @@
+# tradingagents/utils/async_limits.py - 异步执行路径的共享并发上限
+"""
+异步模式下所有智能体都以协程方式 `await chain.ainvoke(...)`，多只股票可以共用一个事件循环。
+这里为每个事件循环提供一个共享的 asyncio.Semaphore，限制同时在途的LLM调用数；
+asyncio.Semaphore 按等待顺序唤醒，因此各股票、各智能体之间是先到先得的公平排队。
+"""
+
+import asyncio
+import threading
+import weakref
+
+try:
+    from tradingagents.default_config import ASYNC_CONFIG
+except ImportError:
+    ASYNC_CONFIG = {}
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_semaphores_lock = threading.Lock()
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """获取当前事件循环共享的LLM并发信号量（需在协程内调用）"""
+    loop = asyncio.get_running_loop()
+    with _semaphores_lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(ASYNC_CONFIG.get("max_concurrent_llm_calls", 16))
+            _semaphores[loop] = semaphore
+        return semaphore
@@ -0,0 +1,208 @@
+# tradingagents/utils/briefing_compressor.py - 研究主管与首席投资官输入的Token预算压缩
+"""
+研究主管与首席投资官的Prompt由上游各报告全文拼接而成，上游越啰嗦，图中最长的这两次调用就越慢。
+这里按智能体配置输入Token预算，超出预算时对各报告做抽取式压缩：
+- 句子打分：小标题、含数字的句子、结论/建议类句子、段首段尾优先；
+- 跨报告去重：与已选句子高度相似（字符3-gram Jaccard）的句子直接丢弃；
+- 按原文顺序输出，预算在各报告间"注水式"分配（短报告原样保留，剩余预算均分给长报告）；
+- 只有抽取不出有效句子（如整段无标点的长文）时才调用LLM做摘要，LLM不可用时截断。
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .chain_utils import estimate_tokens
+
+try:
+    from tradingagents.default_config import BRIEFING_BUDGET_CONFIG
+except ImportError:
+    BRIEFING_BUDGET_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = {"research_manager": 6000, "trader": 8000}
+
+SENTENCE_SPLIT = re.compile(r'(?<=[。！？；!?;])|\n+')
+HEADER_PATTERN = re.compile(r'^\s*(#{1,6}\s|\*\*.+\*\*|【.+】|[一二三四五六七八九十]+[、.]|\d+[.、)]\s*\S)')
+NUMBER_PATTERN = re.compile(r'\d+(\.\d+)?\s*(%|元|亿|万|倍|亿元|万元|个百分点)?')
+CONCLUSION_WORDS = ("结论", "总结", "综上", "总体", "建议", "因此", "评级", "目标价", "止损", "风险",
+                    "看多", "看空", "利好", "利空", "买入", "卖出", "观望", "核心", "关键")
+
+@dataclass
+class CompressionResult:
+    """一次压缩的结果与前后体积"""
+    sections: Dict[str, str]
+    tokens_before: int
+    tokens_after: int
+    dropped_duplicates: int = 0
+    llm_summarized: List[str] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> float:
+        return self.tokens_after / self.tokens_before if self.tokens_before else 1.0
+
+def _normalize(sentence: str) -> str:
+    return re.sub(r'[\s\W_]+', '', sentence)
+
+def _shingles(text: str) -> set:
+    return {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+
+class BriefingCompressor:
+    """抽取式简报压缩器，可选LLM兜底"""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, dedupe_threshold: float = 0.8,
+                 llm_fallback: bool = True, min_sentence_chars: int = 6):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.dedupe_threshold = dedupe_threshold
+        self.llm_fallback = llm_fallback
+        self.min_sentence_chars = min_sentence_chars
+
+    @staticmethod
+    def _split(text: str) -> List[str]:
+        return [s.strip() for s in SENTENCE_SPLIT.split(text or "") if s and s.strip()]
+
+    @staticmethod
+    def _score(sentence: str, index: int, total: int) -> float:
+        score = 0.0
+        if HEADER_PATTERN.match(sentence) or sentence.endswith(("：", ":")):
+            score += 3.0
+        score += min(len(NUMBER_PATTERN.findall(sentence)), 3) * 0.8
+        score += sum(1.0 for word in CONCLUSION_WORDS if word in sentence)
+        if index == 0 or index == total - 1:
+            score += 1.5
+        # 过长的句子单位Token信息量偏低
+        return score / max(estimate_tokens(sentence) / 40, 1.0)
+
+    def _allocate(self, sizes: Dict[str, int], budget: int) -> Dict[str, int]:
+        """注水式分配：小于平均份额的部分原样保留，剩余预算均分给其余部分"""
+        allocation, remaining, pending = {}, budget, dict(sizes)
+        while pending:
+            share = remaining // len(pending)
+            small = {k: v for k, v in pending.items() if v <= share}
+            if not small:
+                allocation.update({k: share for k in pending})
+                break
+            for key, size in small.items():
+                allocation[key] = size
+                remaining -= size
+                del pending[key]
+        return allocation
+
+    def _extract(self, text: str, budget: int, seen: List[set]) -> Tuple[str, int]:
+        """在预算内按得分选句，跳过与已选句子重复的内容，返回 (压缩文本, 去重条数)"""
+        sentences = self._split(text)
+        ranked = sorted(range(len(sentences)), key=lambda i: self._score(sentences[i], i, len(sentences)), reverse=True)
+        chosen, used, duplicates = set(), 0, 0
+        for i in ranked:
+            sentence = sentences[i]
+            normalized = _normalize(sentence)
+            if len(normalized) < self.min_sentence_chars and not HEADER_PATTERN.match(sentence):
+                continue
+            shingles = _shingles(normalized)
+            if any(len(shingles & other) / len(shingles | other) >= self.dedupe_threshold for other in seen):
+                duplicates += 1
+                continue
+            cost = estimate_tokens(sentence)
+            if used + cost > budget:
+                continue
+            chosen.add(i)
+            used += cost
+            seen.append(shingles)
+        return "\n".join(sentences[i] for i in sorted(chosen)), duplicates
+
+    def _llm_summarize(self, name: str, text: str, budget: int) -> Optional[str]:
+        try:
+            from tradingagents.llms import llm_client_factory
+            from .rate_governor import llm_lease
+            llm = llm_client_factory(agent="briefing_compressor")
+            prompt = (
+                f"请把下面这份《{name}》压缩到约 {budget} 个Token以内。必须保留所有关键数字、结论与投资建议，"
+                f"删除重复与铺垫性表述，只输出压缩后的正文。\n\n{text}"
+            )
+            with llm_lease(llm, None, prompt):
+                response = llm.invoke(prompt)
+            return getattr(response, "content", str(response))
+        except Exception as e:
+            logger.warning(f"简报压缩: 《{name}》LLM摘要失败，改为截断: {e}")
+            return None
+
+    @staticmethod
+    def _truncate(text: str, budget: int) -> str:
+        # 按估算的Token/字符比例截断
+        tokens = estimate_tokens(text)
+        return text if tokens <= budget else text[:max(int(len(text) * budget / tokens), 0)]
+
+    def compress(self, sections: Dict[str, str], agent: str, budget: Optional[int] = None) -> CompressionResult:
+        """把若干命名的报告压缩到该智能体的Token预算内（不超出预算时原样返回）"""
+        budget = budget or self.budgets.get(agent)
+        sizes = {name: estimate_tokens(text or "") for name, text in sections.items()}
+        before = sum(sizes.values())
+        if not budget or before <= budget:
+            return CompressionResult(dict(sections), before, before)
+
+        allocation = self._allocate(sizes, budget)
+        # 原样保留的报告先登记其句子，其余报告中与之重复的事实不再重复选入
+        seen: List[set] = [
+            _shingles(_normalize(sentence))
+            for name, text in sections.items() if sizes[name] <= allocation[name]
+            for sentence in self._split(text)
+        ]
+        compressed, duplicates, summarized = {}, 0, []
+        for name, text in sections.items():
+            share = allocation[name]
+            if sizes[name] <= share:
+                compressed[name] = text
+                continue
+            extracted, dropped = self._extract(text, share, seen)
+            duplicates += dropped
+            if not extracted.strip():
+                # 抽取不出内容（通常是缺少标点的长段落）：LLM摘要兜底，否则截断
+                summary = self._llm_summarize(name, text, share) if self.llm_fallback else None
+                if summary:
+                    summarized.append(name)
+                extracted = self._truncate(summary or text, share)
+            compressed[name] = extracted
+        after = sum(estimate_tokens(text or "") for text in compressed.values())
+        return CompressionResult(compressed, before, after, duplicates, summarized)
+
+_compressor = None
+_compressor_lock = threading.Lock()
+
+def get_briefing_compressor() -> Optional[BriefingCompressor]:
+    """获取全局简报压缩器；在配置中关闭时返回 None"""
+    global _compressor
+    if not BRIEFING_BUDGET_CONFIG.get("enabled", True):
+        return None
+    with _compressor_lock:
+        if _compressor is None:
+            _compressor = BriefingCompressor(
+                budgets=BRIEFING_BUDGET_CONFIG.get("budgets"),
+                dedupe_threshold=BRIEFING_BUDGET_CONFIG.get("dedupe_threshold", 0.8),
+                llm_fallback=BRIEFING_BUDGET_CONFIG.get("llm_fallback", True)
+            )
+        return _compressor
+
+def compress_for_agent(sections: Dict[str, str], agent: str, reserved_tokens: int = 0) -> Dict[str, str]:
+    """
+    按智能体预算压缩输入并记录前后体积；压缩器关闭时原样返回。
+    reserved_tokens 为预算中已被其他输入（如共享的简报前缀）占用的部分，至少保留四分之一预算给本次输入。
+    """
+    compressor = get_briefing_compressor()
+    if compressor is None:
+        return sections
+    budget = compressor.budgets.get(agent)
+    if budget and reserved_tokens:
+        budget = max(budget - reserved_tokens, budget // 4)
+    result = compressor.compress(sections, agent, budget)
+    if result.tokens_after < result.tokens_before:
+        logger.info(
+            f"简报压缩 [{agent}]: 约 {result.tokens_before} → {result.tokens_after} Token"
+            f"（{result.ratio:.0%}），去重 {result.dropped_duplicates} 句"
+            + (f"，LLM摘要: {', '.join(result.llm_summarized)}" if result.llm_summarized else "")
+        )
+    else:
+        logger.info(f"简报压缩 [{agent}]: 输入约 {result.tokens_before} Token，未超出预算")
+    return result.sections
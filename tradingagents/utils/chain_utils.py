@@ -0,0 +1,78 @@
+# tradingagents/utils/chain_utils.py - LangChain链结构解析工具
+"""
+项目中所有智能体链都按 `prompt | llm | parser` 的方式构建。
+这里提供拆解链结构、识别模型身份、渲染最终Prompt的公共函数，
+供缓存、统计等需要"看见"链内部的模块使用。
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import RunnableSequence
+
+# 模型类名到提供商名称的映射
+PROVIDER_BY_CLASS = {
+    "ChatGoogleGenerativeAI": "gemini",
+    "ChatTongyi": "qwen",
+}
+
+@dataclass
+class ChainParts:
+    """`prompt | llm | parser` 链的三个组成部分"""
+    prompt: Any
+    llm: Any
+    parser: Any
+
+    @property
+    def output_model(self):
+        return getattr(self.parser, "pydantic_object", None)
+
+def split_chain(chain: Any) -> Optional[ChainParts]:
+    """把 `prompt | llm | parser` 链拆成三部分；结构不符时返回 None"""
+    if not isinstance(chain, RunnableSequence) or len(chain.middle) != 1:
+        return None
+    return ChainParts(prompt=chain.first, llm=chain.middle[0], parser=chain.last)
+
+def describe_llm(llm: Any) -> Dict[str, Any]:
+    """提取模型的提供商、模型名与温度，用于缓存键与统计"""
+    # 绑定了工具的模型（RunnableBinding）按其底层模型识别
+    base = llm
+    while hasattr(base, "bound"):
+        base = base.bound
+    class_name = type(base).__name__
+    provider = getattr(llm, "provider_name", None) or PROVIDER_BY_CLASS.get(class_name, class_name.lower())
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or "unknown"
+    return {
+        "provider": provider,
+        "model": str(model),
+        "temperature": getattr(llm, "temperature", None),
+    }
+
+def message_text(message: Any) -> str:
+    """
+    取出模型消息（或流式消息块）中的文本。原生结构化输出时结果在工具调用参数中，
+    此时返回参数的JSON文本，便于与普通输出走同一套解析与修复流程。
+    """
+    tool_call_chunks = getattr(message, "tool_call_chunks", None)
+    if tool_call_chunks:
+        return "".join(chunk.get("args") or "" for chunk in tool_call_chunks)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return json.dumps(tool_calls[0]["args"], ensure_ascii=False)
+    content = getattr(message, "content", message)
+    if isinstance(content, list):
+        # 部分提供商以内容块列表返回
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+def render_prompt(prompt: Any, input_data: dict) -> str:
+    """渲染出实际发送给模型的Prompt文本"""
+    return prompt.invoke(input_data).to_string()
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的Token数：中日韩字符约1字1个Token，其余字符约4个字符1个Token"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if '\u4e00' <= ch <= '\u9fff' or '\u3000' <= ch <= '\u303f' or '\uff00' <= ch <= '\uffef')
+    return cjk + (len(text) - cjk + 3) // 4
@@ -1,12 +1,23 @@
 # tradingagents/utils/error_handler.py - 统一错误处理模块
 
+import asyncio
 import logging
 import time
 import functools
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from typing import Any, Callable, Optional
 from datetime import datetime, timedelta
 import requests
 from requests.exceptions import RequestException, Timeout, ConnectionError
+from .chain_utils import split_chain, describe_llm, render_prompt, estimate_tokens, message_text
+from .llm_metrics import LLMCallRecord, LLMUsageCallbackHandler, llm_metrics
+from .llm_cache import get_llm_cache, is_cache_bypassed
+from .semantic_cache import get_semantic_cache
+from .async_limits import get_llm_semaphore
+from .token_streaming import StreamTiming, get_token_sink
+from .rate_governor import get_rate_governor, expected_completion_tokens
+from .output_repair import parse_with_repair, aparse_with_repair
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
@@ -56,6 +67,30 @@ def retry_with_backoff(
         return wrapper
     return decorator
 
+def async_retry_with_backoff(
+    max_retries: int = 3,
+    backoff_factor: float = 1.0,
+    exceptions: tuple = (Exception,)
+):
+    """
+    装饰器：retry_with_backoff 的协程版本，等待期间不阻塞事件循环
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            for attempt in range(max_retries + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except exceptions as e:
+                    if attempt == max_retries:
+                        logging.error(f"函数 {func.__name__} 在 {max_retries} 次重试后仍然失败: {e}")
+                        raise
+                    wait_time = backoff_factor * (2 ** attempt)
+                    logging.warning(f"函数 {func.__name__} 第 {attempt + 1} 次尝试失败: {e}，{wait_time}秒后重试...")
+                    await asyncio.sleep(wait_time)
+        return wrapper
+    return decorator
+
 def handle_network_request(
     url: str,
     method: str = 'GET',
@@ -144,26 +179,299 @@ class SafeDataFetcher:
             logging.error(error_msg)
             raise DataFetchError(error_msg)
 
+def _cache_lookup(llm_chain: Any, input_data: dict, agent_name: str, use_cache: bool, semantic_scope: Optional[str]):
+    """依次查询精确缓存与语义缓存，返回 (命中结果, 写回所需的上下文)"""
+    context = {}
+    if not use_cache or is_cache_bypassed():
+        return None, context
+    exact_cache = get_llm_cache()
+    semantic_cache = get_semantic_cache() if semantic_scope else None
+    if semantic_cache is not None and not semantic_cache.applies_to(agent_name):
+        semantic_cache = None
+    if exact_cache is None and semantic_cache is None:
+        return None, context
+    parts = split_chain(llm_chain)
+    if parts is None or parts.output_model is None:
+        return None, context
+    try:
+        prompt_text = render_prompt(parts.prompt, input_data)
+        if exact_cache is not None:
+            context["exact"] = (exact_cache, exact_cache.key_for(parts, prompt_text))
+            cached_result = exact_cache.get(context["exact"][1])
+            if cached_result is not None:
+                logging.info(f"{agent_name} 命中LLM响应缓存，跳过调用")
+                return cached_result, {}
+        if semantic_cache is not None:
+            cached_result, vector = semantic_cache.lookup(semantic_scope, agent_name, prompt_text)
+            if cached_result is not None:
+                return cached_result, {}
+            context["semantic"] = (semantic_cache, vector)
+    except Exception as e:
+        logging.warning(f"{agent_name} 读取LLM缓存失败，将直接调用: {e}")
+        return None, {}
+    context["chain"], context["scope"] = llm_chain, semantic_scope
+    return None, context
+
+def _cache_store(context: dict, result: Any, agent_name: str):
+    """把新的调用结果写回缓存"""
+    if not context or not hasattr(result, 'model_dump'):
+        return
+    try:
+        if "exact" in context:
+            exact_cache, cache_key = context["exact"]
+            exact_cache.put(cache_key, result, agent_name, context["chain"])
+        if "semantic" in context:
+            semantic_cache, vector = context["semantic"]
+            semantic_cache.put(context["scope"], agent_name, vector, result)
+    except Exception as e:
+        logging.warning(f"{agent_name} 写入LLM缓存失败: {e}")
+
+def _new_call_record(llm_chain: Any, agent_name: str, node: Optional[str], ticker: Optional[str] = None) -> LLMCallRecord:
+    """创建一条调用统计记录，并尽量识别出提供商与模型"""
+    parts = split_chain(llm_chain)
+    identity = describe_llm(parts.llm) if parts else {}
+    return LLMCallRecord(
+        agent=agent_name, node=node, ticker=ticker,
+        provider=identity.get("provider", "unknown"), model=identity.get("model", "unknown")
+    )
+
+@dataclass
+class _ChainCall:
+    """一次 safe_invoke 在多次重试之间共享的状态：用量回调、尝试次数与限流参数"""
+    rate_provider: Optional[str] = None
+    rate_scope: Optional[str] = None
+    estimated_tokens: int = 0
+    usage: LLMUsageCallbackHandler = field(default_factory=LLMUsageCallbackHandler)
+    attempts: int = 0
+
+    @property
+    def config(self) -> dict:
+        # rate_scope 通过 metadata 传给自行限流的模型（如对冲模型）
+        return {"callbacks": [self.usage], "metadata": {"rate_scope": self.rate_scope}}
+
+    def lease(self):
+        if self.rate_provider is None:
+            return nullcontext()
+        return get_rate_governor().lease(self.rate_provider, self.rate_scope, self.estimated_tokens)
+
+    def alease(self):
+        if self.rate_provider is None:
+            return nullcontext()
+        return get_rate_governor().alease(self.rate_provider, self.rate_scope, self.estimated_tokens)
+
+    def settle(self, lease):
+        """用实际Token用量修正TPM预估"""
+        if lease is not None and self.usage.prompt_tokens:
+            lease.actual_tokens = self.usage.prompt_tokens + self.usage.completion_tokens
+
+def _prepare_call(llm_chain: Any, input_data: dict, scope: Optional[str]) -> _ChainCall:
+    """识别链所用的提供商并估算本次调用的Token数，用于申请限流配额"""
+    call = _ChainCall(rate_scope=scope)
+    parts = split_chain(llm_chain)
+    if parts is None or getattr(parts.llm, "self_rate_limited", False):
+        return call
+    call.rate_provider = describe_llm(parts.llm)["provider"]
+    try:
+        call.estimated_tokens = estimate_tokens(render_prompt(parts.prompt, input_data)) + expected_completion_tokens()
+    except Exception:
+        call.estimated_tokens = expected_completion_tokens()
+    return call
+
+def _finish_call_record(record: LLMCallRecord, call: _ChainCall, start_time: float):
+    """补全耗时/Token/重试信息，写入LLM统计并同步到性能监控"""
+    record.latency = time.perf_counter() - start_time
+    if not record.cache_hit:
+        usage = call.usage
+        record.prompt_tokens, record.completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        record.cached_tokens = usage.cached_tokens
+        record.ttfb = usage.ttfb
+        record.streamed, record.chunks_per_second = usage.streamed, usage.chunks_per_second
+        record.retries = max(call.attempts - 1, 0)
+    llm_metrics.record(record)
+    from .performance_monitor import global_monitor
+    global_monitor.record_agent_performance(record.agent, record.latency, record.success, record.error)
+
+def _validate_result(result: Any, agent_name: str) -> Any:
+    """检查链的返回值是否为空"""
+    if result is None:
+        raise LLMError(f"{agent_name} 返回空结果")
+    
+    # 验证结果格式
+    if hasattr(result, 'analysis') and not result.analysis.strip():
+        raise LLMError(f"{agent_name} 返回的分析内容为空")
+    return result
+
+def _stream_text(llm: Any, prompt_value: Any, agent_name: str, call: _ChainCall, sink: Any) -> str:
+    """流式调用模型，逐块推送给输出端，返回完整文本"""
+    timing, chunks, error = StreamTiming(agent_name), [], None
+    sink.on_start(agent_name)
+    try:
+        for chunk in llm.stream(prompt_value, config=call.config):
+            text = message_text(chunk)
+            if text:
+                timing.mark(text)
+                chunks.append(text)
+                sink.on_token(agent_name, text)
+        return "".join(chunks)
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        call.usage.record_stream(timing.ttft, timing.chunks_per_second)
+        sink.on_end(agent_name, timing, error)
+
+async def _astream_text(llm: Any, prompt_value: Any, agent_name: str, call: _ChainCall, sink: Any) -> str:
+    """_stream_text 的协程版本"""
+    timing, chunks, error = StreamTiming(agent_name), [], None
+    sink.on_start(agent_name)
+    try:
+        async for chunk in llm.astream(prompt_value, config=call.config):
+            text = message_text(chunk)
+            if text:
+                timing.mark(text)
+                chunks.append(text)
+                sink.on_token(agent_name, text)
+        return "".join(chunks)
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        call.usage.record_stream(timing.ttft, timing.chunks_per_second)
+        sink.on_end(agent_name, timing, error)
+
+def _run_chain(llm_chain: Any, input_data: dict, agent_name: str, call: _ChainCall) -> Any:
+    """
+    拆开执行 `prompt | llm | parser`：保留模型的原始输出，解析失败时先做本地修复/追问（见 output_repair.py）；
+    开启流式模式时逐块推送Token。无法拆解的链整体调用。
+    """
+    parts = split_chain(llm_chain)
+    if parts is None:
+        return llm_chain.invoke(input_data, config=call.config)
+    prompt_value = parts.prompt.invoke(input_data)
+    sink = get_token_sink(agent_name)
+    if sink is None:
+        raw_text = message_text(parts.llm.invoke(prompt_value, config=call.config))
+    else:
+        raw_text = _stream_text(parts.llm, prompt_value, agent_name, call, sink)
+    result, _ = parse_with_repair(raw_text, parts.parser, parts.llm, call.config, agent_name)
+    return result
+
+async def _arun_chain(llm_chain: Any, input_data: dict, agent_name: str, call: _ChainCall) -> Any:
+    """_run_chain 的协程版本"""
+    parts = split_chain(llm_chain)
+    if parts is None:
+        return await llm_chain.ainvoke(input_data, config=call.config)
+    prompt_value = await parts.prompt.ainvoke(input_data)
+    sink = get_token_sink(agent_name)
+    if sink is None:
+        raw_text = message_text(await parts.llm.ainvoke(prompt_value, config=call.config))
+    else:
+        raw_text = await _astream_text(parts.llm, prompt_value, agent_name, call, sink)
+    result, _ = await aparse_with_repair(raw_text, parts.parser, parts.llm, call.config, agent_name)
+    return result
+
 class LLMSafetyWrapper:
     """LLM调用的安全包装器"""
     
     @staticmethod
-    @retry_with_backoff(max_retries=3, exceptions=(LLMError,))
-    def safe_invoke(llm_chain: Any, input_data: dict, agent_name: str = "未知") -> Any:
+    def safe_invoke(
+        llm_chain: Any,
+        input_data: dict,
+        agent_name: str = "未知",
+        use_cache: bool = True,
+        semantic_scope: Optional[str] = None,
+        node: Optional[str] = None,
+        ticker: Optional[str] = None
+    ) -> Any:
         """
-        安全的LLM调用，包含重试和错误处理
+        安全的LLM调用，包含响应缓存、重试、错误处理与Token/延迟统计。
+        semantic_scope（通常为股票代码）非空时，分析师链还会尝试语义近似缓存；
+        node 为发起调用的图节点名称，用于统计归类；
+        ticker 为限流排队的公平分组（缺省时使用 semantic_scope）。
+        开启流式模式（token_streaming.set_token_sink）时，输出会逐Token推送给输出端。
         """
+        record = _new_call_record(llm_chain, agent_name, node, ticker or semantic_scope)
+        call = _prepare_call(llm_chain, input_data, ticker or semantic_scope)
+        start_time = time.perf_counter()
         try:
-            logging.info(f"正在调用 {agent_name} LLM...")
-            result = llm_chain.invoke(input_data)
+            cached_result, cache_context = _cache_lookup(llm_chain, input_data, agent_name, use_cache, semantic_scope)
+            if cached_result is not None:
+                record.cache_hit = True
+                return cached_result
             
-            if result is None:
-                raise LLMError(f"{agent_name} 返回空结果")
+            result = LLMSafetyWrapper._invoke_with_retry(llm_chain, input_data, agent_name, call)
+            _cache_store(cache_context, result, agent_name)
+            return result
+        except Exception as e:
+            record.success = False
+            record.error = str(e)
+            raise
+        finally:
+            _finish_call_record(record, call, start_time)
+    
+    @staticmethod
+    async def safe_ainvoke(
+        llm_chain: Any,
+        input_data: dict,
+        agent_name: str = "未知",
+        use_cache: bool = True,
+        semantic_scope: Optional[str] = None,
+        node: Optional[str] = None,
+        ticker: Optional[str] = None
+    ) -> Any:
+        """
+        safe_invoke 的异步版本：缓存与统计逻辑相同，模型调用改为 `await chain.ainvoke(...)`，
+        并受提供商限流与当前事件循环共享的并发信号量约束。
+        """
+        record = _new_call_record(llm_chain, agent_name, node, ticker or semantic_scope)
+        call = _prepare_call(llm_chain, input_data, ticker or semantic_scope)
+        start_time = time.perf_counter()
+        try:
+            cached_result, cache_context = _cache_lookup(llm_chain, input_data, agent_name, use_cache, semantic_scope)
+            if cached_result is not None:
+                record.cache_hit = True
+                return cached_result
             
-            # 验证结果格式
-            if hasattr(result, 'analysis') and not result.analysis.strip():
-                raise LLMError(f"{agent_name} 返回的分析内容为空")
+            result = await LLMSafetyWrapper._ainvoke_with_retry(llm_chain, input_data, agent_name, call)
+            _cache_store(cache_context, result, agent_name)
+            return result
+        except Exception as e:
+            record.success = False
+            record.error = str(e)
+            raise
+        finally:
+            _finish_call_record(record, call, start_time)
+    
+    @staticmethod
+    @retry_with_backoff(max_retries=3, exceptions=(LLMError,))
+    def _invoke_with_retry(llm_chain: Any, input_data: dict, agent_name: str, call: _ChainCall) -> Any:
+        """申请限流配额后调用链并校验结果，失败时按指数退避重试"""
+        call.attempts += 1
+        try:
+            with call.lease() as lease:
+                logging.info(f"正在调用 {agent_name} LLM...")
+                result = _run_chain(llm_chain, input_data, agent_name, call)
+                call.settle(lease)
+            result = _validate_result(result, agent_name)
+            logging.info(f"{agent_name} LLM调用成功")
+            return result
             
+        except Exception as e:
+            error_msg = f"{agent_name} LLM调用失败: {e}"
+            logging.error(error_msg)
+            raise LLMError(error_msg)
+    
+    @staticmethod
+    @async_retry_with_backoff(max_retries=3, exceptions=(LLMError,))
+    async def _ainvoke_with_retry(llm_chain: Any, input_data: dict, agent_name: str, call: _ChainCall) -> Any:
+        """_invoke_with_retry 的协程版本，依次等待限流配额与共享信号量后再发起请求"""
+        call.attempts += 1
+        try:
+            async with call.alease() as lease, get_llm_semaphore():
+                logging.info(f"正在异步调用 {agent_name} LLM...")
+                result = await _arun_chain(llm_chain, input_data, agent_name, call)
+                call.settle(lease)
+            result = _validate_result(result, agent_name)
             logging.info(f"{agent_name} LLM调用成功")
             return result
             
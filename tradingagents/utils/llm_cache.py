@@ -0,0 +1,145 @@
+# tradingagents/utils/llm_cache.py - LLM响应的精确匹配缓存
+"""
+智能体链的Prompt完全由输入决定。以 (提供商, 模型, 温度, 输出模型, 渲染后的Prompt) 的哈希为键，
+把解析后的Pydantic结果持久化到SQLite，输入不变的重跑（如崩溃后重跑）可直接命中。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from .chain_utils import ChainParts, split_chain, describe_llm, render_prompt
+from .serialization import dump_model, load_model
+from .storage import get_storage_dir, connect_sqlite
+
+try:
+    from tradingagents.default_config import LLM_CACHE_CONFIG
+except ImportError:
+    LLM_CACHE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+_bypass = os.environ.get("TRADINGAGENTS_LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+def set_cache_bypass(bypass: bool):
+    """全局跳过LLM缓存（例如命令行 --no-llm-cache）"""
+    global _bypass
+    _bypass = bypass
+
+def is_cache_bypassed() -> bool:
+    return _bypass
+
+class LLMResponseCache:
+    """基于SQLite的LLM结果缓存，支持TTL与条目数上限"""
+
+    def __init__(self, db_path: Optional[str] = None, ttl_hours: float = 12, max_entries: int = 5000):
+        self.db_path = db_path or str(get_storage_dir() / "llm_cache.db")
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                       cache_key TEXT PRIMARY KEY,
+                       agent TEXT,
+                       provider TEXT,
+                       model TEXT,
+                       payload TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       last_access REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: Any, output_schema: str, prompt_text: str) -> str:
+        raw = "\x1f".join([str(provider), str(model), str(temperature), str(output_schema), prompt_text])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def key_for(self, parts: ChainParts, prompt_text: str) -> str:
+        """根据拆解后的链与已渲染的Prompt计算缓存键"""
+        identity = describe_llm(parts.llm)
+        return self.make_key(identity["provider"], identity["model"], identity["temperature"],
+                             parts.output_model.__name__, prompt_text)
+
+    def key_for_chain(self, chain: Any, input_data: dict) -> Optional[str]:
+        """为 `prompt | llm | parser` 链计算缓存键；无法识别结构时返回 None"""
+        parts = split_chain(chain)
+        if parts is None or parts.output_model is None:
+            return None
+        return self.key_for(parts, render_prompt(parts.prompt, input_data))
+
+    def get(self, cache_key: str) -> Optional[BaseModel]:
+        """读取未过期的缓存结果"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT payload FROM llm_cache WHERE cache_key = ? AND created_at >= ?", (cache_key, cutoff)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+        try:
+            result = load_model(row[0])
+        except Exception as e:
+            logger.warning(f"LLM缓存记录无法还原，已忽略: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, cache_key: str, result: BaseModel, agent: str = "", chain: Any = None):
+        """写入缓存，并按最近访问时间淘汰超出上限的条目"""
+        parts = split_chain(chain) if chain is not None else None
+        identity = describe_llm(parts.llm) if parts else {}
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, agent, provider, model, payload, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, agent, identity.get("provider"), identity.get("model"), dump_model(result), now, now)
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE cache_key IN "
+                    "(SELECT cache_key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取全局LLM缓存；被禁用、被跳过或初始化失败时返回 None"""
+    global _llm_cache
+    if _bypass or not LLM_CACHE_CONFIG.get("enabled", True):
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            try:
+                _llm_cache = LLMResponseCache(
+                    db_path=LLM_CACHE_CONFIG.get("db_path"),
+                    ttl_hours=LLM_CACHE_CONFIG.get("ttl_hours", 12),
+                    max_entries=LLM_CACHE_CONFIG.get("max_entries", 5000)
+                )
+            except Exception as e:
+                logger.warning(f"LLM缓存初始化失败，将不使用缓存: {e}")
+                return None
+        return _llm_cache
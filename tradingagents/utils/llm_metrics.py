@@ -0,0 +1,251 @@
+# tradingagents/utils/llm_metrics.py - LLM调用的Token与延迟统计
+"""
+为每一次智能体链调用记录: 输入/输出Token（含命中提供商前缀缓存的输入Token）、首字节时间、总延迟、重试次数与缓存命中情况，
+按 智能体 / 提供商 / 图节点 / 股票 聚合，既可查看单次运行，也可通过JSONL历史文件做长期统计，
+并随 PerformanceMonitor 的性能报告一起导出。
+
+历史文件超过 LLM_METRICS_CONFIG["history_max_mb"]（默认20MB）时按大小轮转为 .1/.2/...，
+长期汇总只读取当前文件与最近一个轮转文件，耗时与内存都有上限。
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .storage import PROJECT_ROOT
+
+try:
+    from tradingagents.default_config import LLM_METRICS_CONFIG
+except ImportError:
+    LLM_METRICS_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LLMCallRecord:
+    """单次链调用的统计记录"""
+    agent: str
+    provider: str = "unknown"
+    model: str = "unknown"
+    node: Optional[str] = None
+    ticker: Optional[str] = None
+    run_id: Optional[str] = None
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    ttfb: Optional[float] = None
+    latency: float = 0.0
+    retries: int = 0
+    success: bool = True
+    cache_hit: bool = False
+    streamed: bool = False
+    chunks_per_second: Optional[float] = None
+    error: Optional[str] = None
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def uncached_tokens(self) -> int:
+        return max(self.prompt_tokens - self.cached_tokens, 0)
+
+def _extract_usage(response: Any) -> Dict[str, int]:
+    """
+    兼容不同提供商的Token用量字段（usage_metadata / llm_output.token_usage）。
+    命中前缀缓存的输入Token: usage_metadata.input_token_details.cache_read（Gemini等），
+    或 token_usage.prompt_tokens_details.cached_tokens（DashScope/OpenAI兼容接口）。
+    """
+    prompt_tokens = completion_tokens = cached_tokens = 0
+    for generation_list in getattr(response, "generations", None) or []:
+        for generation in generation_list:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0) or 0
+                completion_tokens += usage.get("output_tokens", 0) or 0
+                cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    if not (prompt_tokens or completion_tokens):
+        token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens") or token_usage.get("input_tokens") or 0
+        completion_tokens = token_usage.get("completion_tokens") or token_usage.get("output_tokens") or 0
+        cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return {"prompt_tokens": int(prompt_tokens), "completion_tokens": int(completion_tokens),
+            "cached_tokens": int(cached_tokens)}
+
+class LLMUsageCallbackHandler(BaseCallbackHandler):
+    """挂在链调用上的回调，采集Token用量与首字节时间"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.ttfb: Optional[float] = None
+        self.streamed = False
+        self.chunks_per_second: Optional[float] = None
+        self._started_at: Optional[float] = None
+
+    def _mark_start(self):
+        self._started_at = time.perf_counter()
+        self.ttfb = None
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._mark_start()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._mark_start()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.ttfb is None and self._started_at is not None:
+            self.ttfb = time.perf_counter() - self._started_at
+
+    def record_stream(self, ttft: Optional[float], chunks_per_second: Optional[float]):
+        """流式模式下由调用方直接写入首Token时间与输出速率"""
+        self.streamed = True
+        self.ttfb = ttft
+        self.chunks_per_second = chunks_per_second
+
+    def on_llm_end(self, response, **kwargs):
+        usage = _extract_usage(response)
+        self.prompt_tokens += usage["prompt_tokens"]
+        self.cached_tokens += usage["cached_tokens"]
+        self.completion_tokens += usage["completion_tokens"]
+
+class LLMMetricsCollector:
+    """LLM调用统计收集器：内存中保留近期记录，并可追加写入JSONL历史文件"""
+
+    def __init__(self, max_history: int = 5000, history_path: Optional[str] = None,
+                 history_max_mb: float = 20, history_backups: int = 3):
+        self.records = deque(maxlen=max_history)
+        self.history_path = Path(history_path) if history_path else PROJECT_ROOT / "logs" / "llm_usage.jsonl"
+        self.history_max_bytes = int(history_max_mb * 1024 * 1024)
+        self.history_backups = max(history_backups, 0)
+        self.current_run_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def start_run(self, run_id: Optional[str] = None) -> str:
+        """开始一次新的运行，后续记录归入该 run_id"""
+        self.current_run_id = run_id or uuid.uuid4().hex[:12]
+        return self.current_run_id
+
+    def record(self, record: LLMCallRecord):
+        if record.run_id is None:
+            record.run_id = self.current_run_id
+        with self._lock:
+            self.records.append(record)
+            try:
+                self.history_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.history_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+                    size = f.tell()
+                if size >= self.history_max_bytes:
+                    self._rotate_history()
+            except OSError as e:
+                logger.debug(f"写入LLM统计历史失败: {e}")
+
+    def _rotate_history(self):
+        """llm_usage.jsonl -> .1 -> .2 ...，超出保留数量的最旧文件被删除（调用方持有锁）"""
+        if self.history_backups == 0:
+            self.history_path.unlink(missing_ok=True)
+            return
+        oldest = self.history_path.with_name(f"{self.history_path.name}.{self.history_backups}")
+        oldest.unlink(missing_ok=True)
+        for index in range(self.history_backups - 1, 0, -1):
+            source = self.history_path.with_name(f"{self.history_path.name}.{index}")
+            if source.exists():
+                source.replace(self.history_path.with_name(f"{self.history_path.name}.{index + 1}"))
+        self.history_path.replace(self.history_path.with_name(f"{self.history_path.name}.1"))
+        logger.info(f"LLM统计历史已轮转: {self.history_path}")
+
+    @staticmethod
+    def _aggregate(records: Iterable[LLMCallRecord], key: str) -> Dict[str, Dict[str, Any]]:
+        groups: Dict[str, List[LLMCallRecord]] = defaultdict(list)
+        for r in records:
+            groups[str(getattr(r, key) or "unknown")].append(r)
+        summary = {}
+        for name, items in groups.items():
+            latencies = sorted(r.latency for r in items)
+            ttfbs = [r.ttfb for r in items if r.ttfb is not None]
+            rates = [r.chunks_per_second for r in items if r.chunks_per_second]
+            summary[name] = {
+                "calls": len(items),
+                "cache_hits": sum(1 for r in items if r.cache_hit),
+                "failures": sum(1 for r in items if not r.success),
+                "retries": sum(r.retries for r in items),
+                "prompt_tokens": sum(r.prompt_tokens for r in items),
+                "cached_tokens": sum(r.cached_tokens for r in items),
+                "completion_tokens": sum(r.completion_tokens for r in items),
+                "total_latency": round(sum(latencies), 3),
+                "avg_latency": round(sum(latencies) / len(latencies), 3),
+                "p95_latency": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3),
+                "avg_ttfb": round(sum(ttfbs) / len(ttfbs), 3) if ttfbs else None,
+                "streamed_calls": sum(1 for r in items if r.streamed),
+                "avg_chunks_per_second": round(sum(rates) / len(rates), 2) if rates else None,
+            }
+        # 按总耗时降序，便于找到主导耗时的调用
+        return dict(sorted(summary.items(), key=lambda kv: kv[1]["total_latency"], reverse=True))
+
+    def summarize(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """按 智能体/提供商/节点/股票 汇总；run_id 为空时汇总内存中的全部记录"""
+        with self._lock:
+            records = [r for r in self.records if run_id is None or r.run_id == run_id]
+        return {
+            "run_id": run_id,
+            "calls": len(records),
+            "prompt_tokens": sum(r.prompt_tokens for r in records),
+            "cached_tokens": sum(r.cached_tokens for r in records),
+            "uncached_tokens": sum(r.uncached_tokens for r in records),
+            "completion_tokens": sum(r.completion_tokens for r in records),
+            "by_agent": self._aggregate(records, "agent"),
+            "by_provider": self._aggregate(records, "provider"),
+            "by_node": self._aggregate(records, "node"),
+            "by_ticker": self._aggregate(records, "ticker"),
+        }
+
+    def summarize_history(self) -> Dict[str, Any]:
+        """读取最近一个轮转文件与当前的JSONL历史文件，做跨运行的长期汇总（读取量不超过两个文件的上限）"""
+        records = []
+        for path in (self.history_path.with_name(f"{self.history_path.name}.1"), self.history_path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            records.append(LLMCallRecord(**json.loads(line)))
+                        except (ValueError, TypeError):
+                            continue
+            except FileNotFoundError:
+                pass
+        return {
+            "calls": len(records),
+            "runs": len({r.run_id for r in records}),
+            "by_agent": self._aggregate(records, "agent"),
+            "by_provider": self._aggregate(records, "provider"),
+        }
+
+    def log_run_summary(self, run_id: Optional[str] = None):
+        """以日志形式输出本次运行中耗时最多的调用"""
+        summary = self.summarize(run_id or self.current_run_id)
+        logger.info(
+            f"LLM调用统计: 共 {summary['calls']} 次，输入Token {summary['prompt_tokens']}"
+            f"（命中前缀缓存 {summary['cached_tokens']}），输出Token {summary['completion_tokens']}"
+        )
+        for agent, stats in list(summary["by_agent"].items())[:5]:
+            logger.info(
+                f"  - {agent}: 调用 {stats['calls']} 次，总耗时 {stats['total_latency']}s，"
+                f"Token {stats['prompt_tokens']}/{stats['completion_tokens']}（缓存 {stats['cached_tokens']}），重试 {stats['retries']} 次"
+            )
+
+# 全局LLM统计实例
+llm_metrics = LLMMetricsCollector(
+    history_max_mb=LLM_METRICS_CONFIG.get("history_max_mb", 20),
+    history_backups=LLM_METRICS_CONFIG.get("history_backups", 3)
+)
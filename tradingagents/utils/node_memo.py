@@ -0,0 +1,154 @@
+# tradingagents/utils/node_memo.py - 按输入哈希记忆智能体的输出
+"""
+每个智能体（分析师、分析师合议、研究主管、多空与风控、首席投资官）只依赖少量输入字段。
+把这些字段规范化后连同智能体链的指纹（模型、温度、输出模型、Prompt模板）计算哈希，
+输出写入本地SQLite；下次运行时输入哈希相同且记录仍新鲜的智能体直接复用结果，跳过整个
+子任务（含简报压缩、限流排队与模型调用）。只有输入变化的智能体及其下游会重新执行，
+例如只新增了一条新闻时，基本面、技术面与政策分析师都会被跳过。
+
+与 llm_cache 的区别：llm_cache 以渲染后的Prompt为键，只省去模型调用；这里以智能体消费的
+原始字段为键，跳过的是整个节点的工作，并在运行报告中列出被跳过的智能体。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from .chain_utils import split_chain, describe_llm
+from .llm_cache import is_cache_bypassed
+from .serialization import dump_model, load_model, dumps, loads
+from .storage import get_storage_dir, connect_sqlite
+
+try:
+    from tradingagents.default_config import NODE_MEMO_CONFIG
+except ImportError:
+    NODE_MEMO_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+def canonicalize(value: Any) -> Any:
+    """把输入转换为与字典顺序、Pydantic对象无关的JSON结构"""
+    if isinstance(value, BaseModel):
+        return canonicalize(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(k): canonicalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def chain_fingerprint(chain: Any) -> str:
+    """智能体链的指纹：模型、温度、输出模型与Prompt模板任一变化都会使旧记录失效"""
+    parts = split_chain(chain)
+    if parts is None:
+        return type(chain).__name__
+    output_model = parts.output_model.__name__ if parts.output_model is not None else ""
+    return dumps([describe_llm(parts.llm), output_model, repr(parts.prompt)])
+
+class NodeMemoStore:
+    """基于SQLite的智能体输出记忆，按 (智能体, 输入哈希) 建索引"""
+
+    def __init__(self, db_path: Optional[str] = None, ttl_hours: float = 6):
+        self.db_path = db_path or str(get_storage_dir() / "node_memo.db")
+        self.ttl_seconds = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS node_memo (
+                       agent TEXT NOT NULL,
+                       input_hash TEXT NOT NULL,
+                       ticker TEXT,
+                       payload TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       PRIMARY KEY (agent, input_hash)
+                   )"""
+            )
+            self._conn.execute("DELETE FROM node_memo WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+    @staticmethod
+    def input_hash(agent: str, ticker: str, inputs: Dict[str, Any], chain: Any = None) -> str:
+        """
+        智能体名称、股票代码、链指纹与规范化输入共同决定的哈希。
+        部分输入是各股票相同的占位或兜底文本（如"参见…"、数据获取失败的提示），
+        不含股票代码时会把一只股票的结果错配给另一只。
+        """
+        raw = json.dumps([agent, ticker, chain_fingerprint(chain) if chain is not None else "", canonicalize(inputs)],
+                         ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, agent: str, input_hash: str) -> Optional[Dict[str, Any]]:
+        """读取仍新鲜的记录，返回当时写入的状态更新"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM node_memo WHERE agent = ? AND input_hash = ? AND created_at >= ?",
+                (agent, input_hash, cutoff)
+            ).fetchone()
+        try:
+            update = self._decode(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"节点记忆: {agent} 的记录无法还原，已忽略: {e}")
+            update = None
+        with self._lock:
+            if update is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return update
+
+    def put(self, agent: str, input_hash: str, update: Dict[str, Any], ticker: Optional[str] = None):
+        """写入一个智能体的状态更新；含 None 的（即失败的）结果不记忆"""
+        if any(value is None for value in update.values()):
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO node_memo (agent, input_hash, ticker, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (agent, input_hash, ticker, self._encode(update), time.time())
+            )
+
+    @staticmethod
+    def _encode(update: Dict[str, Any]) -> str:
+        return dumps({
+            key: {"model": dump_model(value)} if isinstance(value, BaseModel) else {"value": value}
+            for key, value in update.items()
+        })
+
+    @staticmethod
+    def _decode(payload: str) -> Dict[str, Any]:
+        return {
+            key: load_model(item["model"]) if "model" in item else item["value"]
+            for key, item in loads(payload).items()
+        }
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+_node_memo = None
+_node_memo_lock = threading.Lock()
+
+def get_node_memo() -> Optional[NodeMemoStore]:
+    """获取全局节点记忆；被禁用、被 --no-llm-cache 跳过或初始化失败时返回 None"""
+    global _node_memo
+    if is_cache_bypassed() or not NODE_MEMO_CONFIG.get("enabled", True):
+        return None
+    with _node_memo_lock:
+        if _node_memo is None:
+            try:
+                _node_memo = NodeMemoStore(
+                    db_path=NODE_MEMO_CONFIG.get("db_path"),
+                    ttl_hours=NODE_MEMO_CONFIG.get("ttl_hours", 6)
+                )
+            except Exception as e:
+                logger.warning(f"节点记忆初始化失败，将不使用记忆: {e}")
+                return None
+        return _node_memo
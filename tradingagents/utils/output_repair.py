@@ -0,0 +1,267 @@
+# tradingagents/utils/output_repair.py - 结构化输出的本地修复
+"""
+PydanticOutputParser 解析失败时，不再直接整条链重跑，而是保留原始输出，按代价从低到高尝试：
+1. 本地修复：提取JSON（去掉代码块与前后多余文字）、修正引号与尾逗号、补齐括号，
+   再按字段类型做转换（如 "4分" -> 4、列表 -> 文本、Literal 近似匹配），为可选字段填默认值；
+2. 小规模追问：只把原始输出与解析错误发给模型，要求返回修正后的JSON；
+3. 以上都失败才交给上层重试，完整重新生成。
+每条路径的次数都会计数，便于观察各模型的输出质量。
+"""
+
+import json
+import logging
+import re
+import threading
+from typing import Any, Literal, Optional, Tuple, Union, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+from .chain_utils import message_text
+
+logger = logging.getLogger(__name__)
+
+class OutputRepairError(ValueError):
+    """本地修复与追问均失败，需要重新生成"""
+    pass
+
+_stats = {"direct": 0, "local": 0, "reask": 0, "regenerate": 0}
+_stats_lock = threading.Lock()
+
+def _count(path: str):
+    with _stats_lock:
+        _stats[path] += 1
+
+def repair_stats() -> dict:
+    """各解析路径的累计次数"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    stats["repair_rate"] = round((stats["local"] + stats["reask"]) / total, 3) if total else 0.0
+    return stats
+
+FENCE_PATTERN = re.compile(r'```(?:json|JSON)?\s*(.*?)```', re.DOTALL)
+TRAILING_COMMA = re.compile(r',\s*([}\]])')
+SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '„': '"', '‘': "'", '’': "'"})
+# 枚举取值修复时去掉的首尾字符（空白、引号、中英文标点）
+LITERAL_STRIP_CHARS = " \t\r\n\"'“”‘’「」『』《》【】()（）[]<>.,;:!?。，、；：！？"
+# 出现在取值前的否定词：带否定的动作绝不修复成该动作
+NEGATION_PREFIXES = ("不", "暂不", "未", "无", "别", "勿")
+
+def _extract_json_text(text: str) -> str:
+    """去掉Markdown代码块与JSON前后的说明文字"""
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find('{')
+    if start < 0:
+        return text.strip()
+    end = text.rfind('}')
+    return text[start:end + 1] if end > start else text[start:]
+
+def _escape_inner_newlines(text: str) -> str:
+    """把字符串字面量中的裸换行转义（模型常在长文本字段中直接换行）"""
+    out, in_string, escaped = [], False, False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == '\n':
+                out.append('\\n')
+                continue
+        elif ch == '"':
+            in_string = True
+        out.append(ch)
+    return "".join(out)
+
+def _balance(text: str) -> str:
+    """补齐被截断的字符串与括号"""
+    stack, in_string, escaped = [], False, False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]' and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = TRAILING_COMMA.sub(r'\1', text.rstrip().rstrip(','))
+    return text + "".join(reversed(stack))
+
+def _loads_lenient(text: str) -> Any:
+    candidate = _extract_json_text(text.translate(SMART_QUOTES))
+    if '"' not in candidate:
+        # 单引号JSON（Python字典风格）
+        candidate = candidate.replace("'", '"')
+    fixed = TRAILING_COMMA.sub(r'\1', _escape_inner_newlines(candidate))
+    attempts = [candidate, fixed, _balance(fixed)]
+    last_error = None
+    for attempt in attempts:
+        try:
+            return json.loads(attempt, strict=False)
+        except json.JSONDecodeError as e:
+            last_error = e
+    raise last_error
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    """按字段类型做宽松转换，无法转换时原样返回交给pydantic报错"""
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if value is None:
+            return None
+        return _coerce(value, args[0]) if len(args) == 1 else value
+    if origin is Literal:
+        choices = get_args(annotation)
+        if value in choices:
+            return value
+        # 只接受去掉首尾空白、引号与标点后完全一致的取值；子串匹配会把"暂不买入"误修成"买入"，
+        # 其余情况原样返回，由pydantic报错后走追问修复
+        text = str(value).strip(LITERAL_STRIP_CHARS)
+        if text.startswith(NEGATION_PREFIXES):
+            return value
+        for choice in choices:
+            if text == str(getattr(choice, "value", choice)).strip(LITERAL_STRIP_CHARS):
+                return choice
+        return value
+    if annotation is str:
+        if isinstance(value, list):
+            return "\n".join(str(v) for v in value)
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        return value if isinstance(value, str) else ("" if value is None else str(value))
+    if annotation in (int, float) and isinstance(value, str):
+        number = re.search(r'-?\d+(\.\d+)?', value)
+        if number:
+            return int(round(float(number.group()))) if annotation is int else float(number.group())
+    if annotation is int and isinstance(value, float):
+        return int(round(value))
+    return value
+
+def coerce_to_model(data: Any, model: type) -> BaseModel:
+    """把宽松解析出的字典转换并校验为pydantic模型"""
+    if not isinstance(data, dict):
+        raise ValueError(f"期望JSON对象，实际为 {type(data).__name__}")
+    # 模型有时会多包一层，如 {"TradePlan": {...}}
+    if len(data) == 1 and not set(data) & set(model.model_fields):
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            data = inner
+    values = {}
+    for name, field in model.model_fields.items():
+        key = name if name in data else field.alias if field.alias in data else None
+        if key is None:
+            if not field.is_required():
+                continue  # 可选字段缺失时交给pydantic填默认值
+            raise ValueError(f"缺少必填字段 {name}")
+        values[name] = _coerce(data[key], field.annotation)
+    return model.model_validate(values)
+
+def parse_locally(text: str, parser: Any) -> BaseModel:
+    """先按原解析器解析，失败时做本地修复；不涉及任何LLM调用"""
+    try:
+        return parser.parse(text)
+    except Exception as parse_error:
+        model = getattr(parser, "pydantic_object", None)
+        if model is None:
+            raise
+        try:
+            return coerce_to_model(_loads_lenient(text), model)
+        except (ValueError, ValidationError) as e:
+            raise OutputRepairError(f"{parse_error}; 本地修复失败: {e}") from e
+
+def _compact_schema(model: type) -> str:
+    properties = model.model_json_schema().get("properties", {})
+    return json.dumps(
+        {name: prop.get("enum") or prop.get("type", "string") for name, prop in properties.items()},
+        ensure_ascii=False
+    )
+
+REASK_PROMPT = """你上一次的输出无法被解析为要求的JSON结构。
+解析错误: {error}
+
+字段与类型: {schema}
+
+你上一次的输出:
+{raw}
+
+请只返回修正后的JSON对象，保持原有内容不变，不要添加任何解释。"""
+
+def _try_local(text: str, parser: Any, agent_name: str) -> Tuple[Optional[BaseModel], Optional[str], Exception]:
+    """直接解析或本地修复，返回 (结果, 路径, 最后的错误)"""
+    try:
+        result = parser.parse(text)
+        _count("direct")
+        return result, "direct", None
+    except Exception as e:
+        error = e
+    model = getattr(parser, "pydantic_object", None)
+    if model is None:
+        return None, None, error
+    try:
+        result = coerce_to_model(_loads_lenient(text), model)
+        _count("local")
+        logger.info(f"{agent_name} 输出格式有误，已在本地修复")
+        return result, "local", None
+    except (ValueError, ValidationError) as e:
+        return None, None, OutputRepairError(f"{error}; 本地修复失败: {e}")
+
+def _reask_prompt(text: str, parser: Any, error: Exception) -> Optional[str]:
+    model = getattr(parser, "pydantic_object", None)
+    if model is None:
+        return None
+    return REASK_PROMPT.format(error=str(error)[:500], schema=_compact_schema(model), raw=text[:6000])
+
+def parse_with_repair(text: str, parser: Any, llm: Any = None, config: Optional[dict] = None,
+                      agent_name: str = "", allow_reask: bool = True) -> Tuple[BaseModel, str]:
+    """
+    解析LLM输出，返回 (结果, 路径)，路径为 direct / local / reask。
+    全部失败时计入 regenerate 并抛出 OutputRepairError，由上层重试。
+    """
+    result, path, error = _try_local(text, parser, agent_name)
+    if result is not None:
+        return result, path
+    prompt = _reask_prompt(text, parser, error) if allow_reask and llm is not None else None
+    if prompt is not None:
+        try:
+            response = llm.invoke(prompt, config=config)
+            result = parse_locally(message_text(response), parser)
+            _count("reask")
+            logger.info(f"{agent_name} 输出格式有误，已通过追问修复")
+            return result, "reask"
+        except Exception as e:
+            logger.warning(f"{agent_name} 追问修复失败: {e}")
+            error = e
+    _count("regenerate")
+    raise OutputRepairError(f"{agent_name} 输出无法修复，需要重新生成: {error}")
+
+async def aparse_with_repair(text: str, parser: Any, llm: Any = None, config: Optional[dict] = None,
+                             agent_name: str = "", allow_reask: bool = True) -> Tuple[BaseModel, str]:
+    """parse_with_repair 的协程版本"""
+    result, path, error = _try_local(text, parser, agent_name)
+    if result is not None:
+        return result, path
+    prompt = _reask_prompt(text, parser, error) if allow_reask and llm is not None else None
+    if prompt is not None:
+        try:
+            response = await llm.ainvoke(prompt, config=config)
+            result = parse_locally(message_text(response), parser)
+            _count("reask")
+            logger.info(f"{agent_name} 输出格式有误，已通过追问修复")
+            return result, "reask"
+        except Exception as e:
+            logger.warning(f"{agent_name} 追问修复失败: {e}")
+            error = e
+    _count("regenerate")
+    raise OutputRepairError(f"{agent_name} 输出无法修复，需要重新生成: {error}")
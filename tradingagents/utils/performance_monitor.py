@@ -9,6 +9,9 @@ from typing import Dict, Any, Optional
 from dataclasses import dataclass
 import threading
 from collections import defaultdict, deque
+from .llm_metrics import llm_metrics
+from .rate_governor import get_rate_governor
+from .output_repair import repair_stats
 
 @dataclass
 class SystemMetrics:
@@ -209,7 +212,16 @@ class PerformanceMonitor:
                     "timestamp": p.timestamp.isoformat()
                 }
                 for p in list(self.agent_performance_history)[-100:]  # 最近100条
-            ]
+            ],
+            # LLM调用的Token与延迟统计（本次运行 + 历史汇总）
+            "llm_usage": {
+                "current_run": llm_metrics.summarize(llm_metrics.current_run_id),
+                "history": llm_metrics.summarize_history()
+            },
+            # 各外部提供商的限流排队统计
+            "rate_limits": get_rate_governor().stats(),
+            # 结构化输出：直接解析 / 本地修复 / 追问修复 / 重新生成 的次数
+            "output_repair": repair_stats()
         }
         
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -0,0 +1,281 @@
+# tradingagents/utils/rate_governor.py - 按外部提供商的令牌桶限流与并发总控
+"""
+所有LLM与搜索调用在发出请求前都向这里申请一个"租约"：
+- 每个提供商（gemini / qwen / tavily / google_search ...）各有一组限制：
+  每秒请求数（令牌桶）、每分钟Token数（令牌桶）与最大在途请求数；
+- 同一提供商的等待者按股票分组轮转放行，批量运行时一只股票的大量请求不会饿死其他股票；
+- 记录每个提供商、每只股票的排队等待时间，便于观察限流是否成为瓶颈。
+同步调用阻塞等待，协程调用使用 `async with governor.alease(...)` 异步等待。
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .chain_utils import describe_llm, estimate_tokens
+
+try:
+    from tradingagents.default_config import RATE_LIMIT_CONFIG
+except ImportError:
+    RATE_LIMIT_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+# 默认限制偏保守，可在 RATE_LIMIT_CONFIG["providers"] 中按账号配额覆盖
+DEFAULT_PROVIDER_LIMITS = {
+    "gemini": {"rps": 2.0, "tpm": 250000, "max_in_flight": 8},
+    "qwen": {"rps": 5.0, "tpm": 300000, "max_in_flight": 8},
+    "tavily": {"rps": 2.0, "tpm": None, "max_in_flight": 4},
+    "google_search": {"rps": 1.0, "tpm": None, "max_in_flight": 2},
+    # 离线模拟模型只用于压测，限制放宽到不成为瓶颈
+    "fake": {"rps": 100.0, "tpm": None, "max_in_flight": 64},
+}
+FALLBACK_LIMITS = {"rps": 5.0, "tpm": None, "max_in_flight": 16}
+
+class TokenBucket:
+    """经典令牌桶：容量为 capacity，每秒补充 rate 个令牌（调用方负责加锁）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """距离能取出 amount 个令牌还需等待的秒数（超过容量的请求按容量计）"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """按实际用量修正预估（amount 为负时表示多扣）"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+@dataclass
+class Lease:
+    """一次已获准的请求；调用结束后可写入实际Token用量以修正预估"""
+    provider: str
+    scope: str
+    estimated_tokens: int
+    waited: float
+    actual_tokens: Optional[int] = None
+
+class ProviderGovernor:
+    """单个提供商的限流器：RPS/TPM令牌桶 + 在途上限 + 按股票轮转的公平排队"""
+
+    def __init__(self, name: str, rps: Optional[float] = None, tpm: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, burst: Optional[float] = None):
+        self.name = name
+        self.rps_bucket = TokenBucket(rps, burst or max(rps, 1.0)) if rps else None
+        self.tpm_bucket = TokenBucket(tpm / 60.0, tpm) if tpm else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._cv = threading.Condition()
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._tickets = itertools.count()
+        self.waits = deque(maxlen=2000)
+        self.scope_waits: Dict[str, list] = defaultdict(lambda: [0, 0.0])
+        self.granted = 0
+        self.throttled = 0
+
+    def _enqueue(self, scope: str) -> int:
+        ticket = next(self._tickets)
+        self._queues.setdefault(scope, deque()).append(ticket)
+        return ticket
+
+    def _dequeue(self, scope: str, ticket: int):
+        queue = self._queues.get(scope)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[scope]
+
+    def _try_grant(self, scope: str, ticket: int, tokens: int) -> Optional[float]:
+        """已放行返回 None，否则返回建议的等待秒数（调用方持有 _cv）"""
+        # 轮转公平：只有排在最前的股票的队首请求才能被放行
+        head_scope = next(iter(self._queues))
+        if head_scope != scope or self._queues[scope][0] != ticket:
+            return 0.05
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return 0.05
+        wait = max(
+            self.rps_bucket.wait_time(1) if self.rps_bucket else 0.0,
+            self.tpm_bucket.wait_time(tokens) if self.tpm_bucket and tokens else 0.0,
+        )
+        if wait > 0:
+            return wait
+        if self.rps_bucket:
+            self.rps_bucket.consume(1)
+        if self.tpm_bucket and tokens:
+            self.tpm_bucket.consume(tokens)
+        self.in_flight += 1
+        queue = self._queues.pop(scope)
+        queue.popleft()
+        if queue:
+            # 该股票还有请求在排队，移到队尾等待下一轮
+            self._queues[scope] = queue
+        return None
+
+    def _granted(self, scope: str, tokens: int, waited: float) -> Lease:
+        self.granted += 1
+        if waited > 0.01:
+            self.throttled += 1
+        self.waits.append(waited)
+        self.scope_waits[scope][0] += 1
+        self.scope_waits[scope][1] += waited
+        return Lease(self.name, scope, tokens, waited)
+
+    def acquire(self, scope: str, tokens: int = 0, timeout: Optional[float] = None) -> Lease:
+        start = time.monotonic()
+        with self._cv:
+            ticket = self._enqueue(scope)
+            try:
+                while True:
+                    wait = self._try_grant(scope, ticket, tokens)
+                    if wait is None:
+                        self._cv.notify_all()
+                        return self._granted(scope, tokens, time.monotonic() - start)
+                    if timeout is not None and time.monotonic() - start + wait > timeout:
+                        raise TimeoutError(f"等待 {self.name} 限流配额超时")
+                    self._cv.wait(wait)
+            except BaseException:
+                self._dequeue(scope, ticket)
+                self._cv.notify_all()
+                raise
+
+    async def aacquire(self, scope: str, tokens: int = 0) -> Lease:
+        start = time.monotonic()
+        with self._cv:
+            ticket = self._enqueue(scope)
+        try:
+            while True:
+                with self._cv:
+                    wait = self._try_grant(scope, ticket, tokens)
+                    if wait is None:
+                        self._cv.notify_all()
+                        return self._granted(scope, tokens, time.monotonic() - start)
+                await asyncio.sleep(min(wait, 0.25))
+        except BaseException:
+            with self._cv:
+                self._dequeue(scope, ticket)
+                self._cv.notify_all()
+            raise
+
+    def release(self, lease: Lease):
+        with self._cv:
+            self.in_flight -= 1
+            if self.tpm_bucket and lease.actual_tokens is not None:
+                self.tpm_bucket.refund(lease.estimated_tokens - lease.actual_tokens)
+            self._cv.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            waits = sorted(self.waits)
+            stats = {
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "in_flight": self.in_flight,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "avg_wait": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait": round(waits[min(int(len(waits) * 0.95), len(waits) - 1)], 3) if waits else 0.0,
+                "max_wait": round(waits[-1], 3) if waits else 0.0,
+                "by_scope": {s: {"requests": n, "total_wait": round(w, 3)} for s, (n, w) in self.scope_waits.items()},
+            }
+        return stats
+
+class RateGovernor:
+    """全局限流总控，按提供商名称惰性创建 ProviderGovernor"""
+
+    def __init__(self, providers: Optional[Dict[str, dict]] = None, default_limits: Optional[dict] = None,
+                 enabled: bool = True):
+        self.limits = {**DEFAULT_PROVIDER_LIMITS, **(providers or {})}
+        self.default_limits = default_limits or FALLBACK_LIMITS
+        self.enabled = enabled
+        self._governors: Dict[str, ProviderGovernor] = {}
+        self._lock = threading.Lock()
+
+    def for_provider(self, provider: str) -> ProviderGovernor:
+        with self._lock:
+            governor = self._governors.get(provider)
+            if governor is None:
+                governor = ProviderGovernor(provider, **self.limits.get(provider, self.default_limits))
+                self._governors[provider] = governor
+            return governor
+
+    @contextmanager
+    def lease(self, provider: str, scope: Optional[str] = None, tokens: int = 0):
+        """同步申请一次请求配额：`with governor.lease("gemini", ticker, tokens) as lease: ...`"""
+        if not self.enabled:
+            yield None
+            return
+        governor = self.for_provider(provider)
+        lease = governor.acquire(scope or "default", tokens)
+        if lease.waited > 1:
+            logger.info(f"限流: {provider} [{lease.scope}] 排队等待 {lease.waited:.2f} 秒")
+        try:
+            yield lease
+        finally:
+            governor.release(lease)
+
+    @asynccontextmanager
+    async def alease(self, provider: str, scope: Optional[str] = None, tokens: int = 0):
+        """lease 的协程版本，排队期间不阻塞事件循环"""
+        if not self.enabled:
+            yield None
+            return
+        governor = self.for_provider(provider)
+        lease = await governor.aacquire(scope or "default", tokens)
+        if lease.waited > 1:
+            logger.info(f"限流: {provider} [{lease.scope}] 排队等待 {lease.waited:.2f} 秒")
+        try:
+            yield lease
+        finally:
+            governor.release(lease)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            governors = dict(self._governors)
+        return {name: governor.stats() for name, governor in governors.items()}
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_rate_governor() -> RateGovernor:
+    """获取全局限流总控"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor(
+                providers=RATE_LIMIT_CONFIG.get("providers"),
+                default_limits=RATE_LIMIT_CONFIG.get("default"),
+                enabled=RATE_LIMIT_CONFIG.get("enabled", True)
+            )
+        return _governor
+
+def expected_completion_tokens() -> int:
+    """申请TPM配额时为输出预留的Token数"""
+    return RATE_LIMIT_CONFIG.get("expected_completion_tokens", 800)
+
+def llm_lease(llm: Any, scope: Optional[str] = None, prompt_text: str = ""):
+    """为直接调用 `llm.invoke` 的场景申请配额，提供商由模型类型识别"""
+    if getattr(llm, "self_rate_limited", False):
+        return nullcontext()
+    return get_rate_governor().lease(
+        describe_llm(llm)["provider"], scope, estimate_tokens(prompt_text) + expected_completion_tokens()
+    )
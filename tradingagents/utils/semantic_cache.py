@@ -0,0 +1,200 @@
+# tradingagents/utils/semantic_cache.py - 分析师链的语义近似缓存（可选）
+"""
+连续两次运行同一只股票时，分析师收到的Prompt往往只差几个数字或一条新闻，精确哈希缓存无法命中。
+这里用纯CPU的哈希字符n-gram向量表示Prompt，在同一 (股票, 智能体) 范围内做NumPy向量化余弦检索，
+相似度超过阈值时直接复用上次的结果。默认关闭，需在 SEMANTIC_CACHE_CONFIG 中开启。
+"""
+
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .serialization import dump_model, load_model
+from .storage import get_storage_dir, connect_sqlite
+
+try:
+    from tradingagents.default_config import SEMANTIC_CACHE_CONFIG
+except ImportError:
+    SEMANTIC_CACHE_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENTS = (
+    "fundamentals_analysis", "market_analysis", "news_analysis", "policy_analysis",
+    "social_media_analysis", "capital_flow_analysis", "sector_analysis",
+)
+
+class HashedNgramEmbedder:
+    """把文本映射为哈希字符n-gram的TF向量（对数缩放 + L2归一化）"""
+
+    def __init__(self, dim: int = 4096, ngram_sizes: Iterable[int] = (2, 3)):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+
+    def embed(self, text: str) -> np.ndarray:
+        text = " ".join(text.split())
+        indices = [
+            zlib.crc32(text[i:i + n].encode("utf-8")) % self.dim
+            for n in self.ngram_sizes
+            for i in range(max(len(text) - n + 1, 0))
+        ]
+        vector = np.bincount(np.asarray(indices, dtype=np.int64), minlength=self.dim).astype(np.float32)
+        np.log1p(vector, out=vector)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+class SemanticLLMCache:
+    """按 (股票, 智能体) 分区的语义缓存，底层存储为SQLite"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        threshold: float = 0.97,
+        ttl_hours: float = 24,
+        max_entries_per_scope: int = 50,
+        dim: int = 4096,
+        agents: Iterable[str] = DEFAULT_AGENTS
+    ):
+        self.db_path = db_path or str(get_storage_dir() / "semantic_cache.db")
+        self.threshold = threshold
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries_per_scope = max_entries_per_scope
+        self.agents = set(agents)
+        self.embedder = HashedNgramEmbedder(dim=dim)
+        self.lookups = 0
+        self.hits = 0
+        self.similarities = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        # 内存索引: (ticker, agent) -> (向量矩阵, [行id], [创建时间])
+        self._index: Dict[Tuple[str, str], Tuple[np.ndarray, list, list]] = {}
+        self._conn = connect_sqlite(self.db_path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS semantic_cache (
+                       id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       ticker TEXT NOT NULL,
+                       agent TEXT NOT NULL,
+                       dim INTEGER NOT NULL,
+                       vector BLOB NOT NULL,
+                       payload TEXT NOT NULL,
+                       created_at REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_semantic_scope ON semantic_cache (ticker, agent)")
+
+    def applies_to(self, agent: str) -> bool:
+        return agent in self.agents
+
+    def _load_scope(self, ticker: str, agent: str) -> Tuple[np.ndarray, list, list]:
+        key = (ticker, agent)
+        if key not in self._index:
+            cutoff = time.time() - self.ttl_seconds
+            rows = self._conn.execute(
+                "SELECT id, vector, created_at FROM semantic_cache "
+                "WHERE ticker = ? AND agent = ? AND dim = ? AND created_at >= ? ORDER BY id",
+                (ticker, agent, self.embedder.dim, cutoff)
+            ).fetchall()
+            if rows:
+                matrix = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+            else:
+                matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+            self._index[key] = (matrix, [r[0] for r in rows], [r[2] for r in rows])
+        return self._index[key]
+
+    def lookup(self, ticker: str, agent: str, prompt_text: str) -> Tuple[Optional[BaseModel], np.ndarray]:
+        """返回 (命中的结果或None, Prompt向量)，向量可在未命中时用于写入"""
+        vector = self.embedder.embed(prompt_text)
+        with self._lock:
+            self.lookups += 1
+            matrix, row_ids, created = self._load_scope(ticker, agent)
+            if not row_ids:
+                return None, vector
+            sims = matrix @ vector
+            # 过期条目不参与匹配
+            sims[np.asarray(created) < time.time() - self.ttl_seconds] = -1.0
+            best = int(np.argmax(sims))
+            best_sim = float(sims[best])
+            self.similarities.append(best_sim)
+            if best_sim < self.threshold:
+                return None, vector
+            row = self._conn.execute("SELECT payload FROM semantic_cache WHERE id = ?", (row_ids[best],)).fetchone()
+        if row is None:
+            return None, vector
+        try:
+            result = load_model(row[0])
+        except Exception as e:
+            logger.warning(f"语义缓存记录无法还原，已忽略: {e}")
+            return None, vector
+        with self._lock:
+            self.hits += 1
+        logger.info(f"语义缓存命中 [{ticker}/{agent}]，相似度 {best_sim:.4f}")
+        return result, vector
+
+    def put(self, ticker: str, agent: str, vector: np.ndarray, result: BaseModel):
+        """写入一条结果，并保持每个分区的条目数不超过上限"""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO semantic_cache (ticker, agent, dim, vector, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, agent, self.embedder.dim, vector.astype(np.float32).tobytes(), dump_model(result), now)
+            )
+            matrix, row_ids, created = self._load_scope(ticker, agent)
+            matrix = np.vstack([matrix, vector[None, :]])
+            row_ids, created = row_ids + [cursor.lastrowid], created + [now]
+            overflow = len(row_ids) - self.max_entries_per_scope
+            if overflow > 0:
+                self._conn.executemany("DELETE FROM semantic_cache WHERE id = ?", [(i,) for i in row_ids[:overflow]])
+                matrix, row_ids, created = matrix[overflow:], row_ids[overflow:], created[overflow:]
+            self._index[(ticker, agent)] = (matrix, row_ids, created)
+
+    def stats(self) -> dict:
+        """命中率与最佳相似度分布，用于调节阈值"""
+        with self._lock:
+            sims = np.asarray(self.similarities, dtype=np.float32)
+            lookups, hits = self.lookups, self.hits
+        stats = {
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "threshold": self.threshold,
+        }
+        if sims.size:
+            stats["similarity_percentiles"] = {
+                f"p{q}": round(float(np.percentile(sims, q)), 4) for q in (10, 50, 90, 99)
+            }
+            edges = [0.0, 0.8, 0.9, 0.95, 0.97, 0.99, 1.0001]
+            counts, _ = np.histogram(sims, bins=edges)
+            stats["similarity_histogram"] = {
+                f"{edges[i]:.2f}-{min(edges[i + 1], 1.0):.2f}": int(c) for i, c in enumerate(counts)
+            }
+        return stats
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> Optional[SemanticLLMCache]:
+    """获取全局语义缓存；默认关闭，需在配置中显式开启"""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_CONFIG.get("enabled", False):
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            try:
+                _semantic_cache = SemanticLLMCache(
+                    db_path=SEMANTIC_CACHE_CONFIG.get("db_path"),
+                    threshold=SEMANTIC_CACHE_CONFIG.get("threshold", 0.97),
+                    ttl_hours=SEMANTIC_CACHE_CONFIG.get("ttl_hours", 24),
+                    max_entries_per_scope=SEMANTIC_CACHE_CONFIG.get("max_entries_per_scope", 50),
+                    dim=SEMANTIC_CACHE_CONFIG.get("dim", 4096),
+                    agents=SEMANTIC_CACHE_CONFIG.get("agents", DEFAULT_AGENTS)
+                )
+            except Exception as e:
+                logger.warning(f"语义缓存初始化失败，将不使用语义缓存: {e}")
+                return None
+        return _semantic_cache
@@ -0,0 +1,46 @@
+# tradingagents/utils/serialization.py - Pydantic输出的序列化工具
+
+import importlib
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    _loads = json.loads
+
+def dump_model(model: BaseModel) -> str:
+    """把Pydantic对象序列化为带类型信息的JSON字符串"""
+    model_cls = type(model)
+    return _dumps({
+        "__model__": f"{model_cls.__module__}:{model_cls.__qualname__}",
+        "data": model.model_dump(mode="json"),
+    })
+
+def load_model(payload: str) -> BaseModel:
+    """根据类型信息把JSON字符串还原为Pydantic对象"""
+    obj = _loads(payload)
+    module_name, qualname = obj["__model__"].split(":", 1)
+    target = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    return target.model_validate(obj["data"])
+
+def dumps(obj: Any) -> str:
+    """通用JSON序列化（优先使用 orjson）"""
+    return _dumps(obj)
+
+def loads(payload: str) -> Any:
+    """通用JSON反序列化"""
+    return _loads(payload)
@@ -0,0 +1,21 @@
+# tradingagents/utils/storage.py - 本地持久化存储工具
+
+import os
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+def get_storage_dir(subdir: str = "") -> Path:
+    """获取本地缓存目录，可通过环境变量 TRADINGAGENTS_CACHE_DIR 覆盖"""
+    base_dir = Path(os.environ.get("TRADINGAGENTS_CACHE_DIR") or PROJECT_ROOT / "cache")
+    path = base_dir / subdir if subdir else base_dir
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def connect_sqlite(db_path) -> sqlite3.Connection:
+    """创建可跨线程共享的SQLite连接（WAL模式，调用方负责加锁）"""
+    conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,202 @@
+# tradingagents/utils/token_streaming.py - 智能体输出的逐Token流式推送
+"""
+开启流式模式后，LLMSafetyWrapper 不再整体调用 `prompt | llm | parser` 链，而是先渲染Prompt、
+以 `llm.stream` 逐块接收输出并推送给可插拔的输出端（控制台 / 文件 / 回调），全部接收完毕后
+再交给Pydantic解析器。每次调用的首Token时间与输出速率会写入LLM调用统计。
+"""
+
+import logging
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .storage import PROJECT_ROOT
+
+try:
+    from tradingagents.default_config import STREAMING_CONFIG
+except ImportError:
+    STREAMING_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StreamTiming:
+    """单次流式调用的计时数据"""
+    agent: str
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    last_token_at: Optional[float] = None
+    chunks: int = 0
+    chars: int = 0
+
+    def mark(self, text: str):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        self.chunks += 1
+        self.chars += len(text)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.first_token_at - self.started_at if self.first_token_at is not None else None
+
+    @property
+    def chunks_per_second(self) -> Optional[float]:
+        if self.first_token_at is None or self.last_token_at is None or self.chunks < 2:
+            return None
+        span = self.last_token_at - self.first_token_at
+        return (self.chunks - 1) / span if span > 0 else None
+
+class TokenSink:
+    """流式输出端的基类，子类按需覆盖三个回调"""
+
+    def on_start(self, agent: str):
+        pass
+
+    def on_token(self, agent: str, token: str):
+        pass
+
+    def on_end(self, agent: str, timing: StreamTiming, error: Optional[str] = None):
+        pass
+
+class ConsoleTokenSink(TokenSink):
+    """
+    在控制台实时打印Token。并发调用时，同一时刻只有一个智能体“占用”控制台实时输出，
+    其余智能体的输出先缓存，轮到时（或结束时）整段打印，避免多路Token交错。
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+        self._live_agent: Optional[str] = None
+        self._buffers: Dict[str, List[str]] = {}
+
+    def _write(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def on_start(self, agent: str):
+        with self._lock:
+            self._buffers[agent] = []
+            if self._live_agent is None:
+                self._live_agent = agent
+                self._write(f"\n>>> [{agent}] 实时输出:\n")
+
+    def on_token(self, agent: str, token: str):
+        with self._lock:
+            if agent == self._live_agent:
+                self._write(token)
+            else:
+                self._buffers.setdefault(agent, []).append(token)
+
+    def on_end(self, agent: str, timing: StreamTiming, error: Optional[str] = None):
+        with self._lock:
+            buffered = "".join(self._buffers.pop(agent, []))
+            if agent != self._live_agent:
+                self._write(f"\n>>> [{agent}] 输出:\n{buffered}")
+            ttft = f"{timing.ttft:.2f}s" if timing.ttft is not None else "-"
+            self._write(f"\n<<< [{agent}] {'失败: ' + error if error else '完成'}（首Token {ttft}）\n")
+            if agent == self._live_agent:
+                # 把控制台交给仍在输出的下一个智能体，并补打它已缓存的内容
+                self._live_agent = next(iter(self._buffers), None)
+                if self._live_agent is not None:
+                    self._write(f"\n>>> [{self._live_agent}] 实时输出:\n" + "".join(self._buffers[self._live_agent]))
+                    self._buffers[self._live_agent] = []
+
+class FileTokenSink(TokenSink):
+    """把每个智能体的输出逐块追加写入 logs/streams/<时间戳>/<智能体>.txt"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else \
+            PROJECT_ROOT / "logs" / "streams" / datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, agent: str) -> Path:
+        return self.directory / (re.sub(r'[^\w\-]+', '_', agent) + ".txt")
+
+    def _append(self, agent: str, text: str):
+        with self._lock, open(self._path(agent), "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def on_start(self, agent: str):
+        self._append(agent, f"\n--- {datetime.now().isoformat()} 开始 ---\n")
+
+    def on_token(self, agent: str, token: str):
+        self._append(agent, token)
+
+    def on_end(self, agent: str, timing: StreamTiming, error: Optional[str] = None):
+        rate = timing.chunks_per_second
+        self._append(
+            agent,
+            f"\n--- 结束 {'(失败: ' + error + ')' if error else ''} 首Token {timing.ttft} s，"
+            f"{timing.chunks} 块 / {timing.chars} 字符，{rate and round(rate, 2)} 块/秒 ---\n"
+        )
+
+class CallbackTokenSink(TokenSink):
+    """把Token转交给任意回调函数 fn(agent, token)，可选的 on_end 回调接收计时数据"""
+
+    def __init__(self, on_token: Callable[[str, str], None],
+                 on_end: Optional[Callable[[str, StreamTiming, Optional[str]], None]] = None):
+        self._on_token = on_token
+        self._on_end = on_end
+
+    def on_token(self, agent: str, token: str):
+        self._on_token(agent, token)
+
+    def on_end(self, agent: str, timing: StreamTiming, error: Optional[str] = None):
+        if self._on_end is not None:
+            self._on_end(agent, timing, error)
+
+class MultiTokenSink(TokenSink):
+    """同时推送给多个输出端；单个输出端出错不影响其他输出端与主流程"""
+
+    def __init__(self, sinks: Iterable[TokenSink]):
+        self.sinks = list(sinks)
+
+    def _dispatch(self, method: str, *args):
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(*args)
+            except Exception as e:
+                logger.debug(f"流式输出端 {type(sink).__name__}.{method} 出错: {e}")
+
+    def on_start(self, agent: str):
+        self._dispatch("on_start", agent)
+
+    def on_token(self, agent: str, token: str):
+        self._dispatch("on_token", agent, token)
+
+    def on_end(self, agent: str, timing: StreamTiming, error: Optional[str] = None):
+        self._dispatch("on_end", agent, timing, error)
+
+_sink: Optional[MultiTokenSink] = None
+_agents: Optional[set] = None
+
+def set_token_sink(*sinks: TokenSink, agents: Optional[Iterable[str]] = None):
+    """开启流式模式；不传输出端则关闭。agents 为空时所有智能体都流式输出"""
+    global _sink, _agents
+    _sink = MultiTokenSink(sinks) if sinks else None
+    _agents = set(agents) if agents else None
+
+def get_token_sink(agent: str) -> Optional[MultiTokenSink]:
+    """返回该智能体应使用的输出端；未开启流式模式或不在名单内时返回 None"""
+    if _sink is None or (_agents is not None and agent not in _agents):
+        return None
+    return _sink
+
+def configure_from_config(console: bool = True, file_dir: Optional[str] = None):
+    """按 STREAMING_CONFIG 与命令行参数开启流式模式"""
+    sinks: List[TokenSink] = []
+    if console and STREAMING_CONFIG.get("console", True):
+        sinks.append(ConsoleTokenSink())
+    file_dir = file_dir or STREAMING_CONFIG.get("file_dir")
+    if file_dir or STREAMING_CONFIG.get("file", False):
+        sinks.append(FileTokenSink(file_dir))
+    set_token_sink(*sinks, agents=STREAMING_CONFIG.get("agents"))